@@ -0,0 +1,44 @@
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cli
+
+SCRIPT = os.path.join(ROOT, "cli.py")
+
+
+def import_micros(command) -> int:
+    # Cumulative import time of the top-level modules, as -X importtime reports it.
+    result = subprocess.run([sys.executable, "-X", "importtime", SCRIPT] + command,
+                            capture_output=True, text=True, check=True)
+    total = 0
+    for line in result.stderr.splitlines()[1:]:
+        if line.startswith("import time:"):
+            _, cumulative, name = line.split("|")
+            if not name.startswith("  "):
+                total += int(cumulative)
+    return total
+
+
+def main(runs: int = 10) -> None:
+    with tempfile.TemporaryDirectory() as folder:
+        save = os.path.join(folder, "save.json")
+        with open(os.devnull, "w", encoding="utf-8") as sink, contextlib.redirect_stdout(sink):
+            cli.run(["--save", save, "submit", "--name", "Ivan", "--phone", "123", "--type", "стол"])
+        for command in (["report", "--json"], ["ship"]):
+            command = ["--save", save] + command
+            started = time.perf_counter()
+            for _ in range(runs):
+                subprocess.run([sys.executable, SCRIPT] + command, capture_output=True, check=True)
+            elapsed = (time.perf_counter() - started) / runs
+            print(f"{command[2]}: {elapsed * 1000:.0f} ms per run, imports {import_micros(command) / 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
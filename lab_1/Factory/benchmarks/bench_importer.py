@@ -0,0 +1,36 @@
+import csv
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.importer import FIELDS, OrderImporter
+from services.workload import WorkloadGenerator
+
+TARGET_RATE = 100_000
+
+
+def write_orders(path: str, count: int, file_format: str, seed: int = 1) -> None:
+    generator = WorkloadGenerator(seed, custom_share=0.0, customers=count // 4 + 1)
+    if file_format == "jsonl":
+        generator.write_jsonl(path, count)
+        return
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        writer = csv.DictWriter(out, FIELDS)
+        writer.writeheader()
+        writer.writerows(generator.records(count))
+
+
+def main(count: int = 500_000) -> None:
+    with tempfile.TemporaryDirectory() as folder:
+        for file_format in ("csv", "jsonl"):
+            path = os.path.join(folder, f"orders.{file_format}")
+            write_orders(path, count, file_format)
+            report = OrderImporter([], []).import_file(path)
+            verdict = "OK" if report.rate >= TARGET_RATE else "BELOW TARGET"
+            print(f"{file_format:>5}: {report} [{verdict}]")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
@@ -0,0 +1,58 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import load_game
+from services.workload import WorkloadGenerator
+
+STATUSES = ("Created", "Assembled", "Stored")
+MATERIALS = {
+    "Стул": [{"type": "Wood", "kind": "wood", "name": "Дуб", "amount": 10.0}],
+    "Стол": [{"type": "Wood", "kind": "wood", "name": "Сосна", "amount": 20.0},
+             {"type": "Metal", "kind": "metal", "name": "Сталь", "amount": 5.0}],
+    "Шкаф": [{"type": "Wood", "kind": "wood", "name": "Дуб", "amount": 30.0},
+             {"type": "Metal", "kind": "metal", "name": "Сталь", "amount": 8.0}],
+}
+
+
+def build_save(count: int, seed: int = 1) -> dict:
+    storage = {"name": "Склад", "capacity": 1e9, "metal_amount": 0.0, "wood_amount": 0.0, "materials": []}
+    generator = WorkloadGenerator(seed, customers=count // 4 + 1, custom_share=0.0)
+    records = list(generator.records(count))
+    return {
+        "material_storage": storage,
+        "finished_storage": dict(storage, name="Готовая продукция"),
+        "workshop": {"name": "Цех", "completed": []},
+        "workers": [{"name": w.name, "age": w.age, "specialization": w.specialization,
+                     "experience": w.experience, "is_busy": False} for w in generator.workers(count // 100)],
+        "tools": [{"name": t.name, "durability": t.durability} for t in generator.tools(count // 100)],
+        "customers": [{"name": c.name, "age": c.age, "phone": c.phone} for c in generator.customers()],
+        "furnitures": [{"type": r["type"].capitalize(), "customer": r["name"], "status": STATUSES[i % 3],
+                        "quantity": r["quantity"], "due_date": r["due_date"], "priority": r["priority"],
+                        "materials": MATERIALS[r["type"].capitalize()]} for i, r in enumerate(records)],
+    }
+
+
+def main(count: int = 200_000) -> None:
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "save.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(build_save(count), f, ensure_ascii=False)
+        started = time.perf_counter()
+        with open(path, encoding="utf-8") as f:
+            json.load(f)
+        parse = time.perf_counter() - started
+        for trusted in (False, True):
+            started = time.perf_counter()
+            load_game(path, trusted=trusted)
+            elapsed = time.perf_counter() - started
+            print(f"trusted={trusted}: {elapsed:.2f} s total, {elapsed - parse:.2f} s building objects, "
+                  f"{count / elapsed:,.0f} furnitures/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
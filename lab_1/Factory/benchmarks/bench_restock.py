@@ -0,0 +1,37 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.warehouse import Warehouse
+from models.material import Metal, Wood
+from services.restock import DAY, RestockPlanner, simulate_supply
+from services.workload import WorkloadGenerator
+
+
+def split_days(generator: WorkloadGenerator, days: int) -> list:
+    batches = [[] for _ in range(days)]
+    for furniture, order in generator.orders(int(days * generator.orders_per_day * 1.2)):
+        day = int((order.created_at - generator.start).total_seconds() // DAY)
+        if day < days:
+            batches[day].append(furniture)
+    return batches
+
+
+def main(days: int = 30, per_day: float = 20.0, seed: int = 2) -> None:
+    for restock in (False, True):
+        generator = WorkloadGenerator(seed, orders_per_day=per_day, custom_share=0.0)
+        warehouse = Warehouse("Склад", 100000)
+        warehouse.add_material(Wood("Дуб", 2000.0))
+        warehouse.add_material(Metal("Сталь", 400.0))
+        planner = RestockPlanner(warehouse) if restock else None
+        started = time.perf_counter()
+        report = simulate_supply(split_days(generator, days), warehouse, generator.workers(12),
+                                 generator.tools(6), planner)
+        elapsed = time.perf_counter() - started
+        print(f"restock={restock}: {report} in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30)
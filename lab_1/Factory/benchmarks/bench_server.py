@@ -0,0 +1,33 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.loadgen import run_load
+from services.server import OrderServer, OrderService
+from services.workload import WorkloadGenerator
+
+
+def records(count: int, seed: int = 7):
+    return list(WorkloadGenerator(seed, customers=5000, custom_share=0.0).records(count))
+
+
+async def scenario(count: int, connections: int, pipeline: int) -> None:
+    service = OrderService([], [])
+    server = OrderServer(service, port=0)
+    await server.start()
+    try:
+        report = await run_load(server.host, server.port, records(count), connections, pipeline, queries=count // 4)
+    finally:
+        await server.close()
+    print(f"connections={connections} pipeline={pipeline}: {report}; commits {service.commits}")
+
+
+def main(count: int = 20_000) -> None:
+    for connections, pipeline in ((8, 1), (8, 16), (32, 32)):
+        asyncio.run(scenario(count, connections, pipeline))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
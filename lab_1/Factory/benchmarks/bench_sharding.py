@@ -0,0 +1,34 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.warehouse import Warehouse
+from services.sharding import run_sharded
+from services.workload import WorkloadGenerator
+
+
+def build(count: int, seed: int = 1):
+    generator = WorkloadGenerator(seed)
+    furnitures = [furniture for furniture, _ in generator.orders(count)]
+    warehouse = Warehouse("Склад материалов", 1e12)
+    # Enough stock for every order: lots go up to 20 units of the largest recipe.
+    warehouse.metal_amount = 50.0 * count
+    warehouse.wood_amount = 200.0 * count
+    return furnitures, warehouse, generator.workers(6), generator.tools(4)
+
+
+def main(count: int = 50_000) -> None:
+    cores = os.cpu_count() or 1
+    for shards in sorted({1, 2, cores}):
+        furnitures, warehouse, workers, tools = build(count)
+        started = time.perf_counter()
+        report = run_sharded(furnitures, warehouse, workers, tools, shards)
+        elapsed = time.perf_counter() - started
+        print(f"shards={shards}: {elapsed:.2f} s, {count / elapsed:,.0f} items/s, "
+              f"completed {len(report.completed)}, failed {len(report.failed)}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
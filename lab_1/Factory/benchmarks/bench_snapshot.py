@@ -0,0 +1,45 @@
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.furniture import Furniture, FurnitureState
+from models.material import Wood
+from models.people import Worker
+from models.tool import Tool
+from models.warehouse import Warehouse
+from models.snapshot import FactorySnapshot
+
+
+def main(count: int = 1_000_000, edits: int = 1000) -> None:
+    materials = [Wood("Дуб", 10.0)]
+    furnitures = [Furniture.trusted("Стул", materials, 1, FurnitureState.STORED) for _ in range(count)]
+    warehouse = Warehouse("Склад", 1e9)
+    workers = [Worker(f"Рабочий {i}", 30, "столяр", 5) for i in range(100)]
+    tools = [Tool(f"Инструмент {i}", 90) for i in range(100)]
+    base = FactorySnapshot.capture([warehouse], workers, tools, furnitures)
+
+    started = time.perf_counter()
+    forks = [base.fork() for _ in range(10)]
+    fork_seconds = (time.perf_counter() - started) / len(forks)
+    started = time.perf_counter()
+    for index in range(0, count, count // edits):
+        forks[0].edit(index).status = FurnitureState.DELIVERED
+    edit_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    changed = forks[0].changed(base)
+    compare_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    copy.copy(furnitures)
+    [copy.copy(item) for item in furnitures[:count // 10]]
+    deep_seconds = (time.perf_counter() - started) * 10
+
+    print(f"{count:,} orders: fork {fork_seconds * 1000:.2f} ms, "
+          f"{edits} edits {edit_seconds * 1000:.1f} ms, compare {compare_seconds * 1000:.1f} ms "
+          f"({len(changed)} changed), copying every order {deep_seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,318 @@
+import argparse
+import json
+import os
+import sys
+
+# Only the standard library is imported here: models and operations are loaded
+# inside the subcommands that need them, so `report` and `export` start fast.
+
+SAVE_FILE = "factory_save.json"
+EXPORT_FIELDS = ("name", "phone", "type", "quantity", "due_date", "priority", "status")
+
+
+def read_save(path: str) -> dict:
+    if not os.path.exists(path):
+        raise SystemExit(f"Save file not found: {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_state(path: str):
+    import main
+    state = main.load_game(path, trusted=True)
+    if state is None:
+        import contextlib
+        with open(os.devnull, "w", encoding="utf-8") as sink, contextlib.redirect_stdout(sink):
+            state = main.initialize_system()
+    return state
+
+
+def save_state(path: str, state) -> None:
+    import main
+    main.save_game(*state, path=path)
+
+
+def stock_lines(storage: dict) -> list:
+    if "materials" in storage:
+        totals = {}
+        for record in storage["materials"]:
+            label = f"{record['kind']} ({record['grade']})" if record["grade"] else record["kind"]
+            totals[label] = totals.get(label, 0.0) + record["amount"]
+        return [f"   {label}: {amount:g}" for label, amount in totals.items()]
+    return [f"   metal: {storage['metal_amount']:g}", f"   wood: {storage['wood_amount']:g}"]
+
+
+def command_report(args) -> int:
+    data = read_save(args.save)
+    statuses, types = {}, {}
+    for furniture in data["furnitures"]:
+        statuses[furniture["status"]] = statuses.get(furniture["status"], 0) + 1
+        types[furniture["type"]] = types.get(furniture["type"], 0) + furniture.get("quantity", 1)
+    summary = {
+        "orders": len(data["furnitures"]),
+        "statuses": statuses,
+        "types": types,
+        "customers": len(data["customers"]),
+        "busy_workers": sum(1 for w in data["workers"] if w["is_busy"]),
+        "workers": len(data["workers"]),
+        "worn_tools": [t["name"] for t in data["tools"] if t["durability"] <= args.repair_threshold],
+        "completed": len(data["workshop"]["completed"]) + data["workshop"].get("archived", 0),
+    }
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False))
+        return 0
+    print(f"Заказов: {summary['orders']}, клиентов: {summary['customers']}, готово: {summary['completed']}")
+    for status, count in statuses.items():
+        print(f"   {status}: {count}")
+    print("Изделия: " + (", ".join(f"{t} {n}" for t, n in types.items()) or "нет"))
+    print(f"Рабочие заняты: {summary['busy_workers']}/{summary['workers']}")
+    if summary["worn_tools"]:
+        print("Нужен ремонт: " + ", ".join(summary["worn_tools"]))
+    print(f"Склад «{data['material_storage']['name']}»:")
+    print("\n".join(stock_lines(data["material_storage"])))
+    return 0
+
+
+def command_export(args) -> int:
+    data = read_save(args.save)
+    phones = {}
+    for customer in data["customers"]:
+        phones.setdefault(customer["name"], customer["phone"])
+    rows = [{"name": f.get("customer", ""), "phone": phones.get(f.get("customer", ""), ""),
+             "type": f["type"].lower(), "quantity": f.get("quantity", 1), "due_date": f.get("due_date") or "",
+             "priority": f.get("priority", 0), "status": f["status"]} for f in data["furnitures"]]
+    file_format = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    with open(args.output, "w", encoding="utf-8", newline="") as target:
+        if file_format == "csv":
+            import csv
+            writer = csv.DictWriter(target, EXPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            target.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+    print(f"Exported {len(rows)} orders to {args.output}")
+    return 0
+
+
+def command_submit(args) -> int:
+    from datetime import datetime, timedelta
+    from models.people import Customer
+    from models.furniture import Furniture
+    from models.recipes import RECIPES, make_components
+    from services.workload import install_recipes
+
+    install_recipes()
+    prod_type = args.type.lower()
+    if prod_type not in RECIPES:
+        raise SystemExit(f"Unknown furniture type '{args.type}'. Known: {', '.join(RECIPES)}")
+    state = load_state(args.save)
+    customers, furnitures = state[5], state[6]
+    customer = next((c for c in customers if c.phone == args.phone), None)
+    if customer is None:
+        customer = Customer(args.name, args.age, args.phone)
+        customers.append(customer)
+    due_date = datetime.now() + timedelta(days=args.due_days) if args.due_days is not None else None
+    furniture = Furniture(prod_type.capitalize(), make_components(prod_type), args.quantity)
+    furniture.customer = customer.name
+    furniture.order = customer.make_order(furniture.type, args.quantity, due_date, args.priority)
+    furnitures.append(furniture)
+    order_id = state[2].register(furniture)
+    save_state(args.save, state)
+    print(f"Order {order_id} accepted: {furniture.type} x{furniture.quantity} for {customer.name}")
+    return 0
+
+
+def command_run_batch(args) -> int:
+    from services.batch import FINISHED_STATES, run_batch
+    from services.workload import install_recipes
+
+    # Saved orders for custom products need their recipes and load units.
+    install_recipes()
+    state = load_state(args.save)
+    material_storage, finished_storage, workshop, workers, tools, customers, furnitures = state
+    if args.import_file:
+        from services.importer import OrderImporter
+        print(OrderImporter(customers, furnitures).import_file(args.import_file))
+    pending = [f for f in furnitures if f.status not in FINISHED_STATES]
+    metrics = None
+    if args.metrics:
+        from services.metrics import FactoryMetrics
+        metrics = FactoryMetrics().watch(workers, tools, [material_storage])
+    from models.finished_goods import FinishedGoodsStore
+    finished = FinishedGoodsStore(finished_storage)
+    if args.shards > 1:
+        from services.sharding import run_sharded
+        execute, arguments = run_sharded, (furnitures, material_storage, workers, tools, args.shards, workshop)
+        options = {"finished": finished}
+    else:
+        packing = material_storage if material_storage.amount("packing") > 0 else None
+        execute, arguments = run_batch, (pending, material_storage, workers, tools, workshop)
+        options = {"packing_warehouse": packing, "metrics": metrics, "finished": finished}
+    if args.profile:
+        from services.profiling import profile_call
+        report, profile = profile_call(execute, *arguments, mode=args.profiler, **options)
+        for path in profile.write(args.profile, args.top):
+            print(f"Profile written to {path}")
+    else:
+        report = execute(*arguments, **options)
+    if args.shards <= 1:
+        known = {id(f) for f in furnitures}
+        furnitures.extend(f for f in report.completed + [f for f, _ in report.failed] if id(f) not in known)
+    print(report)
+    if metrics is not None:
+        if args.shards > 1:
+            metrics.materials_consumed(report.consumed)
+        metrics.registry.write(args.metrics)
+    for furniture, reason in report.failed[:10]:
+        print(f"   {furniture.type}: {reason}")
+    save_state(args.save, state)
+    return 0 if not report.failed else 1
+
+
+def command_generate(args) -> int:
+    import time
+    from services.workload import WorkloadGenerator
+
+    generator = WorkloadGenerator(args.seed, args.per_day, args.customers, args.custom_share)
+    started = time.perf_counter()
+    written = generator.write_jsonl(args.output, args.orders)
+    elapsed = time.perf_counter() - started
+    print(f"Generated {written} orders (seed {args.seed}) to {args.output} in {elapsed:.2f} s")
+    return 0
+
+
+def command_ship(args) -> int:
+    from models.finished_goods import FinishedGoodsStore
+
+    state = load_state(args.save)
+    store = FinishedGoodsStore(state[1])
+    shipped = store.ship(state[6])
+    save_state(args.save, state)
+    print(f"Shipped {len(shipped)} orders. {store}")
+    return 0
+
+
+def command_what_if(args) -> int:
+    from models.snapshot import FactorySnapshot
+    from services.scenarios import Scenario, run_scenarios
+
+    workers = []
+    for spec in args.add_workers:
+        specialization, _, count = spec.partition(":")
+        workers.extend((f"Новый {specialization} {i + 1}", 30, specialization, 1) for i in range(int(count or 1)))
+    stock = []
+    for spec in args.buy:
+        parts = spec.split(":")
+        if len(parts) != 3:
+            raise SystemExit(f"Use KIND:GRADE:AMOUNT for --buy, got '{spec}'")
+        stock.append((parts[0], parts[1], float(parts[2])))
+    base = FactorySnapshot.from_state(load_state(args.save))
+    baseline, changed = run_scenarios(base, [Scenario("Как есть"), Scenario("Изменения", workers, (), stock)],
+                                      args.processes)
+    print(baseline)
+    print(changed)
+    delta = changed.delta(baseline)
+    print(f"Разница: готово {delta['completed']:+d}, ошибок {delta['failed']:+d}")
+    for label, amount in delta["stock"].items():
+        print(f"   {label}: {amount:+g}")
+    return 0
+
+
+def command_serve(args) -> int:
+    import asyncio
+    from services.server import OrderServer, OrderService
+
+    state = load_state(args.save)
+    metrics = None
+    if args.metrics_port is not None:
+        from services.metrics import FactoryMetrics
+        metrics = FactoryMetrics().watch(state[3], state[4], [state[0], state[1]])
+        print(f"Metrics on http://{args.host}:{metrics.registry.serve(args.host, args.metrics_port)}/metrics")
+    server = OrderServer(OrderService(state[5], state[6], metrics=metrics, workshop=state[2]), args.host, args.port)
+
+    async def serve():
+        await server.start()
+        print(f"Listening on http://{server.host}:{server.port}")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    if metrics is not None:
+        metrics.registry.close()
+    save_state(args.save, state)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Furniture factory command line")
+    parser.add_argument("--save", default=SAVE_FILE, help="save file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="add an order")
+    submit.add_argument("--name", required=True)
+    submit.add_argument("--phone", required=True)
+    submit.add_argument("--type", required=True)
+    submit.add_argument("--quantity", type=int, default=1)
+    submit.add_argument("--age", type=int, default=30)
+    submit.add_argument("--due-days", type=int)
+    submit.add_argument("--priority", type=int, default=0)
+    submit.set_defaults(handler=command_submit)
+
+    batch = commands.add_parser("run-batch", help="run pending orders through production")
+    batch.add_argument("--import", dest="import_file", help="CSV/JSONL orders to import first")
+    batch.add_argument("--shards", type=int, default=1)
+    batch.add_argument("--metrics", metavar="FILE", help="write Prometheus metrics to FILE after the run")
+    batch.add_argument("--profile", metavar="PREFIX",
+                       help="profile the run, write PREFIX.collapsed (flame graph) and PREFIX.txt (summary)")
+    batch.add_argument("--profiler", choices=("cprofile", "sample"), default="cprofile")
+    batch.add_argument("--top", type=int, default=20, help="functions listed in the profile summary")
+    batch.set_defaults(handler=command_run_batch)
+
+    ship = commands.add_parser("ship", help="deliver everything in finished-goods storage")
+    ship.set_defaults(handler=command_ship)
+
+    report = commands.add_parser("report", help="print a summary of the saved factory")
+    report.add_argument("--json", action="store_true")
+    report.add_argument("--repair-threshold", type=int, default=10)
+    report.set_defaults(handler=command_report)
+
+    serve = commands.add_parser("serve", help="accept orders over HTTP until interrupted")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+    serve.set_defaults(handler=command_serve)
+
+    what_if = commands.add_parser("what-if", help="compare a batch run with and without changes; nothing is saved")
+    what_if.add_argument("--add-workers", action="append", default=[], metavar="SPECIALIZATION:COUNT")
+    what_if.add_argument("--buy", action="append", default=[], metavar="KIND:GRADE:AMOUNT")
+    what_if.add_argument("--processes", type=int, default=1)
+    what_if.set_defaults(handler=command_what_if)
+
+    generate = commands.add_parser("generate", help="write a seeded synthetic order stream as JSONL")
+    generate.add_argument("output")
+    generate.add_argument("--orders", type=int, default=1000)
+    generate.add_argument("--seed", type=int, default=1)
+    generate.add_argument("--per-day", type=float, default=500.0, help="mean orders per day")
+    generate.add_argument("--customers", type=int, default=10000)
+    generate.add_argument("--custom-share", type=float, default=0.1, help="share of custom-recipe orders")
+    generate.set_defaults(handler=command_generate)
+
+    export = commands.add_parser("export", help="write orders to CSV or JSONL")
+    export.add_argument("output")
+    export.add_argument("--format", choices=("csv", "jsonl"))
+    export.set_defaults(handler=command_export)
+    return parser
+
+
+def run(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(run())
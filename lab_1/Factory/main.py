@@ -1,38 +1,107 @@
 import sys
 import json
 import os
+from datetime import datetime, timedelta
 from models.people import Worker, Customer
 from models.tool import Tool
-from models.material import Metal, Wood
+from models.tool_manager import ToolManager
+from models.material import Metal, Wood, RawMaterial
 from models.warehouse import Warehouse
 from models.workshop import Workshop
+from models.archive import FurnitureArchive
+from models.finished_goods import FinishedGoodsStore
 from models.furniture import Furniture, FurnitureState
-from operations.operations import (
-    PreparationOperation, CreateElementOperation, AssemblyOperation,
-    CheckOperation, PackingOperation
-)
+from models.orders import Order
+from models.aggregates import ReportAggregates
+from models.bulk import make_customers, make_furnitures, make_material_lists, make_tools, make_workers, paused_gc
+from models.recipes import RECIPES, PACKING_KIND, make_components, describe_recipe
+from operations.operations import CheckOperation, PackingOperation
+from operations.pipeline import PRODUCTION, ProductionContext
+from operations.assignment import pick_worker
+from operations.scheduler import OrderScheduler
+from services.importer import OrderImporter
 from models.exceptions import InvalidDataError, InvalidAmountError, InvalidOperation
 
 SAVE_FILE = "factory_save.json"
+ARCHIVE_FILE = "factory_archive.bin"
+ARCHIVE_RETENTION = timedelta(days=30)
+DEFAULT_PACKING_STOCK = {"Box": 300.0, "Film": 600.0, "Paper": 400.0}
 
 
-def save_game(material_storage, finished_storage, workshop, workers, tools, customers, furnitures):
+def stock_records(storage):
+    # Used-up packing slots are kept, so a load doesn't take them for missing.
+    return [{"kind": kind, "grade": grade, "amount": amount}
+            for (kind, grade), amount in storage.ledger.items() if amount or kind == PACKING_KIND]
+
+
+def restore_stock(storage, data):
+    if "materials" in data:
+        for record in data["materials"]:
+            storage.ledger.add(record["kind"], record["grade"], record["amount"])
+    else:
+        storage.metal_amount = data["metal_amount"]
+        storage.wood_amount = data["wood_amount"]
+
+
+def stock_packing(storage):
+    # Only saves without packing stock (older ones, or from before it was
+    # stocked) get the default.
+    if PACKING_KIND in storage.ledger.kinds():
+        return
+    # Stock goes in only as far as the warehouse has room for it.
+    for grade, amount in DEFAULT_PACKING_STOCK.items():
+        storage.ledger.add(PACKING_KIND, grade, max(0.0, min(amount, storage.available_space)))
+
+
+def archive_settings(workshop, path=SAVE_FILE):
+    if workshop.archive is None:
+        return {}
+    workshop.archive.flush()
+    # Stored relative to the save, so the pair can be moved together.
+    folder = os.path.dirname(os.path.abspath(path))
+    return {"archive": os.path.relpath(os.path.abspath(workshop.archive.path), folder),
+            "archived": len(workshop.archive),
+            "retention_days": workshop.retention.total_seconds() / 86400 if workshop.retention else None,
+            "keep": workshop.keep}
+
+
+def archive_path(path, save_path=SAVE_FILE):
+    return os.path.join(os.path.dirname(os.path.abspath(save_path)), path)
+
+
+def attach_archive(workshop, path=ARCHIVE_FILE, retention=ARCHIVE_RETENTION, keep=None,
+                   furnitures=None, save_path=SAVE_FILE):
+    if furnitures is not None:
+        workshop.active = furnitures
+    workshop.archive = FurnitureArchive(archive_path(path, save_path))
+    workshop.retention = retention
+    workshop.keep = keep
+    workshop.archive_old()
+
+
+def save_game(material_storage, finished_storage, workshop, workers, tools, customers, furnitures, path=SAVE_FILE):
+    for f in furnitures:
+        workshop.register(f)
     data = {
         "material_storage": {
             "name": material_storage.name,
             "capacity": material_storage.capacity,
             "metal_amount": material_storage.metal_amount,
-            "wood_amount": material_storage.wood_amount
+            "wood_amount": material_storage.wood_amount,
+            "materials": stock_records(material_storage)
         },
         "finished_storage": {
             "name": finished_storage.name,
             "capacity": finished_storage.capacity,
             "metal_amount": finished_storage.metal_amount,
-            "wood_amount": finished_storage.wood_amount
+            "wood_amount": finished_storage.wood_amount,
+            "materials": stock_records(finished_storage)
         },
         "workshop": {
             "name": workshop.workshop_type,
-            "completed": [f.type for f in workshop.completed_furnitures]
+            "completed": [f.type for f in workshop.completed_furnitures],
+            "next_id": workshop.next_id,
+            **archive_settings(workshop, path)
         },
         "workers": [
             {
@@ -58,12 +127,17 @@ def save_game(material_storage, finished_storage, workshop, workers, tools, cust
         ],
         "furnitures": [
             {
+                "id": f.id,
                 "type": f.type,
                 "customer": f.customer if hasattr(f, 'customer') else "",
                 "status": f.status.value,
+                "quantity": f.quantity,
+                "due_date": f.order.due_date.isoformat() if getattr(f, 'order', None) and f.order.due_date else None,
+                "priority": f.order.priority if getattr(f, 'order', None) else 0,
                 "materials": [
                     {
                         "type": m.__class__.__name__,
+                        "kind": m.kind,
                         "name": m.type if hasattr(m, 'type') else "",
                         "amount": m.amount
                     } for m in f.materials
@@ -72,35 +146,71 @@ def save_game(material_storage, finished_storage, workshop, workers, tools, cust
         ]
     }
     
-    with open(SAVE_FILE, 'w', encoding='utf-8') as f:
+    with open(path, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
     
     print(" Данные сохранены")
 
 
-def load_game():
-    if not os.path.exists(SAVE_FILE):
+def load_game(path=SAVE_FILE, trusted=False):
+    if not os.path.exists(path):
         return None
     
-    with open(SAVE_FILE, 'r', encoding='utf-8') as f:
+    with open(path, 'r', encoding='utf-8') as f:
         data = json.load(f)
     
-    material_storage = Warehouse(
+    make_warehouse = Warehouse.trusted if trusted else Warehouse
+    material_storage = make_warehouse(
         data["material_storage"]["name"],
         data["material_storage"]["capacity"]
     )
-    material_storage.metal_amount = data["material_storage"]["metal_amount"]
-    material_storage.wood_amount = data["material_storage"]["wood_amount"]
+    restore_stock(material_storage, data["material_storage"])
+    stock_packing(material_storage)
     
-    finished_storage = Warehouse(
+    finished_storage = make_warehouse(
         data["finished_storage"]["name"],
         data["finished_storage"]["capacity"]
     )
-    finished_storage.metal_amount = data["finished_storage"]["metal_amount"]
-    finished_storage.wood_amount = data["finished_storage"]["wood_amount"]
+    restore_stock(finished_storage, data["finished_storage"])
     
     workshop = Workshop(data["workshop"]["name"])
+    if data["workshop"].get("archive"):
+        days = data["workshop"].get("retention_days")
+        workshop.archive = FurnitureArchive(archive_path(data["workshop"]["archive"], path))
+        workshop.retention = timedelta(days=days) if days is not None else None
+        workshop.keep = data["workshop"].get("keep")
+    
+    if trusted:
+        with paused_gc():
+            workers, tools, customers, furnitures = load_records_trusted(data)
+    else:
+        workers, tools, customers, furnitures = load_records(data)
+    
+    # Saves from before order ids number the items by position.
+    for number, (furniture, f_data) in enumerate(zip(furnitures, data["furnitures"])):
+        furniture.id = f_data.get("id", number)
+        if f_data.get("customer"):
+            furniture.customer = f_data["customer"]
+        if f_data.get("due_date") or f_data.get("priority"):
+            due_date = datetime.fromisoformat(f_data["due_date"]) if f_data.get("due_date") else None
+            furniture.order = Order(f_data["type"], 1, due_date, f_data.get("priority", 0))
     
+    workshop.next_id = data["workshop"].get("next_id", max((f.id for f in furnitures), default=-1) + 1)
+    workshop.active = furnitures
+    stored = {}
+    for f in furnitures:
+        if f.status == FurnitureState.STORED:
+            stored.setdefault(f.type, []).append(f)
+    stored = {f_type: iter(items) for f_type, items in stored.items()}
+    for f_type in data["workshop"]["completed"]:
+        f = next(stored.get(f_type, iter(())), None)
+        if f is not None:
+            workshop.completed_furnitures.append(f)
+    
+    return material_storage, finished_storage, workshop, workers, tools, customers, furnitures
+
+
+def load_records(data):
     workers = []
     for w_data in data["workers"]:
         worker = Worker(
@@ -124,24 +234,36 @@ def load_game():
                 materials.append(Metal(m_data["name"], m_data["amount"]))
             elif m_data["type"] == "Wood":
                 materials.append(Wood(m_data["name"], m_data["amount"]))
+            elif m_data.get("kind"):
+                materials.append(RawMaterial(m_data["kind"], m_data["name"], m_data["amount"]))
         
-        furniture = Furniture(f_data["type"], materials)
-        if f_data.get("customer"):
-            furniture.customer = f_data["customer"]
+        furniture = Furniture(f_data["type"], materials, f_data.get("quantity", 1))
         for state in FurnitureState:
             if state.value == f_data["status"]:
                 furniture.status = state
                 break
         
         furnitures.append(furniture)
+    return workers, tools, customers, furnitures
+
+
+def load_records_trusted(data):
+    w_rows = data["workers"]
+    workers = make_workers([w["name"] for w in w_rows], [w["age"] for w in w_rows],
+                           [w["specialization"] for w in w_rows], [w["experience"] for w in w_rows],
+                           [w["is_busy"] for w in w_rows])
+    tools = make_tools([t["name"] for t in data["tools"]], [t["durability"] for t in data["tools"]])
+    c_rows = data["customers"]
+    customers = make_customers([c["name"] for c in c_rows], [c["age"] for c in c_rows],
+                               [c["phone"] for c in c_rows])
     
-    for f_type in data["workshop"]["completed"]:
-        for f in furnitures:
-            if f.type == f_type and f.status == FurnitureState.STORED:
-                workshop.add_completed_furniture(f)
-                break
-    
-    return material_storage, finished_storage, workshop, workers, tools, customers, furnitures
+    f_rows = data["furnitures"]
+    grouped = make_material_lists([tuple((m.get("kind") or m["type"].lower(), m["name"], m["amount"])
+                                         for m in f["materials"] if m["type"] in ("Metal", "Wood") or m.get("kind"))
+                                   for f in f_rows])
+    furnitures = make_furnitures([f["type"] for f in f_rows], grouped,
+                                 [f.get("quantity", 1) for f in f_rows], [f["status"] for f in f_rows])
+    return workers, tools, customers, furnitures
 
 
 def show_banner():
@@ -158,6 +280,8 @@ def show_menu():
     print("5. Посмотреть всех работников")
     print("6. Посмотреть все инструменты")
     print("7. Выход")
+    print("8. Импорт заказов из файла (CSV/JSONL)")
+    print("9. Отгрузить готовую продукцию со склада")
     print("-" * 30)
 
 
@@ -166,8 +290,9 @@ def initialize_system():
     workshop = Workshop("Сборочный цех")
     finished_goods = Warehouse("Склад готовой продукции", 5000.0)
     
-    storage.metal_amount = 5000.0
-    storage.wood_amount = 8000.0
+    storage.metal_amount = 3500.0
+    storage.wood_amount = 5000.0
+    stock_packing(storage)
     
     workers = [
         Worker("Иван Петров", 35, "универсал", 8),
@@ -196,7 +321,7 @@ def initialize_system():
 
 
 def main():
-    loaded = load_game()
+    loaded = load_game(trusted=True)
     
     if loaded:
         print("\n Найдено сохранение!")
@@ -205,12 +330,20 @@ def main():
             material_storage, finished_storage, workshop, workers, tools, customers, furnitures = loaded
             print(" Данные загружены")
             print(f"Материалы на складе: металл {material_storage.metal_amount}, дерево {material_storage.wood_amount}")
-            print(f"Готовой продукции: {len(workshop.completed_furnitures)}")
+            print(f"Готовой продукции: {workshop.get_completed_count()}")
         else:
             material_storage, finished_storage, workshop, workers, tools, customers, furnitures = initialize_system()
     else:
         material_storage, finished_storage, workshop, workers, tools, customers, furnitures = initialize_system()
     
+    workshop.active = furnitures
+    if workshop.archive is None:
+        attach_archive(workshop)
+    finished_goods = FinishedGoodsStore(finished_storage)
+    tool_manager = ToolManager(tools)
+    stats = ReportAggregates(tool_manager.repair_threshold).watch(
+        furnitures, workers, tools, [material_storage, finished_storage])
+    workshop.archive_listeners.append(stats.forget)
     show_banner()
     
     while True:
@@ -229,28 +362,24 @@ def main():
                 customer = Customer(name, 30, phone)
                 customers.append(customer)
                 
-                prod_type = input("Что хотите заказать? (стул/стол/шкаф): ").lower()
-                components = []
-                
-                if prod_type == "стул":
-                    components.append(Wood("Дуб", 10.0))
-                    print("Для стула нужно: дерево 10 ед.")
-                elif prod_type == "стол":
-                    components.append(Wood("Сосна", 20.0))
-                    components.append(Metal("Сталь", 5.0))
-                    print("Для стола нужно: дерево 20 ед., металл 5 ед.")
-                elif prod_type == "шкаф":
-                    components.append(Wood("Дуб", 30.0))
-                    components.append(Metal("Сталь", 8.0))
-                    print("Для шкафа нужно: дерево 30 ед., металл 8 ед.")
-                else:
+                prod_type = input(f"Что хотите заказать? ({'/'.join(RECIPES)}): ").lower()
+                if prod_type not in RECIPES:
                     print("Неизвестный тип изделия")
                     continue
+                components = make_components(prod_type)
+                print(f"Для изделия «{prod_type}» нужно: {describe_recipe(prod_type)}")
+                
+                amount = input("Количество (Enter — 1): ").strip()
+                quantity = int(amount) if amount else 1
+                days = input("Срок выполнения в днях (Enter — без срока): ").strip()
+                due_date = datetime.now() + timedelta(days=int(days)) if days else None
                 
-                new_item = Furniture(prod_type.capitalize(), components)
+                new_item = Furniture(prod_type.capitalize(), components, quantity)
                 new_item.customer = name
+                new_item.order = customer.make_order(new_item.type, quantity, due_date)
                 furnitures.append(new_item)
-                print(f"Заказ принят! ID заказа: {len(furnitures)-1}")
+                stats.track_furniture(new_item)
+                print(f"Заказ принят! ID заказа: {workshop.register(new_item)}")
             
             elif choice == "2":
                 if not furnitures:
@@ -258,8 +387,12 @@ def main():
                     continue
                 
                 print("\nТекущие заказы:")
-                for idx, furn in enumerate(furnitures):
-                    if furn.status == FurnitureState.STORED:
+                # Orders are chosen by their number, which stays with them after archiving.
+                by_id = {workshop.register(furn): furn for furn in furnitures}
+                for idx, furn in by_id.items():
+                    if furn.status == FurnitureState.DELIVERED:
+                        status_display = "ОТГРУЖЕН"
+                    elif furn.status == FurnitureState.STORED:
                         status_display = "НА СКЛАДЕ"
                     elif furn.status == FurnitureState.QUALITY_CHECKED:
                         status_display = "ГОТОВ К УПАКОВКЕ"
@@ -273,78 +406,101 @@ def main():
                         status_display = "НОВЫЙ"
                     
                     customer_info = f" (клиент: {furn.customer})" if hasattr(furn, 'customer') else ""
-                    print(f"  {idx}. {furn.type}{customer_info} - {status_display}")
+                    quantity_info = f" x{furn.quantity}" if furn.is_lot else ""
+                    print(f"  {idx}. {furn.type}{quantity_info}{customer_info} - {status_display}")
+                
+                scheduler = OrderScheduler()
+                for idx, furn in by_id.items():
+                    if furn.status not in (FurnitureState.STORED, FurnitureState.DELIVERED):
+                        scheduler.push(idx, getattr(furn, 'order', None))
+                if len(scheduler):
+                    print(f"Рекомендуемый заказ (ближайший срок): {scheduler.peek()}")
                 
                 prod_id = int(input("ID заказа для производства: "))
-                if prod_id >= len(furnitures):
+                furniture = by_id.get(prod_id)
+                if furniture is None:
                     print("Неверный ID")
                     continue
                 
-                furniture = furnitures[prod_id]
-                
-                if furniture.status == FurnitureState.STORED:
+                if furniture.status in (FurnitureState.STORED, FurnitureState.DELIVERED):
                     print("Этот заказ уже готов и на складе!")
                     continue
                 
+                if not finished_goods.fits(furniture):
+                    # Nothing is started that the finished-goods storage can't take.
+                    print(f"Склад готовой продукции заполнен ({finished_goods}). "
+                          "Отгрузите готовые изделия (пункт 9) и повторите.")
+                    continue
+                
                 print(f"\n--- Начинаем производство {furniture.type} ---")
                 print(f"Текущий статус: {furniture.status.value}")
                 
-                if furniture.status == FurnitureState.CREATED:
-                    print("\nЭТАП 1: Подготовка материалов")
-                    prep_op = PreparationOperation(material_storage, workers, tools)
-                    prep_op.execute(furniture)
-                    input("Нажмите Enter для продолжения...")
-                
-                if furniture.status == FurnitureState.MATERIALS_PREPARED:
-                    print("\nЭТАП 2: Изготовление деталей")
-                    elem_op = CreateElementOperation(material_storage, workers, tools)
-                    elem_op.execute(furniture)
-                    input("Нажмите Enter для продолжения...")
-                
-                if furniture.status == FurnitureState.ELEMENTS_MANUFACTURED:
-                    print("\nЭТАП 3: Сборка")
-                    assembly_op = AssemblyOperation(material_storage, workers)
-                    assembly_op.execute(furniture)
-                    input("Нажмите Enter для продолжения...")
-                
-                if furniture.status == FurnitureState.ASSEMBLED:
-                    print("\nЭТАП 4: Контроль качества")
+                def check(item):
                     inspector = None
                     for w in workers:
                         if w.specialization == "контролер" and not w.is_busy:
                             inspector = w
                             break
-                    
-                    if inspector:
-                        check_op = CheckOperation(inspector, workers)
-                        check_op.execute(furniture)
-                    else:
+                    if not inspector:
                         print("Нет свободного контролера, пропускаем этап")
-                    input("Нажмите Enter для продолжения...")
+                        return None
+                    return CheckOperation(inspector, workers).execute(item)
                 
-                if furniture.status == FurnitureState.QUALITY_CHECKED:
-                    print("\nЭТАП 5: Упаковка")
-                    packer = None
-                    for w in workers:
-                        if not w.is_busy:
-                            packer = w
-                            break
-                    
+                def pack(item):
+                    packer = pick_worker(workers, item.status)
                     if packer:
-                        pack_op = PackingOperation(packer, workers)
-                        pack_op.execute(furniture)
+                        PackingOperation(packer, workers, material_storage).execute(item)
                     else:
                         print("Нет свободного рабочего для упаковки")
-                    input("Нажмите Enter для продолжения...")
                 
-                if furniture.status == FurnitureState.PACKED:
-                    print("\nЭТАП 6: Доставка на склад")
-                    furniture.change_status(FurnitureState.STORED)
-                    workshop.add_completed_furniture(furniture)
-                    print(f"{furniture.type} готов и отправлен на склад!")
+                def store(item):
+                    if finished_goods.put(item):
+                        item.change_status(FurnitureState.STORED)
+                        workshop.add_completed_furniture(item)
+                        print(f"{item.type} готов и отправлен на склад!")
+                    else:
+                        print("Склад готовой продукции заполнен: изделие упаковано и ждет места.")
+                
+                def rework(item):
+                    # The reworked part is split off the lot and gets its own number.
+                    item.id = None
+                    furnitures.append(item)
+                    print(f"Брак отправлен на доработку, ID заказа: {workshop.register(item)}")
+                
+                def enter(stage, item):
+                    print(f"\nЭТАП {PRODUCTION.position[stage.name] + 1}: {stage.title}")
                 
-                if furniture.status == FurnitureState.ASSEMBLED:
+                def leave(stage, item, seconds):
+                    if item.status not in PRODUCTION.terminal:
+                        input("Нажмите Enter для продолжения...")
+                
+                # Stages without a handler here run as the pipeline defines them.
+                context = ProductionContext(material_storage, workers, tool_manager, workshop,
+                                            finished_goods, material_storage)
+                engine = PRODUCTION.engine(context, {"check": check, "packing": pack, "storage": store},
+                                           on_enter=enter, on_exit=leave)
+                last = engine.run(furniture, rework, stop_on_retry=True)
+                
+                if last is not None and last.retry is not None and furniture.status in (last.state, last.retry):
                     print("\nКачество не пройдено. Запустите производство еще раз для этого же заказа.")
+                
+                for message in tool_manager.run_repairs():
+                    print(f"Плановый ремонт: {message}")
+            
+            elif choice == "8":
+                path = input("Путь к файлу: ").strip()
+                imported_from = len(furnitures)
+                report = OrderImporter(customers, furnitures).import_file(path)
+                for item in furnitures[imported_from:]:
+                    stats.track_furniture(item)
+                print(f"Импортировано заказов: {report.imported}, отклонено: {report.rejected}")
+                print(f"Новых клиентов: {report.new_customers}, скорость: {report.rate:,.0f} строк/с")
+                for line, message in report.errors[:10]:
+                    print(f"   строка {line}: {message}")
+            
+            elif choice == "9":
+                shipped = finished_goods.ship(furnitures)
+                print(f"Отгружено изделий: {len(shipped)}. {finished_goods}")
             
             elif choice == "3":
                 print("\n" + "=" * 40)
@@ -358,7 +514,20 @@ def main():
                 else:
                     print("Склад пуст")
                 
-                print(f"\nВсего изделий: {len(workshop.completed_furnitures)}")
+                print(f"\nВсего изделий: {workshop.get_completed_count()}")
+                if workshop.archive is not None and len(workshop.archive):
+                    print(f"В архиве: {len(workshop.archive)} (" + ", ".join(
+                        f"{prod_type} {count}" for prod_type, count in workshop.archive.count_by_type().items()) + ")")
+                print("Заказы по этапам: " + ", ".join(
+                    f"{state.value} {count}" for state, count in stats.state_counts.items() if count))
+                print("Заказы по изделиям: " + ", ".join(
+                    f"{prod_type} {count}" for prod_type, count in stats.type_counts.items()))
+                for name, total, capacity in stats.warehouse_fill():
+                    print(f"{name}: заполнен на {total / capacity:.0%} ({total:g}/{capacity:g})")
+                
+                shortages = PackingOperation(None, workers, material_storage).forecast(furnitures)
+                for (_, grade), need, have in shortages:
+                    print(f"Не хватит упаковки {grade}: нужно {need}, на складе {have}")
             
             elif choice == "4":
                 print("\n" + "=" * 40)
@@ -370,7 +539,7 @@ def main():
                 else:
                     for idx, customer in enumerate(customers):
                         print(f"\n{idx+1}. {customer.name} | {customer.phone}")
-                        customer_orders = [f for f in furnitures if hasattr(f, 'customer') and f.customer == customer.name]
+                        customer_orders = stats.orders_of(customer.name)
                         if customer_orders:
                             for order in customer_orders:
                                 status_display = "ГОТОВ" if order.status == FurnitureState.STORED else "В ПРОИЗВОДСТВЕ"
@@ -382,6 +551,7 @@ def main():
                 print("\n" + "=" * 40)
                 print("РАБОТНИКИ")
                 print("=" * 40)
+                print(f"Заняты: {stats.busy_workers}, свободны: {stats.free_workers}")
                 
                 for idx, worker in enumerate(workers):
                     status = "ЗАНЯТ" if worker.is_busy else "СВОБОДЕН"
@@ -394,6 +564,8 @@ def main():
                 print("\n" + "=" * 40)
                 print("ИНСТРУМЕНТЫ")
                 print("=" * 40)
+                if stats.worn_tools:
+                    print("Требуют ремонта: " + ", ".join(tool.name for tool in stats.worn_tools.values()))
                 
                 for idx, tool in enumerate(tools):
                     status = "СЛОМАН" if tool.is_broken else "ИСПРАВЕН"
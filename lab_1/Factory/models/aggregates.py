@@ -0,0 +1,96 @@
+from typing import Dict, Iterable, List, Tuple
+from .furniture import Furniture, FurnitureState
+from .people import Worker
+from .tool import Tool
+from .warehouse import Warehouse
+
+
+class ReportAggregates:
+    def __init__(self, repair_threshold: int = 10):
+        self.repair_threshold = repair_threshold
+        self.state_counts: Dict[FurnitureState, int] = {state: 0 for state in FurnitureState}
+        self.type_counts: Dict[str, int] = {}
+        self.by_customer: Dict[str, List[Furniture]] = {}
+        self.workers = 0
+        self.busy_workers = 0
+        self.tools = 0
+        # Insertion-ordered, so the view lists worn tools in a stable order.
+        self.worn_tools: Dict[int, Tool] = {}
+        self.warehouses: List[Warehouse] = []
+
+    def watch(self, furnitures: Iterable[Furniture] = (), workers: Iterable[Worker] = (),
+              tools: Iterable[Tool] = (), warehouses: Iterable[Warehouse] = ()) -> "ReportAggregates":
+        for furniture in furnitures:
+            self.track_furniture(furniture)
+        for worker in workers:
+            self.track_worker(worker)
+        for tool in tools:
+            self.track_tool(tool)
+        self.warehouses.extend(warehouses)
+        return self
+
+    def track_furniture(self, furniture: Furniture) -> None:
+        if furniture._observer is self:
+            return
+        furniture._observer = self
+        self.state_counts[furniture.status] += 1
+        self.type_counts[furniture.type] = self.type_counts.get(furniture.type, 0) + 1
+        customer = getattr(furniture, "customer", None)
+        if customer:
+            self.by_customer.setdefault(customer, []).append(furniture)
+
+    def forget(self, furnitures: List[Furniture]) -> None:
+        # Archived items keep their place in the counts but leave the per-customer lists.
+        gone = {id(furniture) for furniture in furnitures}
+        for customer in {getattr(furniture, "customer", None) for furniture in furnitures}:
+            if customer in self.by_customer:
+                self.by_customer[customer] = [f for f in self.by_customer[customer] if id(f) not in gone]
+
+    def track_worker(self, worker: Worker) -> None:
+        if worker._observer is self:
+            return
+        worker._observer = self
+        self.workers += 1
+        self.busy_workers += worker.is_busy
+
+    def track_tool(self, tool: Tool) -> None:
+        if tool._observer is self:
+            return
+        tool._observer = self
+        self.tools += 1
+        self.tool_changed(tool)
+
+    def status_changed(self, furniture: Furniture, old: FurnitureState, new: FurnitureState) -> None:
+        if old is not None:
+            self.state_counts[old] -= 1
+        self.state_counts[new] += 1
+
+    def worker_changed(self, worker: Worker) -> None:
+        self.busy_workers += 1 if worker.is_busy else -1
+
+    def tool_changed(self, tool: Tool) -> None:
+        if tool.is_broken or tool.durability <= self.repair_threshold:
+            self.worn_tools[id(tool)] = tool
+        else:
+            self.worn_tools.pop(id(tool), None)
+
+    @property
+    def free_workers(self) -> int:
+        return self.workers - self.busy_workers
+
+    def orders_of(self, customer: str) -> List[Furniture]:
+        return self.by_customer.get(customer, [])
+
+    def warehouse_fill(self) -> List[Tuple[str, float, float]]:
+        return [(warehouse.name, warehouse.total_amount, warehouse.capacity) for warehouse in self.warehouses]
+
+    def summary(self) -> dict:
+        return {
+            "states": {state.value: count for state, count in self.state_counts.items() if count},
+            "types": dict(self.type_counts),
+            "customers": len(self.by_customer),
+            "busy_workers": self.busy_workers,
+            "free_workers": self.free_workers,
+            "worn_tools": [tool.name for tool in self.worn_tools.values()],
+            "warehouses": {name: total / capacity for name, total, capacity in self.warehouse_fill()},
+        }
@@ -0,0 +1,162 @@
+import mmap
+import os
+import struct
+from array import array
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from .furniture import Furniture, FurnitureState
+from .exceptions import InvalidDataError
+
+MAGIC = b"FARC"
+VERSION = 2
+HEADER = struct.Struct("<4sHHQ")
+# Order id, completed_at, quantity, status, then type and customer as padded UTF-8.
+RECORD = struct.Struct("<qdIB32s48s")
+STATUS_CODES = {state: code for code, state in enumerate(FurnitureState)}
+STATUSES = list(FurnitureState)
+GROW_RECORDS = 4096
+
+
+def _pack_text(value: str, size: int) -> bytes:
+    data = value.encode("utf-8")
+    if len(data) <= size:
+        return data
+    # Cut on a character boundary so the stored prefix still decodes.
+    return data[:size].decode("utf-8", "ignore").encode("utf-8")
+
+
+class ArchivedFurniture:
+    __slots__ = ("id", "type", "customer", "quantity", "status", "completed_at")
+
+    def __init__(self, id: int, type: str, customer: str, quantity: int,
+                 status: FurnitureState, completed_at: datetime):
+        self.id = id
+        self.type = type
+        self.customer = customer
+        self.quantity = quantity
+        self.status = status
+        self.completed_at = completed_at
+
+    def __str__(self) -> str:
+        customer = f" (клиент: {self.customer})" if self.customer else ""
+        return f"#{self.id} {self.type} x{self.quantity}{customer}, {self.status.value}, {self.completed_at:%Y-%m-%d %H:%M}"
+
+
+class FurnitureArchive:
+    # Records have a fixed size, so reading one is one slice of the mapped file.
+    # Lookups by order id bisect the ids sorted once after the last append;
+    # customer and type lookups go through postings of record numbers, four
+    # bytes per item per index.
+    def __init__(self, path: str):
+        self.path = path
+        self._by_customer: Dict[str, array] = {}
+        self._by_type: Dict[str, array] = {}
+        self._ids = array('q')
+        self._sorted: Optional[List[int]] = None
+        self.units = 0
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER.size
+        self._file = open(path, "r+b" if exists else "w+b")
+        if exists:
+            magic, version, size, count = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or size != RECORD.size:
+                self._file.close()
+                raise InvalidDataError(f"{path} is not a furniture archive")
+        else:
+            count = 0
+            self._file.truncate(HEADER.size + RECORD.size * GROW_RECORDS)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._count = count
+        for number in range(count):
+            item = self._read(number)
+            self._index(number, item.id, item.type, item.customer, item.quantity)
+        if not exists:
+            self._write_header()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _capacity(self) -> int:
+        return (len(self._map) - HEADER.size) // RECORD.size
+
+    def _write_header(self) -> None:
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, RECORD.size, self._count)
+
+    def _read(self, number: int) -> ArchivedFurniture:
+        id, completed_at, quantity, status, type, customer = RECORD.unpack_from(
+            self._map, HEADER.size + number * RECORD.size)
+        return ArchivedFurniture(id, type.rstrip(b"\0").decode("utf-8"), customer.rstrip(b"\0").decode("utf-8"),
+                                 quantity, STATUSES[status], datetime.fromtimestamp(completed_at))
+
+    def _index(self, number: int, id: int, type: str, customer: str, quantity: int) -> None:
+        self._ids.append(id)
+        self._sorted = None
+        self._by_type.setdefault(type, array('I')).append(number)
+        if customer:
+            self._by_customer.setdefault(customer, array('I')).append(number)
+        self.units += quantity
+
+    def append(self, furniture: Furniture, completed_at: datetime = None) -> int:
+        # Items without an order id are archived under their record number.
+        if self._count == self._capacity():
+            self._map.resize(len(self._map) + RECORD.size * max(GROW_RECORDS, self._count // 2))
+        completed_at = completed_at or getattr(furniture, "completed_at", None) or datetime.now()
+        type = _pack_text(furniture.type, 32)
+        customer = _pack_text(getattr(furniture, "customer", "") or "", 48)
+        number = self._count
+        id = getattr(furniture, "id", None)
+        if id is None:
+            id = number
+        RECORD.pack_into(self._map, HEADER.size + number * RECORD.size, id, completed_at.timestamp(),
+                         furniture.quantity, STATUS_CODES[furniture.status], type, customer)
+        self._count += 1
+        self._write_header()
+        self._index(number, id, type.decode("utf-8"), customer.decode("utf-8"), furniture.quantity)
+        return number
+
+    def find(self, id: int) -> Optional[ArchivedFurniture]:
+        if self._sorted is None:
+            self._sorted = sorted(range(self._count), key=self._ids.__getitem__)
+        ids, order = self._ids, self._sorted
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if ids[order[middle]] < id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(order) and ids[order[low]] == id:
+            return self._read(order[low])
+        return None
+
+    def get(self, id: int) -> ArchivedFurniture:
+        item = self.find(id)
+        if item is None:
+            raise InvalidDataError(f"No archived item #{id}")
+        return item
+
+    def by_customer(self, customer: str) -> List[ArchivedFurniture]:
+        return [self._read(number) for number in self._by_customer.get(customer, ())]
+
+    def by_type(self, type: str) -> List[ArchivedFurniture]:
+        return [self._read(number) for number in self._by_type.get(type, ())]
+
+    def count_by_type(self) -> Dict[str, int]:
+        return {type: len(numbers) for type, numbers in self._by_type.items()}
+
+    def __iter__(self) -> Iterator[ArchivedFurniture]:
+        return (self._read(number) for number in range(self._count))
+
+    def flush(self) -> None:
+        self._map.flush()
+
+    def close(self) -> None:
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+
+    def __enter__(self) -> "FurnitureArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,113 @@
+import gc
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Sequence, Type
+from .material import Material, Metal, Wood, RawMaterial
+from .furniture import Furniture, FurnitureState
+from .people import Worker, Customer
+from .tool import Tool
+from .exceptions import InvalidDataError, InvalidAmountError
+
+# Bulk factories for data that is loaded in large batches (saves, imports).
+# Each column is validated once with set/min/max checks, then the objects are
+# built through the trusted constructors that skip the property setters.
+
+STATES = {state.value: state for state in FurnitureState}
+MATERIAL_CLASSES = {"metal": Metal, "wood": Wood}
+
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    # Bulk-loaded objects are long-lived and acyclic, so collections during the
+    # build only rescan them. The caller's GC state is restored on the way out.
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
+
+
+def _fail(values: Sequence[Any], ok: Callable[[Any], bool], message: str,
+          error: Type[Exception] = InvalidDataError) -> None:
+    index = next(i for i, value in enumerate(values) if not ok(value))
+    raise error(f"{message} (record {index + 1}: {values[index]!r})")
+
+
+def check_text(values: Sequence[Any], field: str) -> None:
+    if not set(map(type, values)) <= {str}:
+        _fail(values, lambda v: type(v) is str, f"{field} must be a string")
+    if not all(values):
+        _fail(values, bool, f"{field} can't be empty")
+
+
+def check_ints(values: Sequence[Any], field: str, minimum: int, maximum: int = None,
+               error: Type[Exception] = InvalidAmountError) -> None:
+    if not set(map(type, values)) <= {int}:
+        _fail(values, lambda v: type(v) is int, f"{field} must be an integer", error)
+    if values and (min(values) < minimum or (maximum is not None and max(values) > maximum)):
+        _fail(values, lambda v: minimum <= v and (maximum is None or v <= maximum),
+              f"{field} out of range", error)
+
+
+def check_amounts(values: Sequence[Any], field: str) -> None:
+    if not set(map(type, values)) <= {int, float}:
+        _fail(values, lambda v: type(v) in (int, float), f"{field} must be a number", InvalidAmountError)
+    if values and min(values) <= 0:
+        _fail(values, lambda v: v > 0, f"{field} must be positive", InvalidAmountError)
+
+
+def make_tools(names: Sequence[str], durabilities: Sequence[int]) -> List[Tool]:
+    check_text(names, "Tool name")
+    check_ints(durabilities, "Durability", 1)
+    return list(map(Tool.trusted, names, durabilities))
+
+
+def make_workers(names: Sequence[str], ages: Sequence[int], specializations: Sequence[str],
+                 experiences: Sequence[int], busy: Sequence[bool] = None) -> List[Worker]:
+    check_text(names, "Name")
+    check_ints(ages, "Age", 0, 150, InvalidDataError)
+    check_text(specializations, "Specialization")
+    busy = busy if busy is not None else [False] * len(names)
+    if not set(map(type, busy)) <= {bool}:
+        _fail(busy, lambda v: type(v) is bool, "is_busy must be a boolean")
+    return list(map(Worker.trusted, names, ages, specializations, experiences, busy))
+
+
+def make_customers(names: Sequence[str], ages: Sequence[int], phones: Sequence[str]) -> List[Customer]:
+    check_text(names, "Name")
+    check_ints(ages, "Age", 0, 150, InvalidDataError)
+    check_text(phones, "Phone number")
+    return list(map(Customer.trusted, names, ages, phones))
+
+
+def make_materials(kinds: Sequence[str], grades: Sequence[str], amounts: Sequence[float]) -> List[Material]:
+    check_text(kinds, "Material kind")
+    check_text(grades, "Material type")
+    check_amounts(amounts, "Amount")
+    return [MATERIAL_CLASSES[kind].trusted(grade, amount) if kind in MATERIAL_CLASSES
+            else RawMaterial.trusted(kind.lower(), grade, amount)
+            for kind, grade, amount in zip(kinds, grades, amounts)]
+
+
+def make_material_lists(rows: Sequence[tuple]) -> List[List[Material]]:
+    # One list per item from its (kind, grade, amount) rows. Items with the
+    # same rows share a list: operations only read an item's materials.
+    recipes = dict.fromkeys(rows)
+    flat = [row for key in recipes for row in key]
+    materials = make_materials([kind for kind, _, _ in flat], [grade for _, grade, _ in flat],
+                               [amount for _, _, amount in flat])
+    start = 0
+    for key in recipes:
+        recipes[key] = materials[start:start + len(key)]
+        start += len(key)
+    return [recipes[key] for key in rows]
+
+
+def make_furnitures(types: Sequence[str], materials: Sequence[List[Material]],
+                    quantities: Sequence[int], statuses: Sequence[str]) -> List[Furniture]:
+    check_text(types, "Furniture type")
+    check_ints(quantities, "Quantity", 1)
+    if not set(statuses) <= STATES.keys():
+        _fail(statuses, STATES.__contains__, "Unknown furniture status")
+    return list(map(Furniture.trusted, types, materials, quantities, map(STATES.__getitem__, statuses)))
@@ -8,4 +8,10 @@ class InvalidAmountError(Exception):
 
 class InvalidOperation(Exception):
     def __init__(self,msg:str)->None:
-        super().__init__(msg)
\ No newline at end of file
+        super().__init__(msg)
+
+class ShortageError(InvalidAmountError):
+    # Raised when the stock can't cover a bill; the other InvalidAmountErrors
+    # are bad amounts or missing workers and tools.
+    def __init__(self,msg:str)->None:
+        super().__init__(msg)
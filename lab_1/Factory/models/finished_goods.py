@@ -0,0 +1,80 @@
+from typing import Dict, Iterable, List
+from .furniture import Furniture, FurnitureState
+from .warehouse import Warehouse
+from .recipes import item_load
+
+FINISHED_KIND = "finished"
+
+
+class FinishedGoodsStore:
+    # Stored goods are booked in the warehouse ledger as load units under the
+    # "finished" kind, one grade per furniture type, so they are saved with it.
+    def __init__(self, warehouse: Warehouse):
+        self.warehouse = warehouse
+        self._reserved: Dict[int, float] = {}
+        self.reserved = 0.0
+
+    @property
+    def capacity(self) -> float:
+        return self.warehouse.capacity
+
+    @property
+    def used(self) -> float:
+        return self.warehouse.amount(FINISHED_KIND)
+
+    @property
+    def free(self) -> float:
+        return self.capacity - self.warehouse.total_amount - self.reserved
+
+    def fits(self, furniture: Furniture) -> bool:
+        return self._reserved.get(id(furniture), 0.0) >= item_load(furniture) or item_load(furniture) <= self.free
+
+    def reserve(self, furniture: Furniture) -> bool:
+        # Taken when production of an item starts, so nothing is made that
+        # could not be stored.
+        if id(furniture) in self._reserved:
+            return True
+        load = item_load(furniture)
+        if load > self.free:
+            return False
+        self._reserved[id(furniture)] = load
+        self.reserved += load
+        return True
+
+    def split_reservation(self, furniture: Furniture, part: Furniture) -> None:
+        held = self._reserved.get(id(furniture))
+        if held is None:
+            return
+        moved = min(held, item_load(part))
+        self._reserved[id(furniture)] = held - moved
+        self._reserved[id(part)] = moved
+
+    def cancel(self, furniture: Furniture) -> None:
+        self.reserved -= self._reserved.pop(id(furniture), 0.0)
+
+    def put(self, furniture: Furniture) -> bool:
+        if not self.fits(furniture):
+            return False
+        self.cancel(furniture)
+        self.warehouse.ledger.add(FINISHED_KIND, furniture.type, item_load(furniture))
+        return True
+
+    def release(self, furniture: Furniture) -> float:
+        load = min(item_load(furniture), self.warehouse.amount(FINISHED_KIND, furniture.type))
+        if load > 0:
+            self.warehouse.ledger.remove(FINISHED_KIND, load, furniture.type)
+        return load
+
+    def ship(self, furnitures: Iterable[Furniture]) -> List[Furniture]:
+        shipped = []
+        for furniture in furnitures:
+            if furniture.status != FurnitureState.STORED:
+                continue
+            self.release(furniture)
+            furniture.change_status(FurnitureState.DELIVERED)
+            shipped.append(furniture)
+        return shipped
+
+    def __str__(self) -> str:
+        return (f"{self.warehouse.name}: {self.used:g}/{self.capacity:g} units stored, "
+                f"{self.reserved:g} reserved")
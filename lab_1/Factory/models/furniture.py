@@ -1,7 +1,7 @@
 from enum import Enum
 from typing import List
 from .material import Material
-from .exceptions import InvalidDataError
+from .exceptions import InvalidDataError, InvalidAmountError
 
 class FurnitureState(Enum):
     CREATED = "Created"
@@ -14,10 +14,23 @@ class FurnitureState(Enum):
     DELIVERED= "Delivered"
 
 class Furniture:
-    def __init__(self, type: str, materials: List[Material]):
+    _observer = None
+
+    def __init__(self, type: str, materials: List[Material], quantity: int = 1):
         self.type = type
         self.materials = materials
+        self.quantity = quantity
         self.status: FurnitureState = FurnitureState.CREATED
+
+    @classmethod
+    def trusted(cls, type: str, materials: List[Material], quantity: int = 1,
+                status: FurnitureState = FurnitureState.CREATED) -> "Furniture":
+        furniture = cls.__new__(cls)
+        furniture._type = type
+        furniture.materials = materials
+        furniture._quantity = quantity
+        furniture._status = status
+        return furniture
     @property
     def type(self)->str:
         return self._type
@@ -33,7 +46,23 @@ class Furniture:
     def status(self,value:FurnitureState):
         if not isinstance(value,FurnitureState):
             raise InvalidDataError("Status must be from FurnitureState")
+        old=getattr(self,'_status',None)
         self._status=value
+        if self._observer is not None and old is not value:
+            self._observer.status_changed(self,old,value)
+    @property
+    def quantity(self)->int:
+        return self._quantity
+    @quantity.setter
+    def quantity(self,value:int):
+        if not isinstance(value,int) or isinstance(value,bool):
+            raise InvalidAmountError("Quantity must be an integer")
+        if value<=0:
+            raise InvalidAmountError("Quantity must be positive")
+        self._quantity=value
+    @property
+    def is_lot(self)->bool:
+        return self._quantity>1
     @property
     def material_count(self)->int:
         return len(self.materials)
@@ -50,4 +79,17 @@ class Furniture:
     def change_status(self, new_status: FurnitureState) -> None:
         self.status = new_status
 
+    def split(self, quantity: int) -> "Furniture":
+        if not isinstance(quantity,int) or not 0 < quantity < self._quantity:
+            raise InvalidAmountError(f"Can split off 1..{self._quantity - 1} items, got {quantity}")
+        part = Furniture(self._type, self.materials, quantity)
+        for key, value in vars(self).items():
+            if not key.startswith('_'):
+                setattr(part, key, value)
+        part.status = self._status
+        self._quantity -= quantity
+        if self._observer is not None:
+            self._observer.track_furniture(part)
+        return part
+
     
@@ -0,0 +1,109 @@
+import time
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple, Union
+from .ledger import Key
+from .exceptions import InvalidDataError
+
+Moment = Union[float, datetime]
+
+
+def _seconds(moment: Moment) -> float:
+    return moment.timestamp() if isinstance(moment, datetime) else float(moment)
+
+
+class InventoryHistory:
+    def __init__(self, keys: Callable[[], List[Key]], checkpoint_every: int = 256,
+                 clock: Callable[[], Moment] = time.time):
+        if checkpoint_every < 1:
+            raise InvalidDataError("Checkpoint interval must be positive")
+        self._keys = keys
+        self.checkpoint_every = checkpoint_every
+        self.clock = clock
+        self._times = array('d')
+        self._slots = array('l')
+        self._deltas = array('d')
+        self._level = array('d')
+        self._outflow = array('d')
+        # Stock and cumulative outflow before every checkpoint_every-th delta.
+        self._checkpoints: List[Tuple[array, array]] = []
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def record(self, slot: int, delta: float) -> None:
+        at = _seconds(self.clock())
+        times = self._times
+        if times and at < times[-1]:
+            at = times[-1]
+        if len(times) % self.checkpoint_every == 0:
+            self._checkpoints.append((array('d', self._level), array('d', self._outflow)))
+        times.append(at)
+        self._slots.append(slot)
+        self._deltas.append(delta)
+        if slot >= len(self._level):
+            grow = slot + 1 - len(self._level)
+            self._level.extend([0.0] * grow)
+            self._outflow.extend([0.0] * grow)
+        self._level[slot] += delta
+        if delta < 0:
+            self._outflow[slot] -= delta
+
+    def _state(self, moment: Moment) -> Tuple[array, array]:
+        end = bisect_right(self._times, _seconds(moment))
+        checkpoint = end // self.checkpoint_every
+        if checkpoint >= len(self._checkpoints):
+            return array('d', self._level), array('d', self._outflow)
+        saved_level, saved_outflow = self._checkpoints[checkpoint]
+        size = len(self._level)
+        level = array('d', saved_level)
+        outflow = array('d', saved_outflow)
+        level.extend([0.0] * (size - len(level)))
+        outflow.extend([0.0] * (size - len(outflow)))
+        for i in range(checkpoint * self.checkpoint_every, end):
+            slot, delta = self._slots[i], self._deltas[i]
+            level[slot] += delta
+            if delta < 0:
+                outflow[slot] -= delta
+        return level, outflow
+
+    def _matching(self, kind: str, grade: str = None) -> List[int]:
+        return [i for i, (slot_kind, slot_grade) in enumerate(self._keys()[:len(self._level)])
+                if slot_kind == kind and (grade is None or slot_grade == grade)]
+
+    def amount_at(self, kind: str, moment: Moment, grade: str = None) -> float:
+        level, _ = self._state(moment)
+        return sum(level[i] for i in self._matching(kind, grade))
+
+    def snapshot(self, moment: Moment) -> Dict[Key, float]:
+        level, _ = self._state(moment)
+        return dict(zip(self._keys(), level))
+
+    def consumed(self, kind: str, start: Moment, end: Moment, grade: str = None) -> float:
+        _, before = self._state(start)
+        _, after = self._state(end)
+        return sum(after[i] - before[i] for i in self._matching(kind, grade))
+
+    def outflow_series(self, start: Moment, period: float, count: int) -> List[array]:
+        # Outflow of every slot in each of `count` periods from `start`: the
+        # consumption history a demand forecast is fitted to.
+        if period <= 0 or count < 0:
+            raise InvalidDataError("Periods must have a positive length")
+        start = _seconds(start)
+        _, previous = self._state(start)
+        series = []
+        for number in range(1, count + 1):
+            _, current = self._state(start + number * period)
+            series.append(array('d', [after - before for after, before in zip(current, previous)]))
+            previous = current
+        return series
+
+    def consumption_rates(self, start: Moment, end: Moment, per: float = 3600.0) -> Dict[Key, float]:
+        span = _seconds(end) - _seconds(start)
+        if span <= 0:
+            raise InvalidDataError("Report period must end after it starts")
+        _, before = self._state(start)
+        _, after = self._state(end)
+        return {key: (after[i] - before[i]) * per / span
+                for i, key in enumerate(self._keys()[:len(after)]) if after[i] != before[i]}
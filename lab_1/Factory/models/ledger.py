@@ -0,0 +1,198 @@
+from array import array
+from operator import ge
+from typing import Dict, Iterator, List, Sequence, Tuple
+from .material import Material
+from .exceptions import InvalidAmountError, InvalidDataError, ShortageError
+
+Key = Tuple[str, str]
+UNGRADED = ""
+
+
+def describe_shortage(shortage: Tuple[Key, float, float]) -> str:
+    (kind, grade), need, have = shortage
+    label = f"{kind} ({grade})" if grade else kind
+    return f"Not enough {label}. Need {need}, have {have}"
+
+
+class Bill:
+    __slots__ = ("slots", "amounts", "keys")
+
+    def __init__(self, slots: array, amounts: array, keys: List[Key]):
+        self.slots = slots
+        self.amounts = amounts
+        self.keys = keys
+
+    def by_kind(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for (kind, _), amount in zip(self.keys, self.amounts):
+            totals[kind] = totals.get(kind, 0.0) + amount
+        return totals
+
+    def __iter__(self) -> Iterator[Tuple[Key, float]]:
+        return iter(zip(self.keys, self.amounts))
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __str__(self) -> str:
+        return ", ".join(f"{kind}{f' ({grade})' if grade else ''}: {amount}" for (kind, grade), amount in self)
+
+
+class MaterialLedger:
+    def __init__(self):
+        self._slots: Dict[Key, int] = {}
+        self._keys: List[Key] = []
+        self._amounts = array('d')
+        self.version = 0
+        self.history = None
+
+    def slot(self, kind: str, grade: str = UNGRADED) -> int:
+        key = (kind, grade)
+        index = self._slots.get(key)
+        if index is None:
+            if not kind:
+                raise InvalidDataError("Material kind can't be empty")
+            index = self._slots[key] = len(self._keys)
+            self._keys.append(key)
+            self._amounts.append(0.0)
+        return index
+
+    @property
+    def keys(self) -> List[Key]:
+        return list(self._keys)
+
+    def items(self) -> Iterator[Tuple[Key, float]]:
+        return iter(zip(self._keys, self._amounts))
+
+    def vector(self) -> array:
+        return array('d', self._amounts)
+
+    def total(self) -> float:
+        return sum(self._amounts)
+
+    def amount(self, kind: str, grade: str = None) -> float:
+        if grade is not None:
+            index = self._slots.get((kind, grade))
+            return self._amounts[index] if index is not None else 0.0
+        return self.kind_total(kind)
+
+    def kind_total(self, kind: str) -> float:
+        return sum(amount for (slot_kind, _), amount in zip(self._keys, self._amounts) if slot_kind == kind)
+
+    def kinds(self) -> List[str]:
+        return list(dict.fromkeys(kind for kind, _ in self._keys))
+
+    def add(self, kind: str, grade: str, amount: float) -> None:
+        if amount < 0:
+            raise InvalidAmountError("Amount can't be negative")
+        index = self.slot(kind, grade)
+        self._amounts[index] += amount
+        self.version += 1
+        if self.history is not None:
+            self.history.record(index, amount)
+
+    def remove(self, kind: str, amount: float, grade: str = None) -> None:
+        if grade is not None:
+            index = self._slots.get((kind, grade))
+            have = self._amounts[index] if index is not None else 0.0
+            if amount > have:
+                raise ShortageError(f"Not enough {kind} ({grade}). Have: {have}, Need: {amount}")
+            if index is not None:
+                self._amounts[index] -= amount
+                self.version += 1
+                if self.history is not None:
+                    self.history.record(index, -amount)
+            return
+        have = self.kind_total(kind)
+        if amount > have:
+            raise ShortageError(f"Not enough {kind}. Have: {have}, Need: {amount}")
+        for index in self._kind_slots(kind):
+            taken = min(amount, self._amounts[index])
+            self._amounts[index] -= taken
+            amount -= taken
+            if self.history is not None and taken:
+                self.history.record(index, -taken)
+            if amount <= 0:
+                break
+        self.version += 1
+
+    def set_kind_total(self, kind: str, value: float) -> None:
+        if value is None or value < 0:
+            raise InvalidAmountError("Amount can't be negative")
+        difference = value - self.kind_total(kind)
+        if difference >= 0:
+            self.add(kind, UNGRADED, difference)
+        else:
+            self.remove(kind, -difference)
+
+    def _kind_slots(self, kind: str) -> List[int]:
+        ungraded = self._slots.get((kind, UNGRADED))
+        graded = [i for i, (slot_kind, grade) in enumerate(self._keys) if slot_kind == kind and grade]
+        return ([ungraded] if ungraded is not None else []) + graded
+
+    def bill(self, materials: Sequence[Material], quantity: int = 1) -> Bill:
+        # A graded need is drawn from its own slot first; what that slot can't
+        # cover comes from the kind's ungraded stock (wood_amount, metal_amount).
+        graded: Dict[Key, float] = {}
+        for material in materials:
+            key = (material.kind, getattr(material, "type", UNGRADED))
+            graded[key] = graded.get(key, 0.0) + material.amount * quantity
+        needs: Dict[int, float] = {}
+        slots, amounts = self._slots, self._amounts
+        for (kind, grade), need in graded.items():
+            index = slots.get((kind, grade))
+            ungraded = slots.get((kind, UNGRADED)) if grade else None
+            if index is None and ungraded is None:
+                index = self.slot(kind, grade)
+            if index is not None and ungraded is not None and index != ungraded:
+                own = min(need, max(amounts[index], 0.0))
+                if own:
+                    needs[index] = needs.get(index, 0.0) + own
+                need -= own
+                index = ungraded
+            elif index is None:
+                index = ungraded
+            if need:
+                needs[index] = needs.get(index, 0.0) + need
+        indices = array('l', needs)
+        return Bill(indices, array('d', needs.values()), [self._keys[i] for i in indices])
+
+    def bill_from_vector(self, vector: Sequence[float]) -> Bill:
+        slots = array('l', (i for i, amount in enumerate(vector) if amount))
+        return Bill(slots, array('d', (vector[i] for i in slots)), [self._keys[i] for i in slots])
+
+    def can_fulfill(self, bill: Bill) -> bool:
+        return all(map(ge, map(self._amounts.__getitem__, bill.slots), bill.amounts))
+
+    def shortages(self, bill: Bill) -> List[Tuple[Key, float, float]]:
+        amounts = self._amounts
+        return [(key, need, amounts[index])
+                for index, need, key in zip(bill.slots, bill.amounts, bill.keys)
+                if need > amounts[index]]
+
+    def consume(self, bill: Bill) -> None:
+        if not self.can_fulfill(bill):
+            raise ShortageError(describe_shortage(self.shortages(bill)[0]))
+        amounts = self._amounts
+        for index, need in zip(bill.slots, bill.amounts):
+            amounts[index] -= need
+        self.version += 1
+        if self.history is not None:
+            for index, need in zip(bill.slots, bill.amounts):
+                self.history.record(index, -need)
+
+    def restore(self, bill: Bill) -> None:
+        amounts = self._amounts
+        for index, need in zip(bill.slots, bill.amounts):
+            amounts[index] += need
+        self.version += 1
+        if self.history is not None:
+            for index, need in zip(bill.slots, bill.amounts):
+                self.history.record(index, need)
+
+    def copy_layout(self, amounts: Sequence[float] = None) -> "MaterialLedger":
+        ledger = MaterialLedger()
+        ledger._slots = dict(self._slots)
+        ledger._keys = list(self._keys)
+        ledger._amounts = array('d', amounts if amounts is not None else [0.0] * len(self._keys))
+        return ledger
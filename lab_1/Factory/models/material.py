@@ -5,6 +5,7 @@ from .exceptions import InvalidDataError,InvalidAmountError
 
 
 class Material(ABC):
+    kind = "material"
     def __init__(self,amount:float):
         self.amount=amount
         self._is_busy=False
@@ -28,10 +29,19 @@ class Material(ABC):
         self._is_busy=value
 
 class Metal(Material):
+    kind = "metal"
     def __init__(self, type: str, amount: float):
         super().__init__(amount)
         self.type=type
 
+    @classmethod
+    def trusted(cls, type: str, amount: float) -> "Metal":
+        material = cls.__new__(cls)
+        material._amount = amount
+        material._is_busy = False
+        material._type = type
+        return material
+
     @property
     def type(self)->str:
         return self._type
@@ -46,9 +56,18 @@ class Metal(Material):
         return f'Metal type: {self.type}, amount: {self.amount}'
 
 class Wood(Material):
+    kind = "wood"
     def __init__(self,type:str,amount:float):
         super().__init__(amount)
         self.type=type
+
+    @classmethod
+    def trusted(cls, type: str, amount: float) -> "Wood":
+        material = cls.__new__(cls)
+        material._amount = amount
+        material._is_busy = False
+        material._type = type
+        return material
     @property
     def type(self)->str:
         return self._type
@@ -61,3 +80,41 @@ class Wood(Material):
     
     def __str__(self) -> str:
         return f'Wood type: {self.type}, amount: {self.amount}'
+
+class RawMaterial(Material):
+    def __init__(self, kind: str, type: str, amount: float):
+        super().__init__(amount)
+        self.kind = kind
+        self.type = type
+
+    @classmethod
+    def trusted(cls, kind: str, type: str, amount: float) -> "RawMaterial":
+        material = cls.__new__(cls)
+        material._amount = amount
+        material._is_busy = False
+        material._kind = kind
+        material._type = type
+        return material
+
+    @property
+    def kind(self) -> str:
+        return self._kind
+
+    @kind.setter
+    def kind(self, value: str):
+        if not value:
+            raise InvalidDataError("Material kind can't be empty")
+        self._kind = value.lower()
+
+    @property
+    def type(self) -> str:
+        return self._type
+
+    @type.setter
+    def type(self, value: str):
+        if not value:
+            raise InvalidDataError("Material type can't be empty")
+        self._type = value
+
+    def __str__(self) -> str:
+        return f'{self._kind.capitalize()} type: {self.type}, amount: {self.amount}'
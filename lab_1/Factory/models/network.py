@@ -0,0 +1,123 @@
+from array import array
+from typing import Dict, List, Sequence, Tuple, Union
+from .material import Material
+from .warehouse import Warehouse
+from .ledger import Bill, Key, MaterialLedger, describe_shortage
+from .exceptions import InvalidDataError, InvalidAmountError, ShortageError
+
+Allocation = List[Tuple[Warehouse, Bill]]
+CostTable = Dict[Union[str, Tuple[str, str]], float]
+
+
+class WarehouseNetwork:
+    def __init__(self, warehouses: Sequence[Warehouse], costs: CostTable = None):
+        if not warehouses:
+            raise InvalidDataError("Warehouse network needs at least one warehouse")
+        names = [warehouse.name for warehouse in warehouses]
+        if len(set(names)) != len(names):
+            raise InvalidDataError("Warehouse names in a network must be unique")
+        self.warehouses: List[Warehouse] = list(warehouses)
+        self.costs: CostTable = dict(costs) if costs else {}
+        self._totals = MaterialLedger()
+        self._versions: tuple = ()
+        self._routes: Dict[str, List[int]] = {}
+
+    @property
+    def name(self) -> str:
+        return " + ".join(warehouse.name for warehouse in self.warehouses)
+
+    def cost(self, warehouse: Warehouse, kind: str) -> float:
+        return self.costs.get((warehouse.name, kind), self.costs.get(warehouse.name, 0.0))
+
+    def set_cost(self, warehouse_name: str, cost: float, kind: str = None) -> None:
+        if cost < 0:
+            raise InvalidAmountError("Cost can't be negative")
+        self.costs[(warehouse_name, kind) if kind else warehouse_name] = cost
+        self._routes.clear()
+
+    def route(self, kind: str) -> List[int]:
+        route = self._routes.get(kind)
+        if route is None:
+            route = self._routes[kind] = sorted(
+                range(len(self.warehouses)), key=lambda i: (self.cost(self.warehouses[i], kind), i))
+        return route
+
+    def _stamp(self) -> tuple:
+        return tuple((id(warehouse.ledger), warehouse.ledger.version) for warehouse in self.warehouses)
+
+    @property
+    def ledger(self) -> MaterialLedger:
+        versions = self._stamp()
+        if versions != self._versions:
+            # Keep the slot layout so vectors taken before a refresh stay comparable.
+            totals = self._totals.copy_layout()
+            for warehouse in self.warehouses:
+                for (kind, grade), amount in warehouse.ledger.items():
+                    totals.add(kind, grade, amount)
+            self._totals = totals
+            self._versions = versions
+        return self._totals
+
+    @property
+    def metal_amount(self) -> float:
+        return self.ledger.kind_total("metal")
+
+    @property
+    def wood_amount(self) -> float:
+        return self.ledger.kind_total("wood")
+
+    @property
+    def total_amount(self) -> float:
+        return self.ledger.total()
+
+    def amount(self, kind: str, grade: str = None) -> float:
+        return self.ledger.amount(kind, grade)
+
+    def bill_of_materials(self, materials: Sequence[Material], quantity: int = 1) -> Bill:
+        return self.ledger.bill(materials, quantity)
+
+    def has_materials(self, bill: Bill) -> bool:
+        return self.ledger.can_fulfill(bill)
+
+    def shortages(self, bill: Bill) -> List[Tuple[Key, float, float]]:
+        return self.ledger.shortages(bill)
+
+    def plan(self, bill: Bill) -> Allocation:
+        if not self.has_materials(bill):
+            raise ShortageError(describe_shortage(self.shortages(bill)[0]))
+        picks: Dict[int, Dict[int, float]] = {}
+        for (kind, grade), need in bill:
+            for position in self.route(kind):
+                ledger = self.warehouses[position].ledger
+                taken = min(need, ledger.amount(kind, grade))
+                if taken > 0:
+                    picks.setdefault(position, {})[ledger.slot(kind, grade)] = taken
+                    need -= taken
+                    if need <= 0:
+                        break
+        allocation = []
+        for position in sorted(picks):
+            source, slots = self.warehouses[position], picks[position]
+            keys = source.ledger.keys
+            indices = array('l', slots)
+            allocation.append((source, Bill(indices, array('d', slots.values()), [keys[i] for i in indices])))
+        return allocation
+
+    def consume(self, bill: Bill) -> Allocation:
+        totals = self.ledger
+        allocation = self.plan(bill)
+        for source, part in allocation:
+            source.consume(part)
+        totals.consume(bill)
+        self._versions = self._stamp()
+        return allocation
+
+    def allocation_cost(self, allocation: Allocation) -> float:
+        return sum(self.cost(source, kind) * amount
+                   for source, part in allocation for (kind, _), amount in part)
+
+    def __str__(self) -> str:
+        lines = [f"Warehouse network: {len(self.warehouses)} warehouses"]
+        for kind in self.ledger.kinds():
+            lines.append(f"{kind.capitalize()}: {self.ledger.kind_total(kind)}")
+        return "\n".join(lines)
@@ -1,8 +1,25 @@
+from datetime import datetime
+from typing import Optional
 from .exceptions import InvalidDataError,InvalidAmountError
 class Order:
-    def __init__(self, type: str, amount: int):
+    def __init__(self, type: str, amount: int, due_date: datetime = None, priority: int = 0,
+                 created_at: datetime = None):
         self.type = type
         self.quantity = amount
+        self.due_date = due_date
+        self.priority = priority
+        self.created_at = created_at if created_at is not None else datetime.now()
+
+    @classmethod
+    def trusted(cls, type: str, amount: int, due_date: Optional[datetime], priority: int,
+                created_at: datetime) -> "Order":
+        order = cls.__new__(cls)
+        order._type = type
+        order.quantity = amount
+        order._due_date = due_date
+        order._priority = priority
+        order._created_at = created_at
+        return order
     @property
     def type(self)->str:
         return self._type
@@ -21,4 +38,33 @@ class Order:
         if value<=0:
             raise InvalidAmountError("Amount must be positive")
         self._amount=value
-    
\ No newline at end of file
+    @property
+    def due_date(self)->Optional[datetime]:
+        return self._due_date
+    @due_date.setter
+    def due_date(self,value:Optional[datetime]):
+        if value is not None and not isinstance(value,datetime):
+            raise InvalidDataError("Due date must be a datetime")
+        self._due_date=value
+    @property
+    def priority(self)->int:
+        return self._priority
+    @priority.setter
+    def priority(self,value:int):
+        if not isinstance(value,int):
+            raise InvalidDataError("Priority must be an integer")
+        if value<0:
+            raise InvalidDataError("Priority can't be negative")
+        self._priority=value
+    @property
+    def created_at(self)->datetime:
+        return self._created_at
+    @created_at.setter
+    def created_at(self,value:datetime):
+        if not isinstance(value,datetime):
+            raise InvalidDataError("Creation time must be a datetime")
+        self._created_at=value
+    def __str__(self)->str:
+        due = self._due_date.strftime('%Y-%m-%d %H:%M') if self._due_date else "no deadline"
+        return f'{self._type} x{self.quantity} (due: {due}, priority: {self._priority})'
+
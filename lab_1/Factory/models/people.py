@@ -1,9 +1,12 @@
 from abc import ABC, abstractmethod
 from .exceptions import InvalidDataError
 from typing import List
+from datetime import datetime
 from .orders import Order
 
 class People(ABC):
+    _observer = None
+
     def __init__(self, name: str, age: int):
         self.name = name
         self.age = age
@@ -37,7 +40,10 @@ class People(ABC):
     def is_busy(self, value: bool):
         if not isinstance(value, bool):
             raise InvalidDataError("is_busy must be a boolean")
+        changed = value != self._is_busy
         self._is_busy = value
+        if changed and self._observer is not None:
+            self._observer.worker_changed(self)
 
     @abstractmethod
     def get_role(self) -> str:
@@ -51,6 +57,17 @@ class Worker(People):
         super().__init__(name,age)
         self.specialization=specialization
         self.experience=experience
+
+    @classmethod
+    def trusted(cls, name: str, age: int, specialization: str, experience: int,
+                is_busy: bool = False) -> "Worker":
+        worker = cls.__new__(cls)
+        worker._name = name
+        worker._age = age
+        worker._is_busy = is_busy
+        worker._specialization = specialization
+        worker._experience = experience
+        return worker
     
     @property
     def specialization(self)->str:
@@ -84,11 +101,28 @@ class Worker(People):
                 if not worker.is_busy:  
                     return worker
             return None
+    @staticmethod
+    def find_by_specialization(workers, specialization: str):
+            for worker in workers:
+                if not worker.is_busy and worker.specialization == specialization:
+                    return worker
+            return None
 class Customer(People):
     def __init__(self, name: str, age: int, phone: str, order:str=None):
         super().__init__(name, age)
         self.phone = phone
         self.orders:List[Order]=[]
+
+    @classmethod
+    def trusted(cls, name: str, age: int, phone: str) -> "Customer":
+        customer = cls.__new__(cls)
+        customer._name = name
+        customer._age = age
+        customer._is_busy = False
+        customer._phone = phone
+        customer.orders = []
+        return customer
+
     @property
     def phone(self)->str:
         return self._phone
@@ -109,8 +143,8 @@ class Customer(People):
             return f"{self.name} places an order"
         return f"{self.name} chooses staff"
     
-    def make_order(self, type: str, amount: int)->Order:
-        order = Order(type, amount)
+    def make_order(self, type: str, amount: int, due_date: datetime = None, priority: int = 0)->Order:
+        order = Order(type, amount, due_date, priority)
         self.orders.append(order)
         print(f"{self.name} made an order: {order}")
         return order
@@ -0,0 +1,85 @@
+from typing import Dict, Iterable, List, Tuple, Type
+from .material import Material, Metal, Wood, RawMaterial
+from .exceptions import InvalidDataError
+
+RECIPES: Dict[str, Tuple[Tuple[Type[Material], str, float], ...]] = {
+    "стул": ((Wood, "Дуб", 10.0),),
+    "стол": ((Wood, "Сосна", 20.0), (Metal, "Сталь", 5.0)),
+    "шкаф": ((Wood, "Дуб", 30.0), (Metal, "Сталь", 8.0)),
+}
+
+MATERIAL_LABELS = {Wood: "дерево", Metal: "металл"}
+
+PACKING_KIND = "packing"
+PACKING_RECIPES: Dict[str, Tuple[Tuple[str, float], ...]] = {
+    "стул": (("Box", 1.0), ("Film", 2.0)),
+    "стол": (("Box", 2.0), ("Film", 4.0), ("Paper", 2.0)),
+    "шкаф": (("Box", 3.0), ("Film", 6.0), ("Paper", 4.0)),
+}
+DEFAULT_PACKING = (("Box", 1.0), ("Film", 2.0))
+
+# Parts made at the elements stage: (part, hours, parts it is fitted to). The
+# hours add up to the 4 h the stage takes as one step, so splitting an item
+# into parts only changes how much of the work can run side by side.
+ELEMENT_PLANS: Dict[str, Tuple[Tuple[str, float, Tuple[str, ...]], ...]] = {
+    "стол": (("столешница", 2.0, ()), ("ножки", 1.5, ()), ("фурнитура", 0.5, ())),
+    "шкаф": (("каркас", 1.5, ()), ("задняя стенка", 0.5, ("каркас",)), ("двери", 1.0, ()),
+             ("полки", 0.75, ()), ("фурнитура", 0.25, ())),
+}
+
+# Space one packed unit takes in a vehicle or in finished-goods storage.
+LOAD_UNITS: Dict[str, float] = {"стул": 1.0, "стол": 3.0, "шкаф": 5.0}
+DEFAULT_LOAD = 2.0
+
+
+def make_components(prod_type: str) -> List[Material]:
+    recipe = RECIPES.get(prod_type.lower())
+    if recipe is None:
+        raise InvalidDataError(f"Unknown furniture type '{prod_type}'")
+    return [kind(grade, amount) for kind, grade, amount in recipe]
+
+
+def register_recipe(prod_type: str, recipe: Tuple[Tuple[Type[Material], str, float], ...],
+                    packing: Tuple[Tuple[str, float], ...] = None, load: float = None) -> None:
+    prod_type = prod_type.lower()
+    if not prod_type:
+        raise InvalidDataError("Furniture type can't be empty")
+    if not recipe or any(amount <= 0 for _, _, amount in recipe):
+        raise InvalidDataError(f"Recipe for '{prod_type}' needs positive material amounts")
+    RECIPES[prod_type] = tuple(recipe)
+    if packing is not None:
+        PACKING_RECIPES[prod_type] = tuple(packing)
+    if load is not None:
+        LOAD_UNITS[prod_type] = load
+
+
+def describe_recipe(prod_type: str) -> str:
+    recipe = RECIPES.get(prod_type.lower())
+    if recipe is None:
+        raise InvalidDataError(f"Unknown furniture type '{prod_type}'")
+    return ", ".join(f"{MATERIAL_LABELS.get(kind, kind.__name__)} {amount:g} ед."
+                     for kind, _, amount in recipe)
+
+
+def packing_recipe(prod_type: str) -> Tuple[Tuple[str, float], ...]:
+    return PACKING_RECIPES.get(prod_type.lower(), DEFAULT_PACKING)
+
+
+def element_plan(prod_type: str) -> Tuple[Tuple[str, float, Tuple[str, ...]], ...]:
+    return ELEMENT_PLANS.get(prod_type.lower(), ())
+
+
+def item_load(furniture) -> float:
+    return LOAD_UNITS.get(furniture.type.lower(), DEFAULT_LOAD) * furniture.quantity
+
+
+def packing_materials(furnitures: Iterable) -> List[Material]:
+    units: Dict[str, int] = {}
+    for furniture in furnitures:
+        prod_type = furniture.type.lower()
+        units[prod_type] = units.get(prod_type, 0) + furniture.quantity
+    totals: Dict[str, float] = {}
+    for prod_type, count in units.items():
+        for grade, amount in packing_recipe(prod_type):
+            totals[grade] = totals.get(grade, 0.0) + amount * count
+    return [RawMaterial(PACKING_KIND, grade, amount) for grade, amount in totals.items() if amount > 0]
@@ -0,0 +1,169 @@
+import copy
+from typing import Dict, Iterator, List, Sequence, Set
+from .furniture import Furniture, FurnitureState
+from .people import Worker
+from .tool import Tool
+from .warehouse import Warehouse
+from .exceptions import InvalidDataError
+
+CHUNK = 1024
+
+
+def _detach(item):
+    # Copies leave the report observers behind: they follow the live state only.
+    clone = copy.copy(item)
+    clone.__dict__.pop("_observer", None)
+    return clone
+
+
+def _copy_warehouse(warehouse: Warehouse) -> Warehouse:
+    clone = Warehouse.trusted(warehouse.name, warehouse.capacity)
+    clone.ledger = warehouse.ledger.copy_layout(warehouse.ledger.vector())
+    return clone
+
+
+class FactorySnapshot:
+    # Furnitures live in fixed-size chunks shared between forks. A fork copies
+    # only the list of chunks; a chunk, and then the item in it, is copied the
+    # first time the fork writes to it. Workers, tools and warehouses are small
+    # and are copied as a whole on the first write.
+    def __init__(self, warehouses: Sequence[Warehouse], workers: Sequence[Worker],
+                 tools: Sequence[Tool], chunks: List[list], size: int):
+        self._warehouses = list(warehouses)
+        self._workers = list(workers)
+        self._tools = list(tools)
+        self._chunks = chunks
+        self._size = size
+        self._own_chunks: Set[int] = set()
+        self._own_items: Set[int] = set()
+        self._own_staff = False
+        self._own_warehouses = False
+
+    @classmethod
+    def capture(cls, warehouses: Sequence[Warehouse], workers: Sequence[Worker],
+                tools: Sequence[Tool], furnitures: Sequence[Furniture]) -> "FactorySnapshot":
+        # The captured objects are never changed through the snapshot or its forks.
+        if not warehouses:
+            raise InvalidDataError("Snapshot needs at least one warehouse")
+        chunks = [list(furnitures[start:start + CHUNK]) for start in range(0, len(furnitures), CHUNK)]
+        return cls(warehouses, workers, tools, chunks, len(furnitures))
+
+    @classmethod
+    def from_state(cls, state) -> "FactorySnapshot":
+        material_storage, finished_goods, _, workers, tools, _, furnitures = state
+        return cls.capture([material_storage, finished_goods], workers, tools, furnitures)
+
+    def fork(self) -> "FactorySnapshot":
+        child = FactorySnapshot(self._warehouses, self._workers, self._tools, list(self._chunks), self._size)
+        # Both sides now share everything, so neither may write in place any more.
+        self._own_chunks.clear()
+        self._own_items.clear()
+        self._own_staff = self._own_warehouses = False
+        return child
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> Furniture:
+        if not -self._size <= index < self._size:
+            raise IndexError("Snapshot index out of range")
+        index %= self._size
+        return self._chunks[index // CHUNK][index % CHUNK]
+
+    def __iter__(self) -> Iterator[Furniture]:
+        for chunk in self._chunks:
+            yield from chunk
+
+    @property
+    def warehouses(self) -> List[Warehouse]:
+        return list(self._warehouses)
+
+    @property
+    def workers(self) -> List[Worker]:
+        return list(self._workers)
+
+    @property
+    def tools(self) -> List[Tool]:
+        return list(self._tools)
+
+    def edit(self, index: int) -> Furniture:
+        item = self[index]
+        index %= self._size
+        number = index // CHUNK
+        if number not in self._own_chunks:
+            self._chunks[number] = list(self._chunks[number])
+            self._own_chunks.add(number)
+        if id(item) not in self._own_items:
+            item = _detach(item)
+            self._chunks[number][index % CHUNK] = item
+            self._own_items.add(id(item))
+        return item
+
+    def checkout(self, indices: Sequence[int]) -> List[Furniture]:
+        return [self.edit(index) for index in indices]
+
+    def pending(self, finished: Sequence[FurnitureState] = (FurnitureState.STORED, FurnitureState.DELIVERED)) -> List[int]:
+        return [index for index, item in enumerate(self) if item.status not in finished]
+
+    def append(self, furniture: Furniture) -> int:
+        number = self._size // CHUNK
+        if number == len(self._chunks):
+            self._chunks.append([])
+            self._own_chunks.add(number)
+        elif number not in self._own_chunks:
+            self._chunks[number] = list(self._chunks[number])
+            self._own_chunks.add(number)
+        self._chunks[number].append(furniture)
+        self._own_items.add(id(furniture))
+        self._size += 1
+        return self._size - 1
+
+    def edit_staff(self):
+        if not self._own_staff:
+            self._workers = [_detach(worker) for worker in self._workers]
+            self._tools = [_detach(tool) for tool in self._tools]
+            self._own_staff = True
+        return self._workers, self._tools
+
+    def edit_warehouse(self, index: int = 0) -> Warehouse:
+        if not self._own_warehouses:
+            self._warehouses = [_copy_warehouse(warehouse) for warehouse in self._warehouses]
+            self._own_warehouses = True
+        return self._warehouses[index]
+
+    def shared_chunks(self, other: "FactorySnapshot") -> int:
+        return sum(1 for mine, theirs in zip(self._chunks, other._chunks) if mine is theirs)
+
+    def changed(self, other: "FactorySnapshot") -> List[int]:
+        # Chunks that are still the same object hold the same items, so only
+        # chunks copied by one of the two sides need to be looked at.
+        indices = []
+        for number, (mine, theirs) in enumerate(zip(self._chunks, other._chunks)):
+            if mine is theirs:
+                continue
+            start = number * CHUNK
+            for offset, (a, b) in enumerate(zip(mine, theirs)):
+                if a is not b and (a.status is not b.status or a.quantity != b.quantity):
+                    indices.append(start + offset)
+        return indices
+
+    def state_counts(self) -> Dict[FurnitureState, int]:
+        counts = {state: 0 for state in FurnitureState}
+        for item in self:
+            counts[item.status] += 1
+        return counts
+
+    def summary(self) -> dict:
+        stock: Dict[str, float] = {}
+        for warehouse in self._warehouses:
+            for (kind, grade), amount in warehouse.ledger.items():
+                label = f"{kind} ({grade})" if grade else kind
+                stock[label] = stock.get(label, 0.0) + amount
+        return {
+            "orders": self._size,
+            "states": {state.value: count for state, count in self.state_counts().items() if count},
+            "stock": stock,
+            "workers": len(self._workers),
+            "tools": len(self._tools),
+            "worn_tools": sum(1 for tool in self._tools if tool.is_broken),
+        }
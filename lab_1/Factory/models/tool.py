@@ -1,9 +1,18 @@
 from .exceptions import InvalidAmountError,InvalidDataError
 class Tool:
+    _observer = None
+
     def __init__(self, name: str, durability: int):
         self.name = name
         self.durability = durability
     
+    @classmethod
+    def trusted(cls, name: str, durability: int) -> "Tool":
+        tool = cls.__new__(cls)
+        tool._name = name
+        tool._durability = durability
+        return tool
+
     @property
     def name(self)->str:
         return self._name
@@ -22,6 +31,8 @@ class Tool:
         if value<=0:
             raise InvalidAmountError("Durability must be positive")
         self._durability=value
+        if self._observer is not None:
+            self._observer.tool_changed(self)
     @property
     def is_broken(self)->bool:
         return self._durability<=0
@@ -36,16 +47,22 @@ class Tool:
     def repair(self,amount:int=None)->str:
         if amount is None:
             self._durability=100
+            if self._observer is not None:
+                self._observer.tool_changed(self)
             return f'Tool {self.name} fully repaired'
         if not isinstance(amount,int):
             raise InvalidAmountError("Repair amount must be an integer")
         if amount<=0:
             raise InvalidAmountError("Amount must be positive")
         self._durability+=amount
+        if self._observer is not None:
+            self._observer.tool_changed(self)
         return f"Tool '{self.name}' repaired by {amount}. Now: {self._durability}"
 
     @staticmethod
     def find_available(tools):  
+            if hasattr(tools, "find_available"):
+                return tools.find_available()
             for tool in tools:
              if not tool.is_broken:
                     return tool
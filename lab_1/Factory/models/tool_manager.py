@@ -0,0 +1,121 @@
+import heapq
+from collections import deque
+from itertools import count
+from typing import Iterator, List, Optional, Tuple
+from .tool import Tool
+from .exceptions import InvalidDataError, InvalidAmountError
+
+
+class ToolManager:
+    STRATEGIES = ("durable", "round_robin")
+
+    def __init__(self, tools: List[Tool], repair_threshold: int = 10, strategy: str = "durable"):
+        self.strategy = strategy
+        self.repair_threshold = repair_threshold
+        self.tools: List[Tool] = list(tools)
+        self._counter = count()
+        self._heap: list = []
+        self._ring: deque = deque()
+        self._repair_queue: List[Tool] = []
+        for tool in self.tools:
+            self._put(tool)
+
+    @property
+    def strategy(self) -> str:
+        return self._strategy
+
+    @strategy.setter
+    def strategy(self, value: str):
+        if value not in self.STRATEGIES:
+            raise InvalidDataError(f"Strategy must be one of {', '.join(self.STRATEGIES)}")
+        self._strategy = value
+
+    @property
+    def repair_threshold(self) -> int:
+        return self._repair_threshold
+
+    @repair_threshold.setter
+    def repair_threshold(self, value: int):
+        if not isinstance(value, int):
+            raise InvalidAmountError("Repair threshold must be an integer")
+        if value < 1:
+            raise InvalidAmountError("Repair threshold must be at least 1")
+        self._repair_threshold = value
+
+    @property
+    def repair_queue(self) -> List[Tool]:
+        return list(self._repair_queue)
+
+    def _put(self, tool: Tool) -> None:
+        if tool.durability <= self._repair_threshold:
+            if tool not in self._repair_queue:
+                self._repair_queue.append(tool)
+        elif self._strategy == "durable":
+            heapq.heappush(self._heap, (-tool.durability, next(self._counter), tool))
+        else:
+            self._ring.append(tool)
+
+    def _peek_durable(self) -> Optional[Tool]:
+        while self._heap:
+            key, _, tool = self._heap[0]
+            if -key != tool.durability:
+                heapq.heapreplace(self._heap, (-tool.durability, next(self._counter), tool))
+                continue
+            if tool.durability <= self._repair_threshold:
+                heapq.heappop(self._heap)
+                self._put(tool)
+                continue
+            return tool
+        return None
+
+    def _peek_round_robin(self) -> Optional[Tool]:
+        for _ in range(len(self._ring)):
+            tool = self._ring.popleft()
+            if tool.durability <= self._repair_threshold:
+                self._put(tool)
+                continue
+            self._ring.append(tool)
+            return tool
+        return None
+
+    def find_available(self) -> Optional[Tool]:
+        peek = self._peek_durable if self._strategy == "durable" else self._peek_round_robin
+        tool = peek()
+        if tool is None and self._repair_queue:
+            self.run_repairs()
+            tool = peek()
+        return tool
+
+    def usable(self) -> List[Tuple[Tool, int]]:
+        # Tools in the order the strategy would hand them out, each with the
+        # uses it has before it is due for repair.
+        if not self._usable() and self._repair_queue:
+            self.run_repairs()
+        return self._usable()
+
+    def _usable(self) -> List[Tuple[Tool, int]]:
+        if self._strategy == "durable":
+            ordered = sorted(self.tools, key=lambda tool: -tool.durability)
+        else:
+            ordered = list(self._ring)
+        queued = {id(tool) for tool in self._repair_queue}
+        return [(tool, tool.durability - self._repair_threshold) for tool in ordered
+                if id(tool) not in queued and tool.durability > self._repair_threshold]
+
+    def run_repairs(self, amount: int = None) -> List[str]:
+        queued, self._repair_queue = self._repair_queue, []
+        messages = []
+        for tool in queued:
+            messages.append(tool.repair(amount))
+            self._put(tool)
+        return messages
+
+    def __iter__(self) -> Iterator[Tool]:
+        return iter(self.tools)
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+    def __str__(self) -> str:
+        return (f"Tools: {len(self.tools)} ({self._strategy}), "
+                f"waiting for repair: {len(self._repair_queue)}")
@@ -1,28 +1,38 @@
-from typing import Union
-from .material import Wood, Metal
+import time
+from typing import Callable, List, Sequence, Tuple
+from .material import Material
+from .ledger import Bill, Key, MaterialLedger, UNGRADED
+from .history import InventoryHistory
 from .exceptions import InvalidDataError, InvalidAmountError
 
 class Warehouse:
     def __init__(self, name: str, capacity: float):
         self.name = name
         self.capacity = capacity
-        self.metal_amount: float = 0.0  
-        self.wood_amount: float = 0.0
-    
+        self.ledger = MaterialLedger()
+
+    @classmethod
+    def trusted(cls, name: str, capacity: float) -> "Warehouse":
+        warehouse = cls.__new__(cls)
+        warehouse._name = name
+        warehouse.capacity = capacity
+        warehouse.ledger = MaterialLedger()
+        return warehouse
+
     @property
     def name(self) -> str:
         return self._name
-    
+
     @name.setter
     def name(self, value: str):
         if not value:
             raise InvalidDataError("Name can't be empty")
         self._name = value
-    
+
     @property
     def capacity(self) -> float:
         return self._capacity
-    
+
     @capacity.setter
     def capacity(self, value: float):
         if value is None:
@@ -32,54 +42,92 @@ class Warehouse:
         if value <= 0:
             raise InvalidAmountError("Capacity must be positive")
         self._capacity = float(value)
-    
+
+    @property
+    def metal_amount(self) -> float:
+        return self.ledger.kind_total("metal")
+
+    @metal_amount.setter
+    def metal_amount(self, value: float):
+        self.ledger.set_kind_total("metal", value)
+
+    @property
+    def wood_amount(self) -> float:
+        return self.ledger.kind_total("wood")
+
+    @wood_amount.setter
+    def wood_amount(self, value: float):
+        self.ledger.set_kind_total("wood", value)
+
     @property
     def total_amount(self) -> float:
-        return self.metal_amount + self.wood_amount
-    
+        return self.ledger.total()
+
     @property
     def available_space(self) -> float:
         return self._capacity - self.total_amount
-    
-    def add_material(self, material: Union[Metal, Wood]) -> None:
-        if not isinstance(material, (Metal, Wood)):
-            raise InvalidDataError(f"Expected Metal or Wood, got {type(material).__name__}")
-        
+
+    @property
+    def history(self) -> InventoryHistory:
+        return self.ledger.history
+
+    def enable_history(self, checkpoint_every: int = 256, clock: Callable = time.time) -> InventoryHistory:
+        if self.ledger.history is None:
+            history = InventoryHistory(lambda: self.ledger.keys, checkpoint_every, clock)
+            for index, (_, amount) in enumerate(self.ledger.items()):
+                if amount:
+                    history.record(index, amount)
+            self.ledger.history = history
+        return self.ledger.history
+
+    def amount(self, kind: str, grade: str = None) -> float:
+        return self.ledger.amount(kind, grade)
+
+    def add_material(self, material: Material) -> None:
+        if not isinstance(material, Material):
+            raise InvalidDataError(f"Expected Material, got {type(material).__name__}")
+
         if self.total_amount + material.amount > self._capacity:
             raise InvalidAmountError(
                 f"Can't add material. Available: {self.available_space}, "
                 f"Required: {material.amount}"
             )
-        
-        if isinstance(material, Metal):
-            self.metal_amount += material.amount
-            print(f'Added metal: +{material.amount} (total metal: {self.metal_amount})')
-        else:
-            self.wood_amount += material.amount
-            print(f'Added wood: +{material.amount} (total wood: {self.wood_amount})')
-        
+
+        kind = material.kind
+        self.ledger.add(kind, getattr(material, "type", UNGRADED), material.amount)
+        print(f'Added {kind}: +{material.amount} (total {kind}: {self.ledger.kind_total(kind)})')
+
         print(f"Warehouse total: {self.total_amount}/{self._capacity} ({self.available_space} free)")
-    
-    def remove_metal(self, amount: float) -> None:
-        if amount > self.metal_amount:
-            raise InvalidAmountError(
-                f"Not enough metal. Have: {self.metal_amount}, Need: {amount}"
-            )
-        self.metal_amount -= amount
-        print(f"Removed metal: -{amount} (remaining: {self.metal_amount})")
+
+    def remove_material(self, kind: str, amount: float, grade: str = None) -> None:
+        self.ledger.remove(kind, amount, grade)
+        print(f"Removed {kind}: -{amount} (remaining: {self.ledger.kind_total(kind)})")
         print(f"Warehouse total: {self.total_amount}/{self._capacity}")
-    
+
+    def remove_metal(self, amount: float) -> None:
+        self.remove_material("metal", amount)
+
     def remove_wood(self, amount: float) -> None:
-        if amount > self.wood_amount:
-            raise InvalidAmountError(
-                f"Not enough wood. Have: {self.wood_amount}, Need: {amount}"
-            )
-        self.wood_amount -= amount
-        print(f"Removed wood: -{amount} (remaining: {self.wood_amount})")
-        print(f"Warehouse total: {self.total_amount}/{self._capacity}")
-    
+        self.remove_material("wood", amount)
+
+    def bill_of_materials(self, materials: Sequence[Material], quantity: int = 1) -> Bill:
+        return self.ledger.bill(materials, quantity)
+
+    def has_materials(self, bill: Bill) -> bool:
+        return self.ledger.can_fulfill(bill)
+
+    def shortages(self, bill: Bill) -> List[Tuple[Key, float, float]]:
+        return self.ledger.shortages(bill)
+
+    def consume(self, bill: Bill) -> None:
+        self.ledger.consume(bill)
+
     def __str__(self) -> str:
-        return (f"Warehouse: {self._name}\n"
-                f"Capacity: {self.total_amount}/{self._capacity}\n"
-                f"Metal: {self.metal_amount}\n"
-                f"Wood: {self.wood_amount}")
\ No newline at end of file
+        lines = [f"Warehouse: {self._name}",
+                 f"Capacity: {self.total_amount}/{self._capacity}",
+                 f"Metal: {self.metal_amount}",
+                 f"Wood: {self.wood_amount}"]
+        for kind in self.ledger.kinds():
+            if kind not in ("metal", "wood"):
+                lines.append(f"{kind.capitalize()}: {self.ledger.kind_total(kind)}")
+        return "\n".join(lines)
@@ -1,32 +1,103 @@
-from .furniture import Furniture
-from typing import List
+from .furniture import Furniture, FurnitureState
+from typing import Callable, List, Optional
+from datetime import datetime, timedelta
+from .archive import FurnitureArchive
 from .exceptions import InvalidDataError
 
 class Workshop:
-    def __init__(self, workshop_type: str):
+    def __init__(self, workshop_type: str, archive: FurnitureArchive = None,
+                 retention: timedelta = None, keep: int = None):
         self.workshop_type = workshop_type
         self.completed_furnitures: List[Furniture] = []
-    
+        self.archive = archive
+        self.retention = retention
+        self.keep = keep
+        # Order numbering, and the live order list archived items leave.
+        self.next_id = 0
+        self.active: Optional[List[Furniture]] = None
+        # Called with each group of archived items, so indexes holding them let go.
+        self.archive_listeners: List[Callable[[List[Furniture]], None]] = []
+
     @property
     def workshop_type(self) -> str:
         return self._workshop_type
-    
+
     @workshop_type.setter
     def workshop_type(self, value: str):
         if not value:
             raise InvalidDataError("Workshop type can't be empty")
         self._workshop_type = value
-    
+
+    @property
+    def keep(self) -> Optional[int]:
+        return self._keep
+
+    @keep.setter
+    def keep(self, value: Optional[int]):
+        if value is not None and (not isinstance(value, int) or value < 0):
+            raise InvalidDataError("Number of kept items must be a non-negative integer")
+        self._keep = value
+
+    def register(self, furniture: Furniture) -> int:
+        if getattr(furniture, "id", None) is None:
+            furniture.id = self.next_id
+            self.next_id += 1
+        return furniture.id
+
     def add_completed_furniture(self, furniture: Furniture) -> None:
+        furniture.completed_at = datetime.now()
         self.completed_furnitures.append(furniture)
         print(f"Added {furniture.type} to {self._workshop_type} workshop storage")
-    
+        if self.archive is not None:
+            self.archive_old(furniture.completed_at)
+
+    def archive_old(self, now: datetime = None) -> int:
+        # Items are completed in order, so the old ones are always at the front.
+        # Stored goods still hold room in the finished-goods store and stay
+        # until they are shipped.
+        if self.archive is None:
+            return 0
+        now = now or datetime.now()
+        items = self.completed_furnitures
+        kept, gone = [], set()
+        limit = len(items) - self._keep if self._keep is not None else 0
+        position = 0
+        for position, item in enumerate(items):
+            completed_at = getattr(item, "completed_at", None)
+            if completed_at is None:
+                # Appended without a timestamp (loaded from a save): its window starts now.
+                completed_at = item.completed_at = now
+            if position >= limit and (self.retention is None or now - completed_at <= self.retention):
+                break
+            if item.status == FurnitureState.STORED:
+                kept.append(item)
+                continue
+            self.register(item)
+            self.archive.append(item, completed_at)
+            gone.add(id(item))
+        else:
+            position = len(items)
+        if gone:
+            if self.active is not None:
+                # Archived items leave memory altogether, not just this list.
+                self.active[:] = [f for f in self.active if id(f) not in gone]
+            archived = [item for item in items[:position] if id(item) in gone]
+            items[:position] = kept
+            for listener in self.archive_listeners:
+                listener(archived)
+        return len(gone)
+
     def get_completed_count(self) -> int:
-        return len(self.completed_furnitures)
-    
+        archived = len(self.archive) if self.archive is not None else 0
+        return len(self.completed_furnitures) + archived
+
+    def get_completed_units(self) -> int:
+        archived = self.archive.units if self.archive is not None else 0
+        return sum(f.quantity for f in self.completed_furnitures) + archived
+
     def get_completed_list(self) -> List[str]:
         return [f.type for f in self.completed_furnitures]
-    
+
     def __str__(self) -> str:
         return (f"Workshop: {self._workshop_type}\n"
-                f"Completed furniture: {len(self.completed_furnitures)}")
\ No newline at end of file
+                f"Completed furniture: {self.get_completed_count()}")
@@ -0,0 +1,193 @@
+import heapq
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+from models.furniture import Furniture, FurnitureState
+from models.people import Worker
+from models.exceptions import InvalidDataError
+
+UNIVERSAL_SPECIALIZATIONS = ("универсал", "universal")
+
+STAGE_SPECIALIZATIONS: Dict[FurnitureState, Tuple[str, ...]] = {
+    FurnitureState.CREATED: ("столяр", "carpenter"),
+    FurnitureState.MATERIALS_PREPARED: ("столяр", "carpenter"),
+    FurnitureState.ELEMENTS_MANUFACTURED: ("сборщик", "assembler"),
+    FurnitureState.ASSEMBLED: ("контролер", "inspector"),
+    FurnitureState.QUALITY_CHECKED: ("упаковщик", "packer"),
+    FurnitureState.PACKED: ("водитель", "driver"),
+}
+
+STAGE_HOURS: Dict[FurnitureState, float] = {
+    FurnitureState.CREATED: 1.0,
+    FurnitureState.MATERIALS_PREPARED: 4.0,
+    FurnitureState.ELEMENTS_MANUFACTURED: 3.0,
+    FurnitureState.ASSEMBLED: 1.0,
+    FurnitureState.QUALITY_CHECKED: 0.5,
+    FurnitureState.PACKED: 2.0,
+}
+
+NEXT_STATE: Dict[FurnitureState, FurnitureState] = {
+    FurnitureState.CREATED: FurnitureState.MATERIALS_PREPARED,
+    FurnitureState.MATERIALS_PREPARED: FurnitureState.ELEMENTS_MANUFACTURED,
+    FurnitureState.ELEMENTS_MANUFACTURED: FurnitureState.ASSEMBLED,
+    FurnitureState.ASSEMBLED: FurnitureState.QUALITY_CHECKED,
+    FurnitureState.QUALITY_CHECKED: FurnitureState.PACKED,
+    FurnitureState.PACKED: FurnitureState.DELIVERED,
+}
+
+FIT_SLOWDOWN = {1.0: 1.0, 0.5: 1.3, 0.0: 1.8}
+MAX_COUNTED_EXPERIENCE = 20
+
+
+def specialization_fit(worker: Worker, state: FurnitureState) -> float:
+    specialization = worker.specialization.lower()
+    if specialization in STAGE_SPECIALIZATIONS.get(state, ()):
+        return 1.0
+    if specialization in UNIVERSAL_SPECIALIZATIONS:
+        return 0.5
+    return 0.0
+
+
+def assignment_score(worker: Worker, state: FurnitureState) -> float:
+    experience = min(max(worker.experience or 0, 0), MAX_COUNTED_EXPERIENCE)
+    return specialization_fit(worker, state) * 100 + experience
+
+
+def stage_duration(worker: Worker, state: FurnitureState, base_hours: float = None) -> float:
+    if base_hours is None:
+        base_hours = STAGE_HOURS.get(state, 1.0)
+    experience = min(max(worker.experience or 0, 0), MAX_COUNTED_EXPERIENCE)
+    slowdown = FIT_SLOWDOWN[specialization_fit(worker, state)]
+    return base_hours * slowdown / (1 + 0.03 * experience)
+
+
+def pick_worker(workers: Sequence[Worker], state: FurnitureState) -> Optional[Worker]:
+    best = None
+    best_score = -1.0
+    for worker in workers:
+        if worker.is_busy:
+            continue
+        score = assignment_score(worker, state)
+        if score > best_score:
+            best, best_score = worker, score
+    return best
+
+
+class WorkerAssigner:
+    POLICIES = ("optimized", "first_available")
+
+    def __init__(self, policy: str = "optimized"):
+        if policy not in self.POLICIES:
+            raise InvalidDataError(f"Policy must be one of {', '.join(self.POLICIES)}")
+        self.policy = policy
+
+    def assign(self, tasks: Sequence[FurnitureState], workers: Sequence[Worker]) -> List[Tuple[int, int]]:
+        idle = [i for i, worker in enumerate(workers) if not worker.is_busy]
+        if self.policy == "first_available":
+            return list(zip(range(len(tasks)), idle))
+        heap = [(-assignment_score(workers[w], state), t, w)
+                for t, state in enumerate(tasks) for w in idle]
+        heapq.heapify(heap)
+        pairs = []
+        used_tasks, used_workers = set(), set()
+        limit = min(len(tasks), len(idle))
+        while heap and len(pairs) < limit:
+            _, t, w = heapq.heappop(heap)
+            if t in used_tasks or w in used_workers:
+                continue
+            used_tasks.add(t)
+            used_workers.add(w)
+            pairs.append((t, w))
+        return pairs
+
+    def simulate(self, furnitures: Sequence[Furniture], workers: Sequence[Worker]) -> "SimulationReport":
+        if not workers:
+            raise InvalidDataError("Simulation needs at least one worker")
+        queues: Dict[FurnitureState, deque] = {state: deque() for state in NEXT_STATE}
+        seq = 0
+        for item, furniture in enumerate(furnitures):
+            if furniture.status in queues:
+                queues[furniture.status].append((seq, item))
+                seq += 1
+        pending = sum(len(queue) for queue in queues.values())
+        busy = [False] * len(workers)
+        events: list = []
+        completed: Dict[int, float] = {}
+        now = 0.0
+        while pending or events:
+            free = [i for i in range(len(workers)) if not busy[i]]
+            if pending and free:
+                for worker_index, state in self._match(queues, free, workers):
+                    _, item = queues[state].popleft()
+                    pending -= 1
+                    busy[worker_index] = True
+                    finish = now + stage_duration(workers[worker_index], state)
+                    heapq.heappush(events, (finish, seq, worker_index, item, NEXT_STATE[state]))
+                    seq += 1
+            if not events:
+                break
+            now = events[0][0]
+            while events and events[0][0] == now:
+                _, _, worker_index, item, state = heapq.heappop(events)
+                busy[worker_index] = False
+                if state in queues:
+                    queues[state].append((seq, item))
+                    seq += 1
+                    pending += 1
+                else:
+                    completed[item] = now
+        return SimulationReport(completed, len(furnitures))
+
+    def _match(self, queues: Dict[FurnitureState, deque], free: List[int],
+               workers: Sequence[Worker]) -> List[Tuple[int, FurnitureState]]:
+        left = {state: len(queue) for state, queue in queues.items() if queue}
+        matches = []
+        if self.policy == "first_available":
+            heads = {state: iter(queues[state]) for state in left}
+            oldest = [(next(heads[state]), state) for state in left]
+            heapq.heapify(oldest)
+            for worker_index in free:
+                if not oldest:
+                    break
+                _, state = heapq.heappop(oldest)
+                matches.append((worker_index, state))
+                following = next(heads[state], None)
+                if following is not None:
+                    heapq.heappush(oldest, (following, state))
+            return matches
+        rank = {state: position for position, state in enumerate(NEXT_STATE)}
+        heap = [(-assignment_score(workers[w], state), -rank[state], w, state)
+                for state in left for w in free]
+        heapq.heapify(heap)
+        used = set()
+        while heap and len(used) < len(free):
+            _, _, worker_index, state = heapq.heappop(heap)
+            if worker_index in used or not left[state]:
+                continue
+            used.add(worker_index)
+            left[state] -= 1
+            matches.append((worker_index, state))
+        return matches
+
+
+class SimulationReport:
+    def __init__(self, completion_times: Dict[int, float], total: int):
+        self.completion_times = completion_times
+        self.total = total
+
+    @property
+    def completed(self) -> int:
+        return len(self.completion_times)
+
+    @property
+    def makespan(self) -> float:
+        return max(self.completion_times.values(), default=0.0)
+
+    @property
+    def mean_lead_time(self) -> float:
+        if not self.completion_times:
+            return 0.0
+        return sum(self.completion_times.values()) / len(self.completion_times)
+
+    def __str__(self) -> str:
+        return (f"Completed: {self.completed}/{self.total}, "
+                f"mean lead time: {self.mean_lead_time:.2f} h, makespan: {self.makespan:.2f} h")
@@ -0,0 +1,187 @@
+import heapq
+from datetime import datetime
+from math import atan2, hypot
+from typing import Dict, List, Sequence, Tuple
+from models.furniture import Furniture, FurnitureState
+from models.people import Worker
+from models.workshop import Workshop
+from models.finished_goods import FinishedGoodsStore
+from models.recipes import item_load
+from models.exceptions import InvalidDataError, InvalidOperation
+from operations.assignment import assignment_score, specialization_fit
+
+Point = Tuple[float, float]
+# Goods leave either straight from packing or from the finished-goods store.
+DELIVERABLE_STATES = (FurnitureState.PACKED, FurnitureState.STORED)
+
+
+def area_of(address: str) -> str:
+    return address.split(",")[0].strip().lower()
+
+
+def route_length(route: Sequence[int], matrix: List[List[float]]) -> float:
+    path = [0, *route, 0]
+    return sum(matrix[a][b] for a, b in zip(path, path[1:]))
+
+
+def nearest_neighbour(matrix: List[List[float]]) -> List[int]:
+    left = set(range(1, len(matrix)))
+    route = []
+    current = 0
+    while left:
+        current = min(left, key=matrix[current].__getitem__)
+        route.append(current)
+        left.remove(current)
+    return route
+
+
+def two_opt(route: List[int], matrix: List[List[float]]) -> List[int]:
+    path = [0, *route, 0]
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(path) - 2):
+            for j in range(i + 1, len(path) - 1):
+                a, b, c, d = path[i - 1], path[i], path[j], path[j + 1]
+                if matrix[a][c] + matrix[b][d] < matrix[a][b] + matrix[c][d] - 1e-9:
+                    path[i:j + 1] = reversed(path[i:j + 1])
+                    improved = True
+    return path[1:-1]
+
+
+class Trip:
+    def __init__(self, number: int):
+        self.number = number
+        self.driver: Worker = None
+        self.stops: List[str] = []
+        self.items: List[Furniture] = []
+        self.load = 0.0
+        self.distance = 0.0
+
+    def __str__(self) -> str:
+        driver = self.driver.name if self.driver else "-"
+        return (f"Trip {self.number}: {driver}, {len(self.items)} items, load {self.load}, "
+                f"{self.distance:.1f} km: " + " -> ".join(self.stops))
+
+
+class DeliveryPlan:
+    def __init__(self):
+        self.trips: List[Trip] = []
+        self.unassigned: List[Tuple[Furniture, str]] = []
+
+    @property
+    def total_distance(self) -> float:
+        return sum(trip.distance for trip in self.trips)
+
+    def driver_trips(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for trip in self.trips:
+            counts[trip.driver.name] = counts.get(trip.driver.name, 0) + 1
+        return counts
+
+    def execute(self, workshop: Workshop = None, delivery_date: datetime = None,
+                store: FinishedGoodsStore = None) -> List[Furniture]:
+        delivery_date = delivery_date or datetime.now()
+        delivered = []
+        for trip in self.trips:
+            for furniture in trip.items:
+                furniture.delivery_man_name = trip.driver.name
+                furniture.delivery_date = delivery_date
+                stored = furniture.status == FurnitureState.STORED
+                if stored and store is not None:
+                    store.release(furniture)
+                furniture.change_status(FurnitureState.DELIVERED)
+                # Stored goods were handed to the workshop when they were stored.
+                if workshop is not None and not stored:
+                    workshop.add_completed_furniture(furniture)
+                delivered.append(furniture)
+        return delivered
+
+    def __str__(self) -> str:
+        lines = [f"Trips: {len(self.trips)}, distance: {self.total_distance:.1f} km, "
+                 f"unassigned: {len(self.unassigned)}"]
+        lines.extend(str(trip) for trip in self.trips)
+        return "\n".join(lines)
+
+
+class DeliveryPlanner:
+    def __init__(self, locations: Dict[str, Point], depot: Point = (0.0, 0.0), capacity: float = 20.0):
+        if capacity <= 0:
+            raise InvalidDataError("Vehicle capacity must be positive")
+        self.locations = locations
+        self.depot = depot
+        self.capacity = capacity
+
+    def _angle(self, point: Point) -> float:
+        return atan2(point[1] - self.depot[1], point[0] - self.depot[0])
+
+    def _centre(self, addresses: List[str]) -> Point:
+        points = [self.locations[address] for address in addresses]
+        return (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+
+    def plan(self, furnitures: Sequence[Furniture], workers: Sequence[Worker]) -> DeliveryPlan:
+        drivers = sorted((w for w in workers if not w.is_busy and specialization_fit(w, FurnitureState.PACKED) > 0),
+                         key=lambda w: -assignment_score(w, FurnitureState.PACKED))
+        if not drivers:
+            raise InvalidOperation("No drivers available for delivery")
+
+        plan = DeliveryPlan()
+        stops: Dict[str, List[Furniture]] = {}
+        for furniture in furnitures:
+            if furniture.status not in DELIVERABLE_STATES:
+                continue
+            address = getattr(furniture, "delivery_address", None)
+            if not address:
+                plan.unassigned.append((furniture, "No delivery address specified"))
+            elif address not in self.locations:
+                plan.unassigned.append((furniture, f"Unknown delivery address '{address}'"))
+            elif item_load(furniture) > self.capacity:
+                plan.unassigned.append((furniture, f"Load {item_load(furniture)} exceeds vehicle capacity"))
+            else:
+                stops.setdefault(address, []).append(furniture)
+
+        # Sweep areas in angular order around the depot, and stops inside an area
+        # likewise, so each vehicle is filled with neighbouring addresses.
+        areas: Dict[str, List[str]] = {}
+        for address in stops:
+            areas.setdefault(area_of(address), []).append(address)
+        trip = Trip(1)
+        for area in sorted(areas, key=lambda a: self._angle(self._centre(areas[a]))):
+            addresses = sorted(areas[area], key=lambda a: self._angle(self.locations[a]))
+            area_load = sum(item_load(f) for address in addresses for f in stops[address])
+            # Start a fresh vehicle rather than split an area that would fit into one.
+            if trip.items and trip.load + area_load > self.capacity >= area_load:
+                plan.trips.append(trip)
+                trip = Trip(trip.number + 1)
+            for address in addresses:
+                for furniture in stops[address]:
+                    load = item_load(furniture)
+                    if trip.load + load > self.capacity:
+                        plan.trips.append(trip)
+                        trip = Trip(trip.number + 1)
+                    if not trip.stops or trip.stops[-1] != address:
+                        trip.stops.append(address)
+                    trip.items.append(furniture)
+                    trip.load += load
+        if trip.items:
+            plan.trips.append(trip)
+
+        for trip in plan.trips:
+            self._route(trip)
+        self._assign_drivers(plan.trips, drivers)
+        return plan
+
+    def _route(self, trip: Trip) -> None:
+        points = [self.depot] + [self.locations[address] for address in trip.stops]
+        matrix = [[hypot(a[0] - b[0], a[1] - b[1]) for b in points] for a in points]
+        route = two_opt(nearest_neighbour(matrix), matrix)
+        trip.stops = [trip.stops[i - 1] for i in route]
+        trip.distance = route_length(route, matrix)
+
+    @staticmethod
+    def _assign_drivers(trips: List[Trip], drivers: List[Worker]) -> None:
+        shifts = [(0.0, rank) for rank in range(len(drivers))]
+        for trip in sorted(trips, key=lambda t: -t.distance):
+            driven, rank = heapq.heappop(shifts)
+            trip.driver = drivers[rank]
+            heapq.heappush(shifts, (driven + trip.distance, rank))
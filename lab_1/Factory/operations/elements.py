@@ -0,0 +1,118 @@
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+from models.furniture import FurnitureState
+from models.people import Worker
+from models.tool import Tool
+from models.recipes import element_plan
+from models.exceptions import InvalidAmountError, InvalidDataError
+from operations.assignment import stage_duration
+
+Plan = Sequence[Tuple[str, float, Tuple[str, ...]]]
+ELEMENT_STAGE = FurnitureState.MATERIALS_PREPARED
+
+
+class PartGraph:
+    # A plan turned into indices: how many parts each part waits for and which
+    # parts it unblocks. `order` is a topological order of the whole plan.
+    def __init__(self, plan: Plan):
+        index = {name: i for i, (name, _, _) in enumerate(plan)}
+        if len(index) != len(plan):
+            raise InvalidDataError("Part names in a plan must be unique")
+        self.names = [name for name, _, _ in plan]
+        self.hours = [hours for _, hours, _ in plan]
+        self.needs = [len(after) for _, _, after in plan]
+        self.followers: List[List[int]] = [[] for _ in plan]
+        for i, (name, hours, after) in enumerate(plan):
+            if hours <= 0:
+                raise InvalidDataError(f"Part {name} must take some time")
+            for dependency in after:
+                if dependency not in index:
+                    raise InvalidDataError(f"Part {name} needs unknown part {dependency}")
+                self.followers[index[dependency]].append(i)
+        self.after = [[index[dependency] for dependency in after] for _, _, after in plan]
+        self.roots = [i for i, count in enumerate(self.needs) if not count]
+        waiting = list(self.needs)
+        ready = deque(self.roots)
+        self.order: List[int] = []
+        while ready:
+            part = ready.popleft()
+            self.order.append(part)
+            for follower in self.followers[part]:
+                waiting[follower] -= 1
+                if not waiting[follower]:
+                    ready.append(follower)
+        if len(self.order) != len(plan):
+            raise InvalidDataError("Part plan has a cycle")
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def serial_hours(self) -> float:
+        return sum(self.hours)
+
+
+class ElementJob:
+    __slots__ = ("part", "worker", "tool", "start", "finish")
+
+    def __init__(self, part: str, worker: Worker, tool: Tool, start: float, finish: float):
+        self.part = part
+        self.worker = worker
+        self.tool = tool
+        self.start = start
+        self.finish = finish
+
+    def __str__(self) -> str:
+        return f"{self.part}: {self.worker.name}, {self.tool.name}, {self.start:.2f}-{self.finish:.2f} h"
+
+
+def schedule_elements(graph: PartGraph, workers: Sequence[Worker], tools: Sequence[Tool]) -> List[ElementJob]:
+    # List scheduling: parts are taken in dependency order and each goes to
+    # the idle worker that would finish it first, with the tool free earliest.
+    staff = [worker for worker in workers if not worker.is_busy]
+    if not staff:
+        raise InvalidAmountError("No available workers")
+    # Each part wears its tool once. A ToolManager hands out its tools in
+    # strategy order and keeps them above the repair threshold; a plain tool
+    # can't be used down to zero durability.
+    if hasattr(tools, "usable"):
+        usable = tools.usable()
+    else:
+        usable = [(tool, tool.durability - 1) for tool in tools if tool.durability > 1]
+    if not usable:
+        raise InvalidAmountError("No available tools for work")
+    kit = [tool for tool, _ in usable]
+    uses_left = [uses for _, uses in usable]
+    worker_free = [0.0] * len(staff)
+    tool_free = [0.0] * len(kit)
+    finished: Dict[int, float] = {}
+    jobs = []
+    for part in graph.order:
+        ready = max((finished[dependency] for dependency in graph.after[part]), default=0.0)
+        usable = [t for t in range(len(kit)) if uses_left[t] > 0]
+        if not usable:
+            raise InvalidAmountError("Tools are too worn for all parts")
+        t = min(usable, key=tool_free.__getitem__)
+        uses_left[t] -= 1
+        best = None
+        for w, worker in enumerate(staff):
+            start = max(ready, worker_free[w], tool_free[t])
+            end = start + stage_duration(worker, ELEMENT_STAGE, graph.hours[part])
+            if best is None or end < best[0]:
+                best = (end, start, w)
+        end, start, w = best
+        worker_free[w] = tool_free[t] = finished[part] = end
+        jobs.append(ElementJob(graph.names[part], staff[w], kit[t], start, end))
+    return jobs
+
+
+_GRAPHS: Dict[str, Optional[PartGraph]] = {}
+
+
+def part_graph(prod_type: str) -> Optional[PartGraph]:
+    # None for items made in one piece.
+    prod_type = prod_type.lower()
+    if prod_type not in _GRAPHS:
+        plan = element_plan(prod_type)
+        _GRAPHS[prod_type] = PartGraph(plan) if plan else None
+    return _GRAPHS[prod_type]
@@ -1,12 +1,22 @@
 from abc import ABC, abstractmethod
 from models.furniture import Furniture, FurnitureState
 import random
+from math import isqrt
+from typing import Optional, Tuple
 from models.people import Worker
-from models. warehouse import Warehouse
+from models.warehouse import Warehouse
+from models.workshop import Workshop
+from models.ledger import Key, describe_shortage
+from models.recipes import packing_materials, packing_recipe
 from typing import List
 from models.tool import Tool
-from models.exceptions import InvalidOperation, InvalidAmountError
+from models.exceptions import InvalidOperation, InvalidAmountError, ShortageError
 from datetime import datetime
+from operations.assignment import pick_worker
+from operations.elements import ElementJob, PartGraph, part_graph, schedule_elements
+
+PACKED_STATES = (FurnitureState.PACKED, FurnitureState.STORED, FurnitureState.DELIVERED)
+
 
 class Operation(ABC):
     @abstractmethod
@@ -24,7 +34,7 @@ class PreparationOperation(Operation):
         if furniture.status != FurnitureState.CREATED:
             raise InvalidOperation("Materials can only be prepared for new furniture")
         
-        available_worker = Worker.find_available(self.workers)
+        available_worker = pick_worker(self.workers, furniture.status)
         if not available_worker:
             raise InvalidAmountError("No available workers for preparation")
         
@@ -32,20 +42,9 @@ class PreparationOperation(Operation):
         if not available_tool:
             raise InvalidAmountError("No available tools for preparation")
         
-        metal_needed = 0.0
-        wood_needed = 0.0
-        
-        for material in furniture.materials:
-            if material.__class__.__name__ == "Metal":
-                metal_needed += material.amount
-            elif material.__class__.__name__ == "Wood":
-                wood_needed += material.amount
-        
-        if metal_needed > self.warehouse.metal_amount:
-            raise InvalidAmountError(f"Not enough metal. Need {metal_needed}, have {self.warehouse.metal_amount}")
-        
-        if wood_needed > self.warehouse.wood_amount:
-            raise InvalidAmountError(f"Not enough wood. Need {wood_needed}, have {self.warehouse.wood_amount}")
+        bill = self.warehouse.bill_of_materials(furniture.materials, furniture.quantity)
+        if not self.warehouse.has_materials(bill):
+            raise ShortageError(describe_shortage(self.warehouse.shortages(bill)[0]))
 
         available_worker.is_busy = True
         available_tool.use()
@@ -57,8 +56,8 @@ class PreparationOperation(Operation):
         print(f"   Materials prepared for {furniture.type}")
         print(f"   Worker: {available_worker.name}")
         print(f"   Tool: {available_tool.name}")
-        print(f"   Metal needed: {metal_needed}")
-        print(f"   Wood needed: {wood_needed}")
+        for kind, amount in bill.by_kind().items():
+            print(f"   {kind.capitalize()} needed: {amount}")
         print(f"   Status: {furniture.status}")
 
 
@@ -67,39 +66,31 @@ class CreateElementOperation(Operation):
         self.warehouse = warehouse
         self.workers = workers
         self.tools = tools
+        self.jobs: List[ElementJob] = []
     
     def execute(self, furniture: Furniture) -> None:
         if furniture.status != FurnitureState.MATERIALS_PREPARED:
             raise InvalidOperation("Materials must be prepared first")
         
+        graph = part_graph(furniture.type)
+        if graph is not None and len(graph) > 1:
+            self._execute_parts(furniture, graph)
+            return
+        
         available_tool = Tool.find_available(self.tools)
         if not available_tool: 
             raise InvalidAmountError("No available tools for work")
         
-        available_worker = Worker.find_available(self.workers)
+        available_worker = pick_worker(self.workers, furniture.status)
         if not available_worker: 
             raise InvalidAmountError("No available workers")
         
-        metal_needed = 0.0
-        wood_needed = 0.0
-        
-        for material in furniture.materials:
-            if material.__class__.__name__ == "Metal":
-                metal_needed += material.amount
-            elif material.__class__.__name__ == "Wood":
-                wood_needed += material.amount
-        
-        if metal_needed > self.warehouse.metal_amount:
-            raise InvalidAmountError(f"Not enough metal. Need {metal_needed}, have {self.warehouse.metal_amount}")
-        
-        if wood_needed > self.warehouse.wood_amount:
-            raise InvalidAmountError(f"Not enough wood. Need {wood_needed}, have {self.warehouse.wood_amount}")
-        
-        self.warehouse.metal_amount -= metal_needed
-        self.warehouse.wood_amount -= wood_needed
-        
+        bill = self._checked_bill(furniture)
+        # The tool is worn before the stock is drawn: a tool that fails leaves
+        # the materials in place.
         available_worker.is_busy = True
         available_tool.use()
+        allocation = self.warehouse.consume(bill)
         
         furniture.change_status(FurnitureState.ELEMENTS_MANUFACTURED)
         
@@ -108,10 +99,48 @@ class CreateElementOperation(Operation):
         print(f"   Elements manufactured for {furniture.type}")
         print(f"   Worker: {available_worker.name}")
         print(f"   Tool: {available_tool.name}")
-        print(f"   Metal used: {metal_needed}")
-        print(f"   Wood used: {wood_needed}")
+        self._print_usage(bill, allocation)
+        print(f"   Status: {furniture.status}")
+
+    def _execute_parts(self, furniture: Furniture, graph: PartGraph) -> None:
+        # Parts are made side by side by different workers and tools; the item
+        # moves on to assembly only once every part is done.
+        jobs = schedule_elements(graph, self.workers, self.tools)
+        bill = self._checked_bill(furniture)
+        
+        crew = {id(job.worker): job.worker for job in jobs}
+        for worker in crew.values():
+            worker.is_busy = True
+        for job in jobs:
+            job.tool.use()
+        allocation = self.warehouse.consume(bill)
+        
+        furniture.change_status(FurnitureState.ELEMENTS_MANUFACTURED)
+        
+        for worker in crew.values():
+            worker.is_busy = False
+        self.jobs = jobs
+        
+        print(f"   Elements manufactured for {furniture.type}")
+        for job in jobs:
+            print(f"   {job}")
+        print(f"   Parts done in {max(job.finish for job in jobs):.2f} h by {len(crew)} worker(s)")
+        self._print_usage(bill, allocation)
         print(f"   Status: {furniture.status}")
 
+    def _checked_bill(self, furniture: Furniture):
+        bill = self.warehouse.bill_of_materials(furniture.materials, furniture.quantity)
+        if not self.warehouse.has_materials(bill):
+            raise ShortageError(describe_shortage(self.warehouse.shortages(bill)[0]))
+        return bill
+
+    @staticmethod
+    def _print_usage(bill, allocation) -> None:
+        for kind, amount in bill.by_kind().items():
+            print(f"   {kind.capitalize()} used: {amount}")
+        for source, part in allocation or ():
+            print(f"   From {source.name}: {part}")
+
 
 class AssemblyOperation(Operation):
     def __init__(self, warehouse: Warehouse, workers: List[Worker]):
@@ -122,7 +151,7 @@ class AssemblyOperation(Operation):
         if furniture.status != FurnitureState.ELEMENTS_MANUFACTURED:
             raise ValueError("Cannot assemble: elements must be manufactured first")
         
-        available_worker = Worker.find_available(self.workers)
+        available_worker = pick_worker(self.workers, furniture.status)
         if not available_worker: 
             raise InvalidAmountError("No available workers for assembly")
         
@@ -141,7 +170,9 @@ class CheckOperation(Operation):
         self.inspector = inspector
         self.workers = workers if workers else []
     
-    def execute(self, furniture: Furniture) -> None:
+    PASS_SCORE = 70
+    
+    def execute(self, furniture: Furniture) -> Optional[Furniture]:
         if furniture.status != FurnitureState.ASSEMBLED:
             raise InvalidOperation("Can't check quality before assembly")
         
@@ -152,6 +183,9 @@ class CheckOperation(Operation):
         if inspector.is_busy:
             raise InvalidOperation(f"Inspector {inspector.name} is busy")
         
+        if furniture.is_lot:
+            return self._check_lot(furniture, inspector)
+        
         inspector.is_busy = True
         
         possible_defects = ["Scratch", "Crack", "Paint issue", "Loose screw"]
@@ -163,7 +197,7 @@ class CheckOperation(Operation):
             defects = []
         
         score = random.randint(50, 100)
-        passed = score >= 70
+        passed = score >= self.PASS_SCORE
         
         furniture.quality_score = score
         furniture.defects = defects
@@ -185,15 +219,58 @@ class CheckOperation(Operation):
         print(f"   Inspector: {inspector.name}")
         
         inspector.is_busy = False
+    
+    @staticmethod
+    def sample_size(quantity: int) -> int:
+        return min(quantity, max(5, isqrt(quantity)))
+    
+    def _check_lot(self, furniture: Furniture, inspector: Worker) -> Optional[Furniture]:
+        inspector.is_busy = True
+        
+        quantity = furniture.quantity
+        sample = self.sample_size(quantity)
+        scores = [random.randint(50, 100) for _ in range(sample)]
+        failed_in_sample = sum(1 for score in scores if score < self.PASS_SCORE)
+        # The sample decides for the lot: its defective share is applied to the
+        # whole lot, and any failed sample sends at least one unit to rework.
+        if failed_in_sample == sample:
+            failed = quantity
+        elif failed_in_sample:
+            failed = min(quantity - 1, max(1, round(quantity * failed_in_sample / sample)))
+        else:
+            failed = 0
+        
+        furniture.quality_score = sum(scores) // sample
+        furniture.inspector_name = inspector.name
+        furniture.defects = []
+        rework = None
+        
+        if failed == 0:
+            furniture.change_status(FurnitureState.QUALITY_CHECKED)
+            print(f"   Lot of {furniture.quantity} {furniture.type} PASSED (sample: {sample})")
+        elif failed == furniture.quantity:
+            furniture.quality_failed = True
+            furniture.change_status(FurnitureState.ELEMENTS_MANUFACTURED)
+            print(f"   Lot of {furniture.quantity} {furniture.type} FAILED, whole lot goes to rework")
+        else:
+            rework = furniture.split(failed)
+            rework.quality_failed = True
+            rework.change_status(FurnitureState.ELEMENTS_MANUFACTURED)
+            furniture.change_status(FurnitureState.QUALITY_CHECKED)
+            print(f"   Lot of {quantity} {furniture.type}: {failed_in_sample} of {sample} sampled failed")
+            print(f"   {furniture.quantity} passed, {failed} split off for rework")
+        
+        print(f"   Inspector: {inspector.name}")
+        
+        inspector.is_busy = False
+        return rework
 class PackingOperation(Operation):
-    def __init__(self, packer: Worker, workers: List[Worker] = None):
+    def __init__(self, packer: Worker, workers: List[Worker] = None, warehouse: Warehouse = None):
         self.packer = packer
         self.workers = workers if workers else []
+        self.warehouse = warehouse
     
-    def execute(self, furniture: Furniture):
-        if furniture.status != FurnitureState.QUALITY_CHECKED:
-            raise ValueError("Can't pack before quality check")
-        
+    def _find_packer(self) -> Worker:
         packer = self.packer
         if not packer and self.workers:
             packer = Worker.find_by_specialization(self.workers, "packer")
@@ -203,7 +280,18 @@ class PackingOperation(Operation):
         
         if packer.is_busy:
             raise InvalidOperation(f"Packer {packer.name} is busy")
+        return packer
+    
+    def execute(self, furniture: Furniture):
+        if furniture.status != FurnitureState.QUALITY_CHECKED:
+            raise ValueError("Can't pack before quality check")
         
+        if self.warehouse is not None:
+            if self.execute_batch([furniture]):
+                raise ShortageError(self.shortage([furniture]))
+            return
+        
+        packer = self._find_packer()
         packer.is_busy = True
         
         possible_packing_material = ["Paper", "Box", "Film"]
@@ -221,13 +309,78 @@ class PackingOperation(Operation):
         print(f"   Packing materials: {', '.join(packing_material)}")
         print(f"   Packer: {packer.name}")
         print(f"   Status: {furniture.status}")
+    
+    def execute_batch(self, furnitures: List[Furniture]) -> List[Furniture]:
+        # Packs, in one transaction, every item the stock covers and returns
+        # the ones left waiting for packing material.
+        if self.warehouse is None:
+            raise InvalidOperation("Packing stock warehouse is not set")
+        if any(furniture.status != FurnitureState.QUALITY_CHECKED for furniture in furnitures):
+            raise ValueError("Can't pack before quality check")
+        
+        packer = self._find_packer()
+        covered, left = self._covered(furnitures)
+        if not covered:
+            return left
+        bill = self.warehouse.bill_of_materials(packing_materials(covered))
+        self.warehouse.consume(bill)
+        
+        packer.is_busy = True
+        recipes = {}
+        for furniture in covered:
+            prod_type = furniture.type.lower()
+            if prod_type not in recipes:
+                recipes[prod_type] = [grade for grade, _ in packing_recipe(prod_type)]
+            furniture.packing_material = recipes[prod_type]
+            furniture.packer_name = packer.name
+            furniture.change_status(FurnitureState.PACKED)
+        packer.is_busy = False
+        
+        print(f"   Packed {len(covered)} item(s)")
+        if left:
+            print(f"   Waiting for packing material: {len(left)} item(s)")
+        print(f"   Packing materials used: {bill}")
+        print(f"   Packer: {packer.name}")
+        return left
+    
+    def _covered(self, furnitures: List[Furniture]) -> Tuple[List[Furniture], List[Furniture]]:
+        # In queue order, an item is taken if the stock still covers it after
+        # the ones taken before it.
+        ledger = self.warehouse.ledger
+        left_over = ledger.vector()
+        bills = {}
+        covered, left = [], []
+        for furniture in furnitures:
+            key = (furniture.type.lower(), furniture.quantity)
+            if key not in bills:
+                bills[key] = ledger.bill(packing_materials([furniture]))
+            bill = bills[key]
+            if all(left_over[slot] >= need for slot, need in zip(bill.slots, bill.amounts)):
+                for slot, need in zip(bill.slots, bill.amounts):
+                    left_over[slot] -= need
+                covered.append(furniture)
+            else:
+                left.append(furniture)
+        return covered, left
+    
+    def shortage(self, furnitures: List[Furniture]) -> str:
+        shortages = self.forecast(furnitures)
+        return describe_shortage(shortages[0]) if shortages else "Not enough packing material"
+    
+    def forecast(self, furnitures: List[Furniture]) -> List[Tuple[Key, float, float]]:
+        if self.warehouse is None:
+            raise InvalidOperation("Packing stock warehouse is not set")
+        pending = [f for f in furnitures if f.status not in PACKED_STATES]
+        return self.warehouse.shortages(self.warehouse.bill_of_materials(packing_materials(pending)))
 
 
 class DeliveryOperation(Operation):
-    def __init__(self, delivery_man: Worker, address: str = None, workers: List[Worker] = None):
+    def __init__(self, delivery_man: Worker, address: str = None, workers: List[Worker] = None,
+                 workshop: Workshop = None):
         self.delivery_man = delivery_man
         self.address = address
         self.workers = workers if workers else []
+        self.workshop = workshop
     
     def execute(self, furniture: Furniture):
         if furniture.status != FurnitureState.PACKED:
@@ -256,7 +409,8 @@ class DeliveryOperation(Operation):
         
         furniture.change_status(FurnitureState.DELIVERED)
         
-        self.workshop.add_completed_furniture(furniture)
+        if self.workshop is not None:
+            self.workshop.add_completed_furniture(furniture)
         
         delivery_man.is_busy = False
         
@@ -265,4 +419,5 @@ class DeliveryOperation(Operation):
         print(f"   Address: {delivery_address}")
         print(f"   Date: {furniture.delivery_date.strftime('%Y-%m-%d %H:%M')}")
         print(f"   Status: {furniture.status}")
-        print(f"   Stored in: {self.workshop.workshop_type}")
\ No newline at end of file
+        if self.workshop is not None:
+            print(f"   Stored in: {self.workshop.workshop_type}")
\ No newline at end of file
@@ -0,0 +1,217 @@
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from models.furniture import Furniture, FurnitureState
+from models.people import Worker
+from models.warehouse import Warehouse
+from models.workshop import Workshop
+from models.finished_goods import FinishedGoodsStore
+from models.exceptions import InvalidDataError, InvalidOperation
+from operations.assignment import pick_worker
+from operations.operations import (
+    PreparationOperation, CreateElementOperation, AssemblyOperation,
+    CheckOperation, PackingOperation
+)
+
+# A handler runs one stage for one item. It may return a part split off the
+# item (a lot that failed inspection), which then enters the pipeline itself.
+Handler = Callable[[Furniture], Optional[Furniture]]
+TERMINAL_STATES = (FurnitureState.STORED, FurnitureState.DELIVERED)
+
+
+class ProductionContext:
+    def __init__(self, warehouse: Warehouse, workers: List[Worker], tools, workshop: Workshop = None,
+                 finished: FinishedGoodsStore = None, packing_warehouse: Warehouse = None):
+        self.warehouse = warehouse
+        self.workers = workers
+        self.tools = tools
+        self.workshop = workshop if workshop is not None else Workshop("Batch")
+        self.finished = finished
+        self.packing_warehouse = packing_warehouse
+
+
+class Stage:
+    # Runs at `state` and may move the item to one of `targets`, or back to
+    # `retry` (a failed check sends the item to an earlier stage).
+    def __init__(self, name: str, state: FurnitureState, targets: Sequence[FurnitureState], title: str,
+                 make: Callable[[ProductionContext], Handler], retry: FurnitureState = None):
+        if not name:
+            raise InvalidDataError("Stage name can't be empty")
+        self.name = name
+        self.state = state
+        self.targets = tuple(targets)
+        self.title = title
+        self.make = make
+        self.retry = retry
+
+    def __repr__(self) -> str:
+        targets = ", ".join(s.value for s in self.targets) or "in place"
+        return f"Stage({self.name}: {self.state.value} -> {targets})"
+
+
+class Pipeline:
+    def __init__(self, stages: Iterable[Stage], terminal: Sequence[FurnitureState] = TERMINAL_STATES):
+        self.stages: Tuple[Stage, ...] = tuple(stages)
+        self.terminal = frozenset(terminal)
+        self.by_state: Dict[FurnitureState, Stage] = {}
+        self.by_name: Dict[str, Stage] = {}
+        self.table: Dict[FurnitureState, frozenset] = {}
+        self.position: Dict[str, int] = {}
+        self.chains: Dict[FurnitureState, Tuple[Stage, ...]] = {}
+        self._compile()
+
+    def _compile(self) -> None:
+        # A stage without targets does its work in place (painting, labelling)
+        # and runs just before the stage that moves the item on from its state.
+        inline: List[Stage] = []
+        for number, stage in enumerate(self.stages):
+            if stage.name in self.by_name:
+                raise InvalidDataError(f"Stage {stage.name} is defined twice")
+            self.by_name[stage.name] = stage
+            self.position[stage.name] = number
+            if not stage.targets:
+                inline.append(stage)
+                continue
+            if stage.state in self.by_state:
+                raise InvalidDataError(f"Stages {self.by_state[stage.state].name} and {stage.name} "
+                                       f"both start from {stage.state.value}")
+            if any(extra.state is not stage.state for extra in inline):
+                raise InvalidDataError(f"Stages placed before {stage.name} must run at {stage.state.value}")
+            self.by_state[stage.state] = stage
+            self.chains[stage.state] = tuple(inline) + (stage,)
+            inline = []
+        if inline:
+            raise InvalidDataError(f"Stage {inline[0].name} is not followed by a stage that moves the item")
+        for stage in self.by_state.values():
+            for target in stage.targets:
+                if target not in self.by_state and target not in self.terminal:
+                    raise InvalidDataError(f"Stage {stage.name} leads to {target.value}, which no stage handles")
+            if stage.retry is not None and stage.retry not in self.by_state:
+                raise InvalidDataError(f"Stage {stage.name} retries at {stage.retry.value}, which no stage handles")
+            allowed = set(stage.targets)
+            if stage.retry is not None:
+                allowed.add(stage.retry)
+            self.table[stage.state] = frozenset(allowed)
+
+    def insert(self, stage: Stage, before: str) -> "Pipeline":
+        # Returns a new pipeline; the engines already built keep the old one.
+        if before not in self.by_name:
+            raise InvalidDataError(f"Unknown stage {before}")
+        stages = list(self.stages)
+        stages.insert(self.position[before], stage)
+        return Pipeline(stages, self.terminal)
+
+    def replace(self, stage: Stage) -> "Pipeline":
+        if stage.name not in self.by_name:
+            raise InvalidDataError(f"Unknown stage {stage.name}")
+        return Pipeline([stage if s.name == stage.name else s for s in self.stages], self.terminal)
+
+    def engine(self, context: ProductionContext, handlers: Dict[str, Handler] = None,
+               on_enter: Callable[[Stage, Furniture], None] = None,
+               on_exit: Callable[[Stage, Furniture, float], None] = None) -> "PipelineEngine":
+        return PipelineEngine(self, context, handlers or {}, on_enter, on_exit)
+
+
+class PipelineEngine:
+    def __init__(self, pipeline: Pipeline, context: ProductionContext, handlers: Dict[str, Handler],
+                 on_enter: Callable[[Stage, Furniture], None] = None,
+                 on_exit: Callable[[Stage, Furniture, float], None] = None):
+        unknown = set(handlers) - set(pipeline.by_name)
+        if unknown:
+            raise InvalidDataError(f"Handlers for unknown stages: {', '.join(sorted(unknown))}")
+        self.pipeline = pipeline
+        self.terminal = pipeline.terminal
+        self.on_enter = on_enter
+        self.on_exit = on_exit
+        # Built once: the current state alone picks the stages to run, their
+        # handlers and the states the item may move to.
+        self._dispatch = {
+            state: tuple((stage, handlers.get(stage.name) or stage.make(context)) for stage in chain)
+            for state, chain in pipeline.chains.items()
+        }
+        self._allowed = pipeline.table
+
+    def step(self, furniture: Furniture) -> Tuple[Stage, Optional[Furniture]]:
+        before = furniture.status
+        chain = self._dispatch.get(before)
+        if chain is None:
+            raise InvalidOperation(f"No stage handles {furniture.type} in state {before.value}")
+        spawned = None
+        for stage, handler in chain:
+            if self.on_enter is not None:
+                self.on_enter(stage, furniture)
+            started = time.perf_counter()
+            spawned = handler(furniture)
+            seconds = time.perf_counter() - started
+            after = furniture.status
+            if after is not before and (not stage.targets or after not in self._allowed[before]):
+                raise InvalidOperation(f"Stage {stage.name} moved {furniture.type} from {before.value} "
+                                       f"to {after.value}, which the pipeline does not allow")
+            if self.on_exit is not None:
+                self.on_exit(stage, furniture, seconds)
+        return stage, spawned
+
+    def run(self, furniture: Furniture, on_spawn: Callable[[Furniture], None] = None,
+            stop_on_retry: bool = False) -> Optional[Stage]:
+        # Runs stages until the item is finished, a stage leaves it where it was
+        # (waiting for a worker, storage or a batch) or, if asked, it is sent back.
+        last = None
+        while furniture.status not in self.terminal:
+            before = furniture.status
+            last, spawned = self.step(furniture)
+            if spawned is not None and on_spawn is not None:
+                on_spawn(spawned)
+            if furniture.status is before:
+                break
+            if stop_on_retry and furniture.status is last.retry:
+                break
+        return last
+
+
+def _prepare(context: ProductionContext) -> Handler:
+    return PreparationOperation(context.warehouse, context.workers, context.tools).execute
+
+
+def _elements(context: ProductionContext) -> Handler:
+    return CreateElementOperation(context.warehouse, context.workers, context.tools).execute
+
+
+def _assembly(context: ProductionContext) -> Handler:
+    return AssemblyOperation(context.warehouse, context.workers).execute
+
+
+def _check(context: ProductionContext) -> Handler:
+    def check(furniture: Furniture) -> Optional[Furniture]:
+        return CheckOperation(pick_worker(context.workers, furniture.status), context.workers).execute(furniture)
+    return check
+
+
+def _packing(context: ProductionContext) -> Handler:
+    def pack(furniture: Furniture) -> None:
+        PackingOperation(pick_worker(context.workers, furniture.status), context.workers,
+                         context.packing_warehouse).execute(furniture)
+    return pack
+
+
+def _storage(context: ProductionContext) -> Handler:
+    def store(furniture: Furniture) -> None:
+        if context.finished is not None and not context.finished.put(furniture):
+            return
+        furniture.change_status(FurnitureState.STORED)
+        context.workshop.add_completed_furniture(furniture)
+    return store
+
+
+PRODUCTION = Pipeline([
+    Stage("prepare", FurnitureState.CREATED, [FurnitureState.MATERIALS_PREPARED],
+          "Подготовка материалов", _prepare),
+    Stage("elements", FurnitureState.MATERIALS_PREPARED, [FurnitureState.ELEMENTS_MANUFACTURED],
+          "Изготовление деталей", _elements),
+    Stage("assembly", FurnitureState.ELEMENTS_MANUFACTURED, [FurnitureState.ASSEMBLED],
+          "Сборка", _assembly),
+    Stage("check", FurnitureState.ASSEMBLED, [FurnitureState.QUALITY_CHECKED],
+          "Контроль качества", _check, retry=FurnitureState.ELEMENTS_MANUFACTURED),
+    Stage("packing", FurnitureState.QUALITY_CHECKED, [FurnitureState.PACKED],
+          "Упаковка", _packing),
+    Stage("storage", FurnitureState.PACKED, [FurnitureState.STORED],
+          "Доставка на склад", _storage),
+])
@@ -0,0 +1,194 @@
+import heapq
+from datetime import datetime
+from itertools import count
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from models.furniture import Furniture, FurnitureState
+from models.orders import Order
+from models.people import Worker
+from models.tool import Tool
+from models.exceptions import InvalidDataError
+from operations.assignment import NEXT_STATE, assignment_score, stage_duration
+from operations.elements import ELEMENT_STAGE, PartGraph, part_graph
+
+TOOL_STAGES = (FurnitureState.CREATED, FurnitureState.MATERIALS_PREPARED)
+
+
+class OrderScheduler:
+    POLICIES = ("edf", "fifo")
+
+    def __init__(self, start: datetime = None, policy: str = "edf",
+                 aging_rate: float = 0.5, priority_hours: float = 24.0, undated_hours: float = 168.0):
+        if policy not in self.POLICIES:
+            raise InvalidDataError(f"Policy must be one of {', '.join(self.POLICIES)}")
+        if aging_rate < 0 or priority_hours < 0 or undated_hours < 0:
+            raise InvalidDataError("Aging rate, priority weight and undated horizon can't be negative")
+        self.start = start if start is not None else datetime.now()
+        self.policy = policy
+        self.aging_rate = aging_rate
+        self.priority_hours = priority_hours
+        self.undated_hours = undated_hours
+        self._heap: list = []
+        self._seq = count()
+
+    def hours(self, moment: datetime) -> float:
+        return (moment - self.start).total_seconds() / 3600
+
+    def key(self, order: Optional[Order], enqueued: float) -> float:
+        if self.policy == "fifo":
+            return enqueued
+        # An order without a deadline is treated as due undated_hours after it
+        # was queued, so it ages like the rest instead of waiting forever.
+        if order is None or order.due_date is None:
+            due = enqueued + self.undated_hours
+        else:
+            due = self.hours(order.due_date)
+        priority = order.priority if order is not None else 0
+        # Aging lowers every waiting key by aging_rate * (now - enqueued); the
+        # now-term is shared by all entries, so only + aging_rate * enqueued
+        # changes the order and the key stays fixed while the item waits.
+        return due - self.priority_hours * priority + self.aging_rate * enqueued
+
+    def push(self, item: Union[Furniture, int], order: Optional[Order] = None,
+             enqueued: float = 0.0) -> None:
+        heapq.heappush(self._heap, (self.key(order, enqueued), next(self._seq), item, order))
+
+    def pop(self) -> Tuple[Union[Furniture, int], Optional[Order]]:
+        if not self._heap:
+            raise InvalidDataError("No orders waiting")
+        _, _, item, order = heapq.heappop(self._heap)
+        return item, order
+
+    def peek(self) -> Union[Furniture, int, None]:
+        return self._heap[0][2] if self._heap else None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class ScheduleReport:
+    def __init__(self, completion: Dict[int, float], due: Dict[int, float], total: int):
+        self.completion = completion
+        self.due = due
+        self.total = total
+
+    @property
+    def completed(self) -> int:
+        return len(self.completion)
+
+    def tardiness(self, item: int) -> float:
+        return max(0.0, self.completion[item] - self.due.get(item, float("inf")))
+
+    @property
+    def on_time_percent(self) -> float:
+        if not self.completion:
+            return 0.0
+        on_time = sum(1 for item in self.completion if self.tardiness(item) == 0)
+        return on_time * 100 / len(self.completion)
+
+    @property
+    def mean_tardiness(self) -> float:
+        if not self.completion:
+            return 0.0
+        return sum(self.tardiness(item) for item in self.completion) / len(self.completion)
+
+    @property
+    def max_tardiness(self) -> float:
+        return max((self.tardiness(item) for item in self.completion), default=0.0)
+
+    def __str__(self) -> str:
+        return (f"Completed: {self.completed}/{self.total}, on time: {self.on_time_percent:.1f}%, "
+                f"mean tardiness: {self.mean_tardiness:.2f} h, max tardiness: {self.max_tardiness:.2f} h")
+
+
+def simulate_schedule(jobs: Sequence[Tuple[Furniture, Order]], workers: Sequence[Worker],
+                      tools: Sequence[Tool] = (), policy: str = "edf",
+                      start: datetime = None, aging_rate: float = 0.5,
+                      split_parts: bool = True) -> ScheduleReport:
+    if not workers:
+        raise InvalidDataError("Simulation needs at least one worker")
+    if start is None:
+        start = min((order.created_at for _, order in jobs), default=datetime.now())
+    scheduler = OrderScheduler(start, policy, aging_rate)
+    free_tools = sum(1 for tool in tools if not tool.is_broken) if tools else len(workers)
+    busy = [False] * len(workers)
+    events: list = []
+    seq = count()
+    due: Dict[int, float] = {}
+    completion: Dict[int, float] = {}
+    state: Dict[int, FurnitureState] = {}
+    arrival: Dict[int, float] = {}
+    # With split_parts, the elements stage of an item that has a part plan is
+    # queued as one task per part (item, part): parts whose dependencies are
+    # done run on any free workers, and the item moves on when all are made.
+    graphs: Dict[int, PartGraph] = {}
+    waiting: Dict[int, List[int]] = {}
+    parts_left: Dict[int, int] = {}
+    for item, (furniture, order) in enumerate(jobs):
+        if furniture.status not in NEXT_STATE:
+            continue
+        state[item] = furniture.status
+        if order.due_date is not None:
+            due[item] = scheduler.hours(order.due_date)
+        arrival[item] = max(0.0, scheduler.hours(order.created_at))
+        graph = part_graph(furniture.type) if split_parts else None
+        if graph is not None and len(graph) > 1:
+            graphs[item] = graph
+        heapq.heappush(events, (arrival[item], next(seq), item, None, False))
+
+    def enqueue(item: int) -> None:
+        graph = graphs.get(item)
+        if graph is None or state[item] is not ELEMENT_STAGE:
+            scheduler.push(item, jobs[item][1], arrival[item])
+            return
+        waiting[item] = list(graph.needs)
+        parts_left[item] = len(graph)
+        for part in graph.roots:
+            scheduler.push((item, part), jobs[item][1], arrival[item])
+
+    now = 0.0
+    while events or len(scheduler):
+        deferred = []
+        while len(scheduler) and not all(busy):
+            task, order = scheduler.pop()
+            item, part = task if isinstance(task, tuple) else (task, None)
+            stage = state[item]
+            uses_tool = stage in TOOL_STAGES
+            if uses_tool and free_tools == 0:
+                deferred.append((task, order))
+                continue
+            worker_index = max((i for i in range(len(workers)) if not busy[i]),
+                               key=lambda i: assignment_score(workers[i], stage))
+            busy[worker_index] = True
+            free_tools -= uses_tool
+            hours = graphs[item].hours[part] if part is not None else None
+            finish = now + stage_duration(workers[worker_index], stage, hours)
+            heapq.heappush(events, (finish, next(seq), task, worker_index, uses_tool))
+        for task, order in deferred:
+            scheduler.push(task, order, arrival[task[0] if isinstance(task, tuple) else task])
+        if not events:
+            break
+        now = events[0][0]
+        while events and events[0][0] == now:
+            _, _, task, worker_index, used_tool = heapq.heappop(events)
+            if worker_index is None:
+                enqueue(task)
+                continue
+            busy[worker_index] = False
+            free_tools += used_tool
+            if isinstance(task, tuple):
+                item, part = task
+                for follower in graphs[item].followers[part]:
+                    waiting[item][follower] -= 1
+                    if not waiting[item][follower]:
+                        scheduler.push((item, follower), jobs[item][1], arrival[item])
+                parts_left[item] -= 1
+                if parts_left[item]:
+                    continue
+            else:
+                item = task
+            state[item] = NEXT_STATE[state[item]]
+            if state[item] not in NEXT_STATE:
+                completion[item] = now
+                continue
+            enqueue(item)
+    return ScheduleReport(completion, due, len(jobs))
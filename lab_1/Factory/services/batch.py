@@ -0,0 +1,239 @@
+import contextlib
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Type
+from models.furniture import Furniture, FurnitureState
+from models.people import Worker
+from models.tool_manager import ToolManager
+from models.warehouse import Warehouse
+from models.ledger import Key, MaterialLedger
+from models.finished_goods import FinishedGoodsStore
+from models.recipes import item_load
+from models.workshop import Workshop
+from models.exceptions import InvalidAmountError, InvalidDataError, InvalidOperation, ShortageError
+from operations.assignment import pick_worker
+from operations.operations import AssemblyOperation, CheckOperation, PackingOperation
+from operations.pipeline import PRODUCTION, Pipeline, ProductionContext, Stage
+from operations.scheduler import OrderScheduler
+
+FINISHED_STATES = (FurnitureState.STORED, FurnitureState.DELIVERED)
+BATCH_ERRORS = (InvalidAmountError, InvalidDataError, InvalidOperation, ValueError)
+
+
+class BatchReport:
+    def __init__(self):
+        self.completed: List[Furniture] = []
+        self.failed: List[Tuple[Furniture, str]] = []
+        # Exception type behind each entry of failed, in the same order.
+        self.errors: List[Type[Exception]] = []
+        self.waiting: List[Furniture] = []
+        self.stage_counts: Dict[str, int] = {}
+        self.stage_seconds: Dict[str, float] = {}
+        self.consumed: Dict[Key, float] = {}
+        self.seconds = 0.0
+
+    @property
+    def metal_used(self) -> float:
+        return self.used("metal")
+
+    @property
+    def wood_used(self) -> float:
+        return self.used("wood")
+
+    def used(self, kind: str) -> float:
+        return sum(amount for (used_kind, _), amount in self.consumed.items() if used_kind == kind)
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        self.stage_counts[stage] = self.stage_counts.get(stage, 0) + 1
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    def fail(self, furniture: Furniture, error: Exception) -> None:
+        self.failed.append((furniture, str(error)))
+        self.errors.append(type(error))
+
+    def failed_with(self, error: Type[Exception]) -> List[Furniture]:
+        return [furniture for (furniture, _), kind in zip(self.failed, self.errors) if issubclass(kind, error)]
+
+    def merge(self, other: "BatchReport") -> None:
+        self.completed.extend(other.completed)
+        self.failed.extend(other.failed)
+        self.errors.extend(other.errors)
+        self.waiting.extend(other.waiting)
+        for stage, count in other.stage_counts.items():
+            self.stage_counts[stage] = self.stage_counts.get(stage, 0) + count
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + other.stage_seconds[stage]
+        for key, amount in other.consumed.items():
+            self.consumed[key] = self.consumed.get(key, 0.0) + amount
+
+    @property
+    def completed_units(self) -> int:
+        return sum(f.quantity for f in self.completed)
+
+    def __str__(self) -> str:
+        lines = [f"Completed: {len(self.completed)} ({self.completed_units} units), "
+                 f"failed: {len(self.failed)}, {self.seconds:.2f} s"
+                 + (f", waiting for storage: {len(self.waiting)}" if self.waiting else ""),
+                 "Materials used: " + (", ".join(f"{kind}{f' ({grade})' if grade else ''} {amount}"
+                                                 for (kind, grade), amount in self.consumed.items()) or "none")]
+        for stage, count in self.stage_counts.items():
+            lines.append(f"   {stage}: {count} runs, {self.stage_seconds[stage]:.3f} s")
+        return "\n".join(lines)
+
+
+def consumed_since(ledger: MaterialLedger, before: Sequence[float]) -> Dict[Key, float]:
+    return {key: before[i] - amount for i, (key, amount) in enumerate(ledger.items())
+            if i < len(before) and before[i] != amount}
+
+
+@contextlib.contextmanager
+def _output(quiet: bool):
+    if not quiet:
+        yield
+        return
+    with open(os.devnull, "w", encoding="utf-8") as sink, contextlib.redirect_stdout(sink):
+        yield
+
+
+def _store(furniture: Furniture, workshop: Workshop, report: BatchReport, metrics=None,
+           entered: float = 0.0, finished: FinishedGoodsStore = None) -> None:
+    if finished is not None and not finished.put(furniture):
+        # Packed, but there is no room for it: it waits like unstarted work.
+        report.waiting.append(furniture)
+        return
+    furniture.change_status(FurnitureState.STORED)
+    workshop.add_completed_furniture(furniture)
+    report.completed.append(furniture)
+    if metrics is not None:
+        metrics.stored(furniture, entered)
+
+
+def run_batch(furnitures: Sequence[Furniture], warehouse: Warehouse, workers: List[Worker],
+              tools, workshop: Workshop = None, max_rework: int = 3, quiet: bool = True,
+              packing_warehouse: Warehouse = None, metrics=None, finished: FinishedGoodsStore = None,
+              make_room: Callable[[FinishedGoodsStore, float], None] = None,
+              pipeline: Pipeline = None, eta=None, scheduler: OrderScheduler = None) -> BatchReport:
+    if not isinstance(tools, ToolManager):
+        tools = ToolManager(tools)
+    workshop = workshop if workshop is not None else Workshop("Batch")
+    report = BatchReport()
+    # With a packing stock, checked items wait and are packed in one transaction.
+    to_pack: List[Furniture] = []
+    stock_before = warehouse.ledger.vector()
+    started = time.perf_counter()
+    # Items and reworks move through the stages in the scheduler's order (EDF by
+    # default); items without an order share one key and keep arrival order.
+    queue = scheduler if scheduler is not None else OrderScheduler()
+
+    def enqueue(furniture: Furniture) -> None:
+        queue.push(furniture, getattr(furniture, "order", None), queue.hours(datetime.now()))
+
+    for furniture in furnitures:
+        if furniture.status not in FINISHED_STATES:
+            enqueue(furniture)
+    reworks: Dict[int, int] = {}
+    # Only kept with metrics on: when each item entered the batch, for lead time.
+    entered: Dict[int, float] = {}
+    context = ProductionContext(warehouse, workers, tools, workshop, finished, packing_warehouse)
+    assembly = AssemblyOperation(warehouse, workers)
+
+    def assemble(furniture: Furniture) -> None:
+        if reworks.get(id(furniture), 0) > max_rework:
+            raise InvalidOperation(f"{furniture.type} failed quality check {max_rework} times")
+        assembly.execute(furniture)
+
+    def check(furniture: Furniture) -> Optional[Furniture]:
+        rework = CheckOperation(pick_worker(workers, furniture.status), workers).execute(furniture)
+        if rework is not None:
+            reworks[id(rework)] = reworks.get(id(furniture), 0) + 1
+            if finished is not None:
+                finished.split_reservation(furniture, rework)
+        if furniture.status == FurnitureState.ELEMENTS_MANUFACTURED:
+            reworks[id(furniture)] = reworks.get(id(furniture), 0) + 1
+        if metrics is not None:
+            passed = furniture.status == FurnitureState.QUALITY_CHECKED
+            metrics.quality_checked(furniture.quantity if passed else 0,
+                                    (rework.quantity if rework is not None else 0)
+                                    + (0 if passed else furniture.quantity))
+            if rework is not None:
+                entered[id(rework)] = entered[id(furniture)]
+        return rework
+
+    def pack(furniture: Furniture) -> None:
+        if packing_warehouse is not None:
+            to_pack.append(furniture)
+            return
+        PackingOperation(pick_worker(workers, furniture.status), workers).execute(furniture)
+
+    def store(furniture: Furniture) -> None:
+        _store(furniture, workshop, report, metrics, entered.get(id(furniture), started), finished)
+
+    def finished_stage(stage: Stage, furniture: Furniture, seconds: float) -> None:
+        # A moving stage that left the item in place (packing deferred) is not counted.
+        if furniture.status is stage.state and stage.targets:
+            return
+        report.record_stage(stage.state.value, seconds)
+        if metrics is not None:
+            metrics.stage_finished(stage.state, furniture, seconds)
+        if eta is not None:
+            # The measured stage time feeds the estimator's smoothed stage hours.
+            eta.observe(stage.state, seconds / 3600)
+            eta.update(furniture)
+
+    engine = (pipeline or PRODUCTION).engine(
+        context, {"assembly": assemble, "check": check, "packing": pack, "storage": store},
+        on_exit=finished_stage)
+    with _output(quiet):
+        while queue:
+            furniture, _ = queue.pop()
+            if finished is not None and not finished.reserve(furniture):
+                if make_room is not None:
+                    make_room(finished, item_load(furniture))
+                if not finished.reserve(furniture):
+                    # Storage is full: no new work is started and everything left
+                    # keeps its stage, so a later run resumes it once goods ship.
+                    report.waiting.append(furniture)
+                    while queue:
+                        report.waiting.append(queue.pop()[0])
+                    break
+            if metrics is not None:
+                entered.setdefault(id(furniture), time.perf_counter())
+            try:
+                engine.run(furniture, enqueue)
+                tools.run_repairs()
+            except BATCH_ERRORS as error:
+                report.fail(furniture, error)
+                if finished is not None:
+                    finished.cancel(furniture)
+        if to_pack:
+            stage_started = time.perf_counter()
+            stage = FurnitureState.QUALITY_CHECKED
+            packing = PackingOperation(pick_worker(workers, stage), workers, packing_warehouse)
+            try:
+                left = packing.execute_batch(to_pack)
+            except BATCH_ERRORS as error:
+                left, failure = to_pack, error
+            else:
+                failure = ShortageError(packing.shortage(left)) if left else None
+            # Items the stock didn't cover fail; the rest are stored.
+            for furniture in left:
+                report.fail(furniture, failure)
+                if finished is not None:
+                    finished.cancel(furniture)
+            packed = [furniture for furniture in to_pack if furniture.status is FurnitureState.PACKED]
+            if packed:
+                seconds = time.perf_counter() - stage_started
+                report.record_stage(stage.value, seconds)
+                if eta is not None:
+                    eta.observe(stage, seconds / len(packed) / 3600)
+                for furniture in packed:
+                    if metrics is not None:
+                        metrics.stage_finished(stage, furniture, seconds / len(packed))
+                    _store(furniture, workshop, report, metrics, entered.get(id(furniture), started), finished)
+                    if eta is not None:
+                        eta.update(furniture)
+    report.seconds = time.perf_counter() - started
+    report.consumed = consumed_since(warehouse.ledger, stock_before)
+    if metrics is not None:
+        metrics.materials_consumed(report.consumed)
+    return report
@@ -0,0 +1,165 @@
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+from models.furniture import Furniture, FurnitureState
+from models.people import Worker
+from models.tool import Tool
+from models.exceptions import InvalidDataError
+from operations.assignment import NEXT_STATE, STAGE_HOURS, stage_duration
+from operations.scheduler import TOOL_STAGES
+
+STAGES = tuple(NEXT_STATE)
+
+
+class _Fenwick:
+    # Counts per position with prefix sums in O(log n). The size doubles when
+    # a position past the end is used: the new top node covers the old tree,
+    # everything else in the new half starts empty.
+    def __init__(self, size: int = 64):
+        self.tree = array('l', bytes(8 * (size + 1)))
+
+    def add(self, position: int, delta: int) -> None:
+        while position + 1 >= len(self.tree):
+            size = len(self.tree) - 1
+            self.tree.extend(array('l', bytes(8 * size)))
+            self.tree[2 * size] = self.tree[size]
+        i = position + 1
+        size = len(self.tree)
+        while i < size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def before(self, position: int) -> int:
+        # Sum over positions [0, position).
+        total, i = 0, min(position, len(self.tree) - 1)
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+
+class EtaEstimator:
+    # Each state keeps its items in the order they reached it. An item waits
+    # for everything further along and for what reached its state first; the
+    # shop is taken as a pool of workers (and tools for the tool stages), so
+    # its ETA is that work over the pool, but never less than its own remaining
+    # stages. Per-state projections are rebuilt only after the counts or the
+    # durations change; each query is one prefix sum.
+    def __init__(self, workers: Sequence[Worker] = (), tools: Sequence[Tool] = (), alpha: float = 0.2):
+        if not 0 < alpha <= 1:
+            raise InvalidDataError("Smoothing factor must be in (0, 1]")
+        self.alpha = alpha
+        self.hours: Dict[FurnitureState, float] = dict(STAGE_HOURS)
+        self.counts: Dict[FurnitureState, int] = {state: 0 for state in STAGES}
+        self._queues = {state: _Fenwick() for state in STAGES}
+        self._next = {state: 0 for state in STAGES}
+        self._items: Dict[Furniture, Tuple[FurnitureState, int]] = {}
+        self._projections: Dict[FurnitureState, Tuple[float, float, float, float]] = {}
+        self._cache: Dict[Furniture, Tuple[int, Optional[float]]] = {}
+        self._version = 0
+        self.workers = 0
+        self.tools = 0
+        self.set_capacity(workers, tools)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, furniture: Furniture) -> bool:
+        return furniture in self._items
+
+    def _changed(self) -> None:
+        self._projections.clear()
+        self._version += 1
+
+    def set_capacity(self, workers: Sequence[Worker], tools: Sequence[Tool]) -> None:
+        # Stage hours start from the mean over the roster until observations
+        # come in.
+        self.workers = len(workers)
+        self.tools = sum(1 for tool in tools if not tool.is_broken)
+        if workers:
+            for state in STAGES:
+                self.hours[state] = sum(stage_duration(worker, state) for worker in workers) / len(workers)
+        self._changed()
+
+    def observe(self, state: FurnitureState, hours: float) -> None:
+        if state not in self.counts:
+            raise InvalidDataError(f"No stage runs at {state.value}")
+        if hours < 0:
+            raise InvalidDataError("Stage duration can't be negative")
+        self.hours[state] += self.alpha * (hours - self.hours[state])
+        self._changed()
+
+    def _enter(self, furniture: Furniture, state: FurnitureState) -> None:
+        position = self._next[state]
+        self._next[state] = position + 1
+        self._queues[state].add(position, 1)
+        self.counts[state] += 1
+        self._items[furniture] = (state, position)
+
+    def _leave(self, furniture: Furniture) -> None:
+        state, position = self._items.pop(furniture)
+        self._queues[state].add(position, -1)
+        self.counts[state] -= 1
+        self._cache.pop(furniture, None)
+
+    def track(self, furnitures: Iterable[Furniture]) -> None:
+        for furniture in furnitures:
+            self.update(furniture)
+
+    def update(self, furniture: Furniture) -> None:
+        # Call after an item changes state; untracked items are added, finished
+        # ones dropped, and an item still in its state keeps its place.
+        entry = self._items.get(furniture)
+        state = furniture.status
+        if entry is not None and entry[0] is state:
+            return
+        if entry is not None:
+            self._leave(furniture)
+        if state in self.counts:
+            self._enter(furniture, state)
+        self._changed()
+
+    def remove(self, furniture: Furniture) -> None:
+        if furniture in self._items:
+            self._leave(furniture)
+            self._changed()
+
+    def _project(self) -> None:
+        # For every state: hours of work from it to the end, the part of that
+        # on tool stages, and the work and tool work queued in later states.
+        later = later_tools = remaining = remaining_tools = 0.0
+        for state in reversed(STAGES):
+            self._projections[state] = (remaining + self.hours[state],
+                                        remaining_tools + (self.hours[state] if state in TOOL_STAGES else 0.0),
+                                        later, later_tools)
+            remaining, remaining_tools, _, _ = self._projections[state]
+            later += self.counts[state] * remaining
+            later_tools += self.counts[state] * remaining_tools
+
+    def hours_left(self, furniture: Furniture) -> Optional[float]:
+        # None for items not tracked or that can't finish with the current pool.
+        entry = self._items.get(furniture)
+        if entry is None:
+            return None
+        cached = self._cache.get(furniture)
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+        if not self._projections:
+            self._project()
+        state, position = entry
+        remaining, remaining_tools, later, later_tools = self._projections[state]
+        ahead = self._queues[state].before(position) + 1
+        tool_work = later_tools + ahead * remaining_tools
+        if not self.workers or (tool_work and not self.tools):
+            hours = None
+        else:
+            hours = max(remaining, (later + ahead * remaining) / self.workers,
+                        tool_work / self.tools if tool_work else 0.0)
+        self._cache[furniture] = (self._version, hours)
+        return hours
+
+    def eta(self, furniture: Furniture, now: datetime = None) -> Optional[datetime]:
+        hours = self.hours_left(furniture)
+        if hours is None:
+            return None
+        return (now if now is not None else datetime.now()) + timedelta(hours=hours)
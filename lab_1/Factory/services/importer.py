@@ -0,0 +1,287 @@
+import csv
+import json
+import time
+from datetime import datetime
+from itertools import islice, repeat
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from models.people import Customer
+from models.orders import Order
+from models.furniture import Furniture
+from models.material import Material
+from models.recipes import RECIPES, make_components
+from models.bulk import paused_gc
+from models.exceptions import InvalidDataError
+from services.workload import install_recipes
+
+FIELDS = ("name", "phone", "type", "quantity", "age", "due_date", "priority", "created_at")
+REQUIRED_FIELDS = ("name", "phone", "type")
+TEXT_POSITIONS = tuple(FIELDS.index(field) for field in ("name", "phone", "type", "due_date", "created_at"))
+DEFAULT_AGE = 30
+TEXT_TYPES = {str, type(None)}
+
+Chunk = Tuple[Sequence[int], List[tuple], List[int]]
+
+
+class ImportReport:
+    def __init__(self, max_errors: int = 100):
+        self.rows = 0
+        self.imported = 0
+        self.new_customers = 0
+        self.seconds = 0.0
+        self.errors: List[Tuple[int, str]] = []
+        self.max_errors = max_errors
+        self._rejected = 0
+
+    @property
+    def rejected(self) -> int:
+        return self._rejected
+
+    def reject(self, line: int, message: str) -> None:
+        self._rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+    @property
+    def rate(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (f"Rows: {self.rows}, imported: {self.imported}, rejected: {self.rejected}, "
+                f"new customers: {self.new_customers}, {self.rate:,.0f} rows/s")
+
+
+class OrderImporter:
+    def __init__(self, customers: List[Customer], furnitures: List[Furniture],
+                 chunk_size: int = 10000, max_errors: int = 100):
+        if chunk_size <= 0:
+            raise InvalidDataError("Chunk size must be positive")
+        # Generated workloads also order the custom products.
+        install_recipes()
+        self.customers = customers
+        self.furnitures = furnitures
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self._by_phone: Dict[str, Customer] = {c.phone: c for c in customers}
+        # Items of one type share their recipe components: operations only read them.
+        self._components: Dict[str, List[Material]] = {}
+
+    def import_file(self, path: str, file_format: str = None) -> ImportReport:
+        if file_format is None:
+            file_format = "csv" if path.lower().endswith(".csv") else "jsonl"
+        if file_format not in ("csv", "jsonl"):
+            raise InvalidDataError(f"Unsupported import format '{file_format}'")
+        with open(path, "r", encoding="utf-8", newline="") as source:
+            reader = read_csv if file_format == "csv" else read_jsonl
+            return self.import_chunks(reader(source, self.chunk_size))
+
+    def import_records(self, records: Iterable[dict]) -> ImportReport:
+        return self.import_chunks(dict_chunks(records, self.chunk_size))
+
+    def import_chunks(self, chunks: Iterable[Chunk]) -> ImportReport:
+        report = ImportReport(self.max_errors)
+        started = time.perf_counter()
+        with paused_gc():
+            for lines, columns, malformed in chunks:
+                self._import_chunk(lines, columns, malformed, report)
+        report.seconds = time.perf_counter() - started
+        return report
+
+    def _import_chunk(self, lines: Sequence[int], columns: Sequence[tuple],
+                      malformed: Iterable[int], report: ImportReport) -> None:
+        size = len(lines)
+        report.rows += size
+        names, phones, types, quantities, ages, due_dates, priorities, created = columns
+        bad: Dict[int, str] = {i: "Malformed record" for i in malformed}
+
+        for column, field in ((names, "name"), (phones, "phone"), (types, "type")):
+            if not all(column):
+                for i, value in enumerate(column):
+                    if not value:
+                        bad.setdefault(i, f"Missing {field}")
+        types = [value.lower() if value else value for value in types]
+        unknown = set(types).difference(RECIPES)
+        if unknown:
+            for i, value in enumerate(types):
+                if value and value in unknown:
+                    bad.setdefault(i, f"Unknown furniture type '{value}'")
+        quantities = _int_column(quantities, 1, 1, "quantity", bad)
+        ages = _int_column(ages, DEFAULT_AGE, 0, "age", bad, 150)
+        priorities = _int_column(priorities, 0, 0, "priority", bad)
+        due_dates = _date_column(due_dates, bad)
+        # Orders without a creation time (the usual case) are created now.
+        created_at = datetime.now()
+        created = _date_column(created, bad, "created_at", created_at)
+        for i in sorted(bad):
+            report.reject(lines[i], bad[i])
+
+        by_phone = self._by_phone
+        components = self._components
+        for prod_type in set(types).difference(components).intersection(RECIPES):
+            components[prod_type] = make_components(prod_type)
+        labels = {prod_type: prod_type.capitalize() for prod_type in RECIPES}
+        append = self.furnitures.append
+        make_order, make_furniture = Order.trusted, Furniture.trusted
+        new_customers = 0
+        # Every field was checked column-wise above.
+        rows = zip(names, phones, types, quantities, ages, due_dates, priorities, created)
+        for i, (name, phone, prod_type, quantity, age, due_date, priority, created_at) in enumerate(rows):
+            if bad and i in bad:
+                continue
+            customer = by_phone.get(phone)
+            if customer is None:
+                customer = by_phone[phone] = Customer.trusted(name, age, phone)
+                self.customers.append(customer)
+                new_customers += 1
+            order = make_order(prod_type, quantity, due_date, priority, created_at)
+            customer.orders.append(order)
+            furniture = make_furniture(labels[prod_type], components[prod_type], quantity)
+            furniture.customer = customer.name
+            furniture.order = order
+            append(furniture)
+        report.new_customers += new_customers
+        report.imported += size - len(bad)
+
+
+def _int_column(column: tuple, default: int, minimum: int, field: str,
+                bad: Dict[int, str], maximum: int = None) -> List[int]:
+    # Usual case: every value is present and integral (ints from JSON, digit
+    # strings from CSV), so the column converts at once and only its range is checked.
+    kinds = set(map(type, column))
+    if kinds <= {int, str}:
+        try:
+            numbers = list(map(int, column))
+        except ValueError:
+            pass
+        else:
+            if numbers and minimum <= min(numbers) and (maximum is None or max(numbers) <= maximum):
+                return numbers
+    result = []
+    for i, value in enumerate(column):
+        if value is None or value == "":
+            result.append(default)
+            continue
+        # JSON gives bools and floats too: true is not 1, and 2.7 or 1e999 not a count.
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            bad.setdefault(i, f"{field} must be an integer, got '{value}'")
+            result.append(default)
+            continue
+        try:
+            number = int(value)
+        except (TypeError, ValueError, OverflowError):
+            bad.setdefault(i, f"{field} must be an integer, got '{value}'")
+            result.append(default)
+            continue
+        if number < minimum or (maximum is not None and number > maximum):
+            bad.setdefault(i, f"{field} out of range: {number}")
+        result.append(number)
+    return result
+
+
+def _date_column(column: tuple, bad: Dict[int, str], field: str = "due_date",
+                 default: datetime = None) -> List[Optional[datetime]]:
+    if not any(column):
+        return [default] * len(column)
+    if all(column) and set(map(type, column)) <= {str}:
+        try:
+            dates = list(map(datetime.fromisoformat, column))
+        except ValueError:
+            pass
+        else:
+            if any(date.tzinfo is not None for date in dates):
+                dates = [_local(date) for date in dates]
+            return dates
+    result = []
+    for i, value in enumerate(column):
+        if not value:
+            result.append(default)
+            continue
+        try:
+            result.append(_local(datetime.fromisoformat(value)))
+        except (TypeError, ValueError):
+            bad.setdefault(i, f"{field} must be ISO formatted, got '{value}'")
+            result.append(default)
+    return result
+
+
+def _local(date: datetime) -> datetime:
+    # The factory works in naive local time; an offset in the file is converted to it.
+    return date.astimezone().replace(tzinfo=None) if date.tzinfo is not None else date
+
+
+def read_csv(source: Iterable[str], chunk_size: int = 10000) -> Iterator[Chunk]:
+    reader = csv.reader(source)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [field.strip().lower() for field in header]
+    missing = [field for field in REQUIRED_FIELDS if field not in header]
+    if missing:
+        raise InvalidDataError(f"CSV header is missing: {', '.join(missing)}")
+    positions = [header.index(field) if field in header else None for field in FIELDS]
+    width = len(header)
+    line = 1
+    while True:
+        records = list(islice(reader, chunk_size))
+        if not records:
+            return
+        size = len(records)
+        malformed = [i for i, record in enumerate(records) if len(record) != width]
+        for i in malformed:
+            records[i] = [""] * width
+        columns = list(zip(*records))
+        yield (range(line + 1, line + 1 + size),
+               [columns[p] if p is not None else (None,) * size for p in positions],
+               malformed)
+        line += size
+
+
+def read_jsonl(source: Iterable[str], chunk_size: int = 10000) -> Iterator[Chunk]:
+    source = iter(source)
+    line = 1
+    while True:
+        texts = list(islice(source, chunk_size))
+        if not texts:
+            return
+        lines = range(line, line + len(texts))
+        line += len(texts)
+        try:
+            records = json.loads("[" + ",".join(texts) + "]")
+        except json.JSONDecodeError:
+            records = None
+        if records is None or len(records) != len(texts):
+            kept = [i for i, text in enumerate(texts) if text.strip()]
+            if not kept:
+                continue
+            lines = [lines[i] for i in kept]
+            records = [_loads_or_none(texts[i]) for i in kept]
+        yield _dict_chunk(lines, records)
+
+
+def dict_chunks(records: Iterable[dict], chunk_size: int = 10000) -> Iterator[Chunk]:
+    records = iter(records)
+    line = 1
+    while True:
+        batch = list(islice(records, chunk_size))
+        if not batch:
+            return
+        yield _dict_chunk(range(line, line + len(batch)), batch)
+        line += len(batch)
+
+
+def _dict_chunk(lines: Sequence[int], records: List[Optional[dict]]) -> Chunk:
+    malformed = [i for i, record in enumerate(records) if not isinstance(record, dict)]
+    for i in malformed:
+        records[i] = {}
+    columns = [tuple(map(dict.get, records, repeat(field))) for field in FIELDS]
+    for position in TEXT_POSITIONS:
+        column = columns[position]
+        if not set(map(type, column)) <= TEXT_TYPES:
+            columns[position] = tuple(value if value is None else str(value) for value in column)
+    return lines, columns, malformed
+
+
+def _loads_or_none(text: str) -> Optional[dict]:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
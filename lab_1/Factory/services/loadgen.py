@@ -0,0 +1,84 @@
+import asyncio
+import json
+import time
+from typing import List, Sequence
+
+
+class LoadReport:
+    def __init__(self, latencies: List[float], seconds: float, statuses: dict):
+        self.latencies = sorted(latencies)
+        self.seconds = seconds
+        self.statuses = statuses
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def rate(self) -> float:
+        return self.requests / self.seconds if self.seconds else 0.0
+
+    def percentile(self, percent: float) -> float:
+        if not self.latencies:
+            return 0.0
+        index = min(len(self.latencies) - 1, int(len(self.latencies) * percent / 100))
+        return self.latencies[index]
+
+    def __str__(self) -> str:
+        return (f"{self.requests} requests in {self.seconds:.2f} s: {self.rate:,.0f} req/s, "
+                f"p50 {self.percentile(50) * 1000:.2f} ms, p99 {self.percentile(99) * 1000:.2f} ms, "
+                f"statuses {self.statuses}")
+
+
+def order_request(record: dict) -> bytes:
+    body = json.dumps(record, ensure_ascii=False).encode("utf-8")
+    return (f"POST /orders HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode("ascii") + body
+
+
+def status_request(order_id: int) -> bytes:
+    return f"GET /orders/{order_id} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("ascii")
+
+
+async def read_response(reader: asyncio.StreamReader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    code = int(lines[0].split(" ")[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    body = await reader.readexactly(length)
+    return code, json.loads(body)
+
+
+async def _client(host: str, port: int, requests: Sequence[bytes], pipeline: int,
+                  latencies: List[float], statuses: dict) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for start in range(0, len(requests), pipeline):
+            window = requests[start:start + pipeline]
+            stamp = time.perf_counter()
+            writer.write(b"".join(window))
+            await writer.drain()
+            for _ in window:
+                code, _ = await read_response(reader)
+                latencies.append(time.perf_counter() - stamp)
+                statuses[code] = statuses.get(code, 0) + 1
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_load(host: str, port: int, records: Sequence[dict], connections: int = 8,
+                   pipeline: int = 16, queries: int = 0) -> LoadReport:
+    requests = [order_request(record) for record in records]
+    requests.extend(status_request(i % max(len(records), 1)) for i in range(queries))
+    shares = [requests[i::connections] for i in range(connections)]
+    latencies: List[float] = []
+    statuses: dict = {}
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, share, pipeline, latencies, statuses)
+                           for share in shares if share))
+    return LoadReport(latencies, time.perf_counter() - started, statuses)
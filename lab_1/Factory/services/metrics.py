@@ -0,0 +1,294 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from models.furniture import Furniture, FurnitureState
+from models.people import Worker
+from models.tool import Tool
+from models.warehouse import Warehouse
+from models.ledger import Key
+from models.exceptions import InvalidDataError
+
+Labels = Tuple[str, ...]
+STAGE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+LEAD_TIME_BUCKETS = (1.0, 10.0, 60.0, 300.0, 1800.0, 3600.0, 4 * 3600.0, 86400.0, 3 * 86400.0, 7 * 86400.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Cells:
+    # Every thread writes to its own dict, so recording takes no lock; the lock
+    # is only taken once per thread and when the values are collected.
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all: List[dict] = []
+
+    def mine(self) -> dict:
+        try:
+            return self._local.cells
+        except AttributeError:
+            cells = self._local.cells = {}
+            with self._lock:
+                self._all.append(cells)
+            return cells
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            return [cells.copy() for cells in self._all]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return f"{value:g}" if value != int(value) or abs(value) >= 1e15 else str(int(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        if not name:
+            raise InvalidDataError("Metric name can't be empty")
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def samples(self) -> Iterable[str]:
+        return ()
+
+    def render(self) -> str:
+        head = f"# HELP {self.name} {self.help}\n# TYPE {self.name} {self.kind}\n"
+        return head + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._cells = _Cells()
+
+    def inc(self, amount: float = 1.0, *values: str) -> None:
+        cells = self._cells.mine()
+        cells[values] = cells.get(values, 0.0) + amount
+
+    def values(self) -> Dict[Labels, float]:
+        totals: Dict[Labels, float] = {}
+        for cells in self._cells.snapshot():
+            for values, amount in cells.items():
+                totals[values] = totals.get(values, 0.0) + amount
+        return totals
+
+    def value(self, *values: str) -> float:
+        return self.values().get(values, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        for values, amount in sorted(self.values().items()):
+            yield f"{self.name}{_labels(self.labels, values)} {_number(amount)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = STAGE_BUCKETS):
+        super().__init__(name, help, labels)
+        if list(buckets) != sorted(set(buckets)):
+            raise InvalidDataError("Histogram buckets must be increasing")
+        self.buckets = tuple(buckets)
+        self._cells = _Cells()
+
+    def observe(self, value: float, *values: str) -> None:
+        cells = self._cells.mine()
+        cell = cells.get(values)
+        if cell is None:
+            # One counter per bucket, then +Inf, the sum and the count.
+            cell = cells[values] = [0.0] * (len(self.buckets) + 3)
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def values(self) -> Dict[Labels, List[float]]:
+        totals: Dict[Labels, List[float]] = {}
+        for cells in self._cells.snapshot():
+            for values, cell in cells.items():
+                total = totals.setdefault(values, [0.0] * len(cell))
+                for index, amount in enumerate(list(cell)):
+                    total[index] += amount
+        return totals
+
+    def count(self, *values: str) -> int:
+        cell = self.values().get(values)
+        return int(cell[-1]) if cell else 0
+
+    def samples(self) -> Iterable[str]:
+        bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+        for values, cell in sorted(self.values().items()):
+            running = 0.0
+            for bound, amount in zip(bounds, cell):
+                running += amount
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labels, values, le)} {_number(running)}"
+            yield f"{self.name}_sum{_labels(self.labels, values)} {cell[-2]:g}"
+            yield f"{self.name}_count{_labels(self.labels, values)} {_number(cell[-1])}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 collect: Callable[[], Dict[Labels, float]] = None):
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+        # A gauge with a callback is read when the metrics are rendered,
+        # so nothing has to be updated on the hot path.
+        self.collect = collect
+
+    def set(self, value: float, *values: str) -> None:
+        self._values[values] = value
+
+    def values(self) -> Dict[Labels, float]:
+        values = dict(self._values)
+        if self.collect is not None:
+            values.update(self.collect())
+        return values
+
+    def samples(self) -> Iterable[str]:
+        for values, amount in sorted(self.values().items()):
+            yield f"{self.name}{_labels(self.labels, values)} {_number(amount)}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise InvalidDataError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = STAGE_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = (),
+              collect: Callable[[], Dict[Labels, float]] = None) -> Gauge:
+        return self.register(Gauge(name, help, labels, collect))
+
+    def __getitem__(self, name: str) -> Metric:
+        return self._metrics[name]
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self._metrics.values())
+
+    def write(self, path: str) -> None:
+        # Written next to the target and renamed, so a scraper never reads half a file.
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(temporary, path)
+
+    def serve(self, host: str = "127.0.0.1", port: int = 9100) -> int:
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class FactoryMetrics:
+    def __init__(self, registry: MetricsRegistry = None):
+        self.registry = registry if registry is not None else MetricsRegistry()
+        self.transitions = self.registry.counter(
+            "factory_transitions_total", "Furniture state transitions", ("from", "to"))
+        self.consumed = self.registry.counter(
+            "factory_material_consumed_total", "Material taken from stock", ("kind", "grade"))
+        self.quality = self.registry.counter(
+            "factory_quality_checks_total", "Units passed or sent to rework by quality control", ("result",))
+        self.orders = self.registry.counter(
+            "factory_orders_received_total", "Orders accepted or rejected at intake", ("result",))
+        self.stage_seconds = self.registry.histogram(
+            "factory_stage_seconds", "Time spent in one production stage", ("stage",))
+        self.lead_time = self.registry.histogram(
+            "factory_lead_time_seconds", "Time from order to storage", buckets=LEAD_TIME_BUCKETS)
+        self._workers: List[Worker] = []
+        self._tools: List[Tool] = []
+        self._warehouses: List[Warehouse] = []
+        self.registry.gauge("factory_busy_workers", "Workers busy right now",
+                            collect=lambda: {(): sum(1 for w in self._workers if w.is_busy)})
+        self.registry.gauge("factory_broken_tools", "Tools with no durability left",
+                            collect=lambda: {(): sum(1 for t in self._tools if t.is_broken)})
+        self.registry.gauge("factory_warehouse_fill_ratio", "Stock as a share of capacity", ("warehouse",),
+                            collect=lambda: {(w.name,): w.total_amount / w.capacity for w in self._warehouses})
+
+    def watch(self, workers: Iterable[Worker] = (), tools: Iterable[Tool] = (),
+              warehouses: Iterable[Warehouse] = ()) -> "FactoryMetrics":
+        self._workers.extend(workers)
+        self._tools.extend(tools)
+        self._warehouses.extend(warehouses)
+        return self
+
+    def stage_finished(self, stage: FurnitureState, furniture: Furniture, seconds: float) -> None:
+        self.transitions.inc(1.0, stage.value, furniture.status.value)
+        self.stage_seconds.observe(seconds, stage.value)
+
+    def quality_checked(self, passed: int, failed: int) -> None:
+        if passed:
+            self.quality.inc(passed, "pass")
+        if failed:
+            self.quality.inc(failed, "fail")
+
+    def stored(self, furniture: Furniture, entered: float) -> None:
+        # Orders know when they were placed; anything else counts from the
+        # moment the batch picked it up (a perf_counter reading).
+        order = getattr(furniture, "order", None)
+        created_at = getattr(order, "created_at", None)
+        if created_at is not None:
+            self.lead_time.observe((datetime.now() - created_at).total_seconds())
+        else:
+            self.lead_time.observe(time.perf_counter() - entered)
+
+    def materials_consumed(self, consumed: Dict[Key, float]) -> None:
+        for (kind, grade), amount in consumed.items():
+            if amount > 0:
+                self.consumed.inc(amount, kind, grade)
+
+    def render(self) -> str:
+        return self.registry.render()
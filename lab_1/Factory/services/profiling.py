@@ -0,0 +1,207 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from models.people import People
+from models.tool import Tool
+from models.warehouse import Warehouse
+from operations.operations import Operation
+from models.exceptions import InvalidDataError
+
+MODES = ("cprofile", "sample")
+CodeKey = Tuple[str, int, str]
+MAX_DEPTH = 64
+# Stacks rebuilt from cProfile are cut below this share of the run time.
+MIN_SHARE = 1e-4
+
+
+def _subclasses(cls: type) -> List[type]:
+    found = [cls]
+    for sub in cls.__subclasses__():
+        found.extend(_subclasses(sub))
+    return found
+
+
+def _code_labels() -> Dict[CodeKey, str]:
+    # Maps the code of every method (and property accessor) of the classes we
+    # report on to a label. People methods count as Worker calls.
+    groups = [(cls, cls.__name__) for cls in _subclasses(Operation) if cls is not Operation]
+    groups += [(Warehouse, "Warehouse"), (Tool, "Tool")] + [(cls, "Worker") for cls in _subclasses(People)]
+    labels: Dict[CodeKey, str] = {}
+    for cls, label in groups:
+        for value in vars(cls).values():
+            functions = [value.fget, value.fset] if isinstance(value, property) else [value]
+            for function in functions:
+                function = getattr(function, "__func__", function)
+                code = getattr(function, "__code__", None)
+                if code is not None:
+                    labels[(code.co_filename, code.co_firstlineno, code.co_name)] = label
+    return labels
+
+
+def _name(key: CodeKey) -> str:
+    filename, line, function = key
+    if filename == "~":
+        return function
+    return f"{os.path.basename(filename)}:{line}({function})"
+
+
+class ProfileReport:
+    def __init__(self, mode: str, seconds: float):
+        self.mode = mode
+        self.seconds = seconds
+        # name -> [self seconds, inclusive seconds, calls or samples]
+        self.functions: Dict[str, List[float]] = {}
+        # label -> [self seconds, inclusive seconds]
+        self.categories: Dict[str, List[float]] = {}
+        # "outer;inner;leaf" -> weight (microseconds or samples)
+        self.stacks: Dict[str, int] = {}
+
+    def top(self, count: int = 20, key: int = 0) -> List[Tuple[str, List[float]]]:
+        return sorted(self.functions.items(), key=lambda item: item[1][key], reverse=True)[:count]
+
+    def summary(self, count: int = 20) -> str:
+        unit = "calls" if self.mode == "cprofile" else "samples"
+        lines = [f"Profile ({self.mode}): {self.seconds:.2f} s", "", "By class (self / inclusive seconds):"]
+        for label, (own, total) in sorted(self.categories.items(), key=lambda item: item[1][1], reverse=True):
+            lines.append(f"   {label:<24} {own:10.3f} {total:10.3f}")
+        lines += ["", f"Top {count} functions by self time (self / inclusive seconds, {unit}):"]
+        for name, (own, total, calls) in self.top(count):
+            lines.append(f"   {own:10.3f} {total:10.3f} {int(calls):>10}  {name}")
+        return "\n".join(lines)
+
+    def write(self, prefix: str, count: int = 20) -> Tuple[str, str]:
+        collapsed, summary = f"{prefix}.collapsed", f"{prefix}.txt"
+        with open(collapsed, "w", encoding="utf-8") as f:
+            f.writelines(f"{stack} {weight}\n" for stack, weight in sorted(self.stacks.items()) if weight > 0)
+        with open(summary, "w", encoding="utf-8") as f:
+            f.write(self.summary(count) + "\n")
+        return collapsed, summary
+
+
+def _from_cprofile(profiler: cProfile.Profile, seconds: float) -> ProfileReport:
+    stats = pstats.Stats(profiler).stats
+    report = ProfileReport("cprofile", seconds)
+    labels = _code_labels()
+    for key, (_, calls, own, total, callers) in stats.items():
+        report.functions[_name(key)] = [own, total, calls]
+        label = labels.get(key)
+        if label is None:
+            continue
+        category = report.categories.setdefault(label, [0.0, 0.0])
+        category[0] += own
+        # Inclusive time counts only calls coming from outside the class, so
+        # nested calls inside one class are not added twice.
+        outside = [edge[3] for caller, edge in callers.items() if labels.get(caller) != label]
+        category[1] += sum(outside) if callers else total
+
+    # cProfile keeps caller/callee pairs, not stacks: the stacks are rebuilt by
+    # splitting each function's time between its callers in proportion.
+    children: Dict[CodeKey, List[Tuple[CodeKey, float]]] = {}
+    for key, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((key, edge[3]))
+
+    roots = [key for key, (_, _, _, _, callers) in stats.items() if not callers]
+    floor = MIN_SHARE * sum(stats[key][3] for key in roots)
+
+    def walk(key: CodeKey, inclusive: float, path: List[str], seen: set) -> None:
+        if inclusive < floor:
+            return
+        _, _, own, total, _ = stats[key]
+        path.append(_name(key))
+        share = inclusive / total if total else 0.0
+        weight = int(own * share * 1e6)
+        if weight:
+            stack = ";".join(path)
+            report.stacks[stack] = report.stacks.get(stack, 0) + weight
+        if len(path) < MAX_DEPTH:
+            seen.add(key)
+            for child, edge_total in children.get(key, ()):
+                if child not in seen:
+                    walk(child, edge_total * share, path, seen)
+            seen.discard(key)
+        path.pop()
+
+    for key in roots:
+        walk(key, stats[key][3], [], set())
+    return report
+
+
+class Sampler:
+    # Sees Python frames only, and gets the GIL mostly when the profiled thread
+    # gives it up (I/O, prints), so it is cheaper but coarser than cProfile.
+    def __init__(self, interval: float = 0.005, thread_id: int = None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.samples: Dict[Tuple[CodeKey, ...], int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                stack = tuple(reversed(stack))
+                self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def report(self, seconds: float) -> ProfileReport:
+        report = ProfileReport("sample", seconds)
+        labels = _code_labels()
+        total = sum(self.samples.values()) or 1
+        per_sample = seconds / total
+        for stack, count in self.samples.items():
+            names = [_name(key) for key in stack]
+            joined = ";".join(names)
+            report.stacks[joined] = report.stacks.get(joined, 0) + count
+            leaf = report.functions.setdefault(names[-1], [0.0, 0.0, 0])
+            leaf[0] += count * per_sample
+            for name in set(names):
+                entry = report.functions.setdefault(name, [0.0, 0.0, 0])
+                entry[1] += count * per_sample
+                entry[2] += count
+            stack_labels = {labels[key] for key in stack if key in labels}
+            for label in stack_labels:
+                report.categories.setdefault(label, [0.0, 0.0])[1] += count * per_sample
+            if stack[-1] in labels:
+                report.categories[labels[stack[-1]]][0] += count * per_sample
+        return report
+
+
+def profile_call(function: Callable, *args, mode: str = "cprofile", interval: float = 0.005,
+                 **kwargs) -> Tuple[Any, ProfileReport]:
+    if mode not in MODES:
+        raise InvalidDataError(f"Profiler must be one of {', '.join(MODES)}")
+    started = time.perf_counter()
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            profiler.disable()
+        return result, _from_cprofile(profiler, time.perf_counter() - started)
+    sampler = Sampler(interval)
+    sampler.start()
+    try:
+        result = function(*args, **kwargs)
+    finally:
+        sampler.stop()
+    return result, sampler.report(time.perf_counter() - started)
@@ -0,0 +1,217 @@
+from array import array
+from typing import Dict, Iterable, List, Sequence
+from models.furniture import Furniture, FurnitureState
+from models.history import Moment, _seconds
+from models.ledger import Key
+from models.people import Worker
+from models.warehouse import Warehouse
+from models.finished_goods import FINISHED_KIND
+from models.exceptions import InvalidDataError, ShortageError
+from services.batch import run_batch
+
+METHODS = ("ewma", "average")
+DAY = 86400.0
+# Items in these states have not drawn their materials yet.
+UNSTARTED_STATES = (FurnitureState.CREATED, FurnitureState.MATERIALS_PREPARED)
+
+
+def _padded(vector: Sequence[float], size: int) -> List[float]:
+    return list(vector) + [0.0] * (size - len(vector))
+
+
+def moving_average(series: Sequence[Sequence[float]], window: int) -> array:
+    # Mean per slot over the last `window` periods, summed slot-wise.
+    if window < 1:
+        raise InvalidDataError("Window must be at least one period")
+    recent = series[-window:]
+    if not recent:
+        return array('d')
+    size = max(len(vector) for vector in recent)
+    total = [0.0] * size
+    for vector in recent:
+        total = [a + b for a, b in zip(total, _padded(vector, size))]
+    return array('d', [value / len(recent) for value in total])
+
+
+def exponential_smoothing(series: Sequence[Sequence[float]], alpha: float) -> array:
+    # Simple exponential smoothing of every slot at once, seeded with the
+    # first period.
+    if not 0 < alpha <= 1:
+        raise InvalidDataError("Smoothing factor must be in (0, 1]")
+    if not series:
+        return array('d')
+    size = max(len(vector) for vector in series)
+    level = _padded(series[0], size)
+    keep = 1 - alpha
+    for vector in series[1:]:
+        level = [alpha * x + keep * l for x, l in zip(_padded(vector, size), level)]
+    return array('d', level)
+
+
+class ReorderEvent:
+    __slots__ = ("key", "amount", "placed_at", "arrives_at")
+
+    def __init__(self, key: Key, amount: float, placed_at: float, arrives_at: float):
+        self.key = key
+        self.amount = amount
+        self.placed_at = placed_at
+        self.arrives_at = arrives_at
+
+    def __str__(self) -> str:
+        kind, grade = self.key
+        label = f"{kind} ({grade})" if grade else kind
+        return f"Reorder {label}: {self.amount:g}, arrives in {(self.arrives_at - self.placed_at) / 3600:g} h"
+
+
+class RestockPlanner:
+    # Reorder-point policy per ledger slot: when stock on hand plus stock on
+    # order, less what the backlog still needs, falls to the forecast demand
+    # over the lead time plus safety stock, order up to that level plus
+    # `cover` periods of demand. Arrivals are booked when receive() is called.
+    def __init__(self, warehouse: Warehouse, lead_time: float = 2.0, period: float = DAY,
+                 history_periods: int = 14, method: str = "ewma", alpha: float = 0.3,
+                 window: int = 7, safety: float = 1.0, cover: float = 3.0,
+                 kinds: Iterable[str] = None):
+        if method not in METHODS:
+            raise InvalidDataError(f"Forecast method must be one of {', '.join(METHODS)}")
+        if lead_time < 0 or period <= 0 or history_periods < 1 or safety < 0 or cover < 0:
+            raise InvalidDataError("Planner periods and stock levels can't be negative")
+        self.warehouse = warehouse
+        self.lead_time = lead_time
+        self.period = period
+        self.history_periods = history_periods
+        self.method = method
+        self.alpha = alpha
+        self.window = window
+        self.safety = safety
+        self.cover = cover
+        self.kinds = set(kinds) if kinds is not None else None
+        self.pending: List[ReorderEvent] = []
+        self.placed: List[ReorderEvent] = []
+        # Consumption is read from the warehouse history, kept from now on.
+        warehouse.enable_history()
+
+    def _managed(self, key: Key) -> bool:
+        kind = key[0]
+        if self.kinds is not None:
+            return kind in self.kinds
+        return kind != FINISHED_KIND
+
+    def forecast(self, now: Moment) -> array:
+        # Expected outflow per slot per period, from the consumption history.
+        start = _seconds(now) - self.history_periods * self.period
+        series = self.warehouse.history.outflow_series(start, self.period, self.history_periods)
+        if self.method == "average":
+            return moving_average(series, self.window)
+        # Periods before the first consumption would only drag the level to zero.
+        while series and not any(series[0]):
+            series = series[1:]
+        return exponential_smoothing(series, self.alpha)
+
+    def backlog_demand(self, backlog: Iterable[Furniture]) -> array:
+        ledger = self.warehouse.ledger
+        demand: Dict[int, float] = {}
+        for furniture in backlog:
+            if furniture.status not in UNSTARTED_STATES:
+                continue
+            bill = ledger.bill(furniture.materials, furniture.quantity)
+            for slot, amount in zip(bill.slots, bill.amounts):
+                demand[slot] = demand.get(slot, 0.0) + amount
+        vector = array('d', bytes(8 * len(ledger.keys)))
+        for slot, amount in demand.items():
+            vector[slot] = amount
+        return vector
+
+    def on_order(self) -> array:
+        ledger = self.warehouse.ledger
+        keys = ledger.keys
+        vector = array('d', bytes(8 * len(keys)))
+        for event in self.pending:
+            vector[ledger.slot(*event.key)] += event.amount
+        return vector
+
+    def plan(self, backlog: Iterable[Furniture] = (), now: Moment = None) -> List[ReorderEvent]:
+        now = _seconds(now if now is not None else self.warehouse.history.clock())
+        demand = self.backlog_demand(backlog)
+        keys = self.warehouse.ledger.keys
+        size = len(keys)
+        rate = _padded(self.forecast(now), size)
+        stock = _padded(self.warehouse.ledger.vector(), size)
+        position = [have + coming - needed
+                    for have, coming, needed in zip(stock, self.on_order(), demand)]
+        reorder_point = [r * (self.lead_time + self.safety) for r in rate]
+        target = [point + r * self.cover for point, r in zip(reorder_point, rate)]
+        # With no forecast yet, the backlog alone (a negative position) triggers an order.
+        wanted = [(slot, target[slot] - position[slot]) for slot in range(size)
+                  if self._managed(keys[slot]) and position[slot] < reorder_point[slot] + 1e-9
+                  and target[slot] > position[slot]]
+        if not wanted:
+            return []
+        # Orders share the free space left after what is already on its way.
+        space = self.warehouse.available_space - sum(event.amount for event in self.pending)
+        total = sum(amount for _, amount in wanted)
+        scale = min(1.0, max(space, 0.0) / total) if total else 0.0
+        arrives = now + self.lead_time * self.period
+        events = [ReorderEvent(keys[slot], amount * scale, now, arrives)
+                  for slot, amount in wanted if amount * scale > 0]
+        self.pending.extend(events)
+        self.placed.extend(events)
+        return events
+
+    def receive(self, now: Moment = None) -> List[ReorderEvent]:
+        now = _seconds(now if now is not None else self.warehouse.history.clock())
+        arrived = [event for event in self.pending if event.arrives_at <= now]
+        if arrived:
+            self.pending = [event for event in self.pending if event.arrives_at > now]
+            ledger = self.warehouse.ledger
+            for event in arrived:
+                ledger.add(event.key[0], event.key[1], event.amount)
+        return arrived
+
+
+class SupplyReport:
+    def __init__(self):
+        self.completed = 0
+        self.shortages = 0
+        self.other_failures = 0
+        self.reorders = 0
+        self.ordered = 0.0
+        self.backlog = 0
+
+    def __str__(self) -> str:
+        return (f"Completed: {self.completed}, shortage failures: {self.shortages}, "
+                f"other failures: {self.other_failures}, reorders: {self.reorders} "
+                f"({self.ordered:g} units), still waiting: {self.backlog}")
+
+
+def simulate_supply(days: Sequence[Sequence[Furniture]], warehouse: Warehouse, workers: List[Worker],
+                    tools, planner: RestockPlanner = None, start: float = 0.0,
+                    period: float = DAY) -> SupplyReport:
+    # Runs one batch per period. Orders stopped by a shortage keep their stage
+    # and wait for the next period; the planner, if any, reviews the stock
+    # before each batch.
+    clock = [start]
+    # Consumption is stamped with simulated time, so the forecast sees periods;
+    # the history gets its own clock back afterwards.
+    history = warehouse.enable_history()
+    own_clock, history.clock = history.clock, lambda: clock[0]
+    report = SupplyReport()
+    waiting: List[Furniture] = []
+    try:
+        for number, arrivals in enumerate(days):
+            clock[0] = start + number * period
+            backlog = waiting + list(arrivals)
+            if planner is not None:
+                planner.receive(clock[0])
+                placed = planner.plan(backlog, clock[0])
+                report.reorders += len(placed)
+                report.ordered += sum(event.amount for event in placed)
+            batch = run_batch(backlog, warehouse, workers, tools)
+            report.completed += len(batch.completed)
+            waiting = batch.failed_with(ShortageError)
+            report.shortages += len(waiting)
+            report.other_failures += len(batch.failed) - len(waiting)
+    finally:
+        history.clock = own_clock
+    report.backlog = len(waiting)
+    return report
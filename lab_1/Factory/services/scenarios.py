@@ -0,0 +1,120 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from models.people import Worker
+from models.tool import Tool
+from models.material import Material, Metal, Wood, RawMaterial
+from models.snapshot import FactorySnapshot
+from models.workshop import Workshop
+from models.ledger import Key
+from models.exceptions import InvalidDataError
+from services.batch import FINISHED_STATES, run_batch
+
+
+class Scenario:
+    # Changes are kept as plain data so a scenario can be sent to another process.
+    def __init__(self, name: str, workers: Sequence[Tuple[str, int, str, int]] = (),
+                 tools: Sequence[Tuple[str, int]] = (), stock: Sequence[Tuple[str, str, float]] = (),
+                 setup: Callable[[FactorySnapshot], None] = None):
+        if not name:
+            raise InvalidDataError("Scenario name can't be empty")
+        self.name = name
+        self.workers = list(workers)
+        self.tools = list(tools)
+        self.stock = list(stock)
+        self.setup = setup
+
+    def apply(self, snapshot: FactorySnapshot) -> None:
+        if self.workers or self.tools:
+            workers, tools = snapshot.edit_staff()
+            workers.extend(Worker(name, age, specialization, experience)
+                           for name, age, specialization, experience in self.workers)
+            tools.extend(Tool(name, durability) for name, durability in self.tools)
+        if self.stock:
+            warehouse = snapshot.edit_warehouse()
+            for kind, grade, amount in self.stock:
+                # A planned purchase is booked like stock loaded from a save:
+                # the amount is validated, the capacity is left to the summary.
+                material = _material(kind, grade, amount)
+                warehouse.ledger.add(material.kind, grade, material.amount)
+        if self.setup is not None:
+            self.setup(snapshot)
+
+
+def _material(kind: str, grade: str, amount: float) -> Material:
+    if kind == "metal":
+        return Metal(grade, amount)
+    if kind == "wood":
+        return Wood(grade, amount)
+    return RawMaterial(kind, grade, amount)
+
+
+class ScenarioResult:
+    def __init__(self, name: str, summary: dict, completed: int, failed: int,
+                 consumed: Dict[Key, float], seconds: float, snapshot: Optional[FactorySnapshot] = None):
+        self.name = name
+        self.summary = summary
+        self.completed = completed
+        self.failed = failed
+        self.consumed = consumed
+        self.seconds = seconds
+        # Only kept for runs in this process; results from workers carry the summary.
+        self.snapshot = snapshot
+
+    def delta(self, other: "ScenarioResult") -> dict:
+        labels = set(self.summary["stock"]) | set(other.summary["stock"])
+        return {
+            "completed": self.completed - other.completed,
+            "failed": self.failed - other.failed,
+            "stock": {label: self.summary["stock"].get(label, 0.0) - other.summary["stock"].get(label, 0.0)
+                      for label in sorted(labels)
+                      if self.summary["stock"].get(label, 0.0) != other.summary["stock"].get(label, 0.0)},
+        }
+
+    def __str__(self) -> str:
+        used = ", ".join(f"{kind}{f' ({grade})' if grade else ''} {amount:g}"
+                         for (kind, grade), amount in self.consumed.items()) or "none"
+        return (f"{self.name}: completed {self.completed}, failed {self.failed}, "
+                f"{self.seconds:.2f} s, materials used: {used}")
+
+
+def run_scenario(base: FactorySnapshot, scenario: Scenario, max_rework: int = 3,
+                 keep: bool = True) -> ScenarioResult:
+    snapshot = base.fork()
+    scenario.apply(snapshot)
+    pending = snapshot.pending(FINISHED_STATES)
+    items = snapshot.checkout(pending)
+    known = {id(item) for item in items}
+    warehouse = snapshot.edit_warehouse()
+    workers, tools = snapshot.edit_staff()
+    started = time.perf_counter()
+    report = run_batch(items, warehouse, workers, tools, Workshop(scenario.name), max_rework)
+    for item in report.completed + [item for item, _ in report.failed]:
+        if id(item) not in known:
+            snapshot.append(item)
+    return ScenarioResult(scenario.name, snapshot.summary(), len(report.completed), len(report.failed),
+                          report.consumed, time.perf_counter() - started, snapshot if keep else None)
+
+
+_BASE: Optional[FactorySnapshot] = None
+
+
+def _init_worker(base: FactorySnapshot) -> None:
+    # The base state is sent once per process, not once per scenario.
+    global _BASE
+    _BASE = base
+
+
+def _run_remote(job: Tuple[Scenario, int]) -> ScenarioResult:
+    scenario, max_rework = job
+    return run_scenario(_BASE, scenario, max_rework, keep=False)
+
+
+def run_scenarios(base: FactorySnapshot, scenarios: Sequence[Scenario], processes: int = None,
+                  max_rework: int = 3) -> List[ScenarioResult]:
+    processes = min(processes or os.cpu_count() or 1, len(scenarios))
+    if processes <= 1:
+        return [run_scenario(base, scenario, max_rework) for scenario in scenarios]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(base,)) as pool:
+        return list(pool.map(_run_remote, [(scenario, max_rework) for scenario in scenarios]))
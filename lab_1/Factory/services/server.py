@@ -0,0 +1,267 @@
+import asyncio
+import json
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from models.people import Customer
+from models.furniture import Furniture
+from models.workshop import Workshop
+from services.importer import OrderImporter
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large"}
+MAX_BODY = 64 * 1024
+
+
+class OrderService:
+    def __init__(self, customers: List[Customer], furnitures: List[Furniture],
+                 batch_size: int = 500, commit_interval: float = 0.0, metrics=None, eta=None,
+                 workshop: Workshop = None):
+        self.customers = customers
+        self.furnitures = furnitures
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.importer = OrderImporter(customers, furnitures, chunk_size=batch_size, max_errors=batch_size)
+        self.commits = 0
+        self.metrics = metrics
+        # An EtaEstimator kept up to date by run_batch(eta=...); new orders join it here.
+        self.eta = eta
+        # Order ids come from the workshop's numbering, so they stay valid after
+        # a save and after the item has moved to the workshop's archive.
+        self.workshop = workshop if workshop is not None else Workshop("Orders")
+        self._by_id: Dict[int, Furniture] = {}
+        for furniture in furnitures:
+            self._by_id[self.workshop.register(furniture)] = furniture
+        self.workshop.archive_listeners.append(self._archived)
+        self._pending: List[Tuple[dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def submit(self, record: dict) -> int:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((record, future))
+        if len(self._pending) >= self.batch_size:
+            self.commit()
+        elif self._timer is None:
+            # With no interval the commit runs once the loop has read everything
+            # already buffered, so each pass over the sockets becomes one batch.
+            self._timer = asyncio.get_running_loop().call_later(self.commit_interval, self.commit)
+        return await future
+
+    def commit(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        first, known = len(self.furnitures), len(self.customers)
+        records = [record for record, _ in pending]
+        try:
+            outcomes = self._import(records)
+        except Exception:
+            # One row broke the importer itself: undo the batch and retry the
+            # rows one by one, so only that row's client gets the error.
+            self._rollback(first, known)
+            outcomes = []
+            for record in records:
+                mark = len(self.furnitures), len(self.customers)
+                try:
+                    outcomes.extend(self._import([record]))
+                except Exception as error:
+                    self._rollback(*mark)
+                    outcomes.append(f"Order could not be imported: {error}")
+        added = self.furnitures[first:]
+        stored = iter(added)
+        for (_, future), outcome in zip(pending, outcomes):
+            # Ids follow the stored rows, whether or not their client still waits.
+            if outcome is None:
+                furniture = next(stored)
+                self._by_id[self.workshop.register(furniture)] = furniture
+            if future.done():
+                continue
+            if outcome is not None:
+                future.set_exception(ValueError(outcome))
+            else:
+                future.set_result(furniture.id)
+        self.commits += 1
+        if self.eta is not None:
+            self.eta.track(added)
+        if self.metrics is not None:
+            self.metrics.orders.inc(len(added), "accepted")
+            self.metrics.orders.inc(len(pending) - len(added), "rejected")
+
+    def _archived(self, furnitures: List[Furniture]) -> None:
+        # From now on status() answers for them from the archive.
+        for furniture in furnitures:
+            self._by_id.pop(furniture.id, None)
+
+    def _import(self, records: List[dict]) -> List[Optional[str]]:
+        # None for every accepted record, the error message for a rejected one.
+        report = self.importer.import_records(records)
+        errors = dict(report.errors)
+        return [errors.get(line) for line in range(1, len(records) + 1)]
+
+    def _rollback(self, furnitures: int, customers: int) -> None:
+        # Drops what a failed import had already added, orders of known customers included.
+        dropped = {id(furniture.order) for furniture in self.furnitures[furnitures:]}
+        if dropped:
+            for customer in self.customers[:customers]:
+                while customer.orders and id(customer.orders[-1]) in dropped:
+                    customer.orders.pop()
+        for customer in self.customers[customers:]:
+            self.importer._by_phone.pop(customer.phone, None)
+        del self.customers[customers:]
+        del self.furnitures[furnitures:]
+
+    def status(self, order_id: int) -> Optional[dict]:
+        if self._pending:
+            # A query pipelined after a submission must see it.
+            self.commit()
+        furniture = self._by_id.get(order_id)
+        if furniture is None:
+            archive = self.workshop.archive
+            item = archive.find(order_id) if archive is not None else None
+            if item is None:
+                return None
+            return {"id": order_id, "type": item.type, "quantity": item.quantity, "status": item.status.value,
+                    "customer": item.customer, "due_date": None, "archived": True}
+        order = getattr(furniture, "order", None)
+        status = {"id": order_id, "type": furniture.type, "quantity": furniture.quantity,
+                  "status": furniture.status.value, "customer": getattr(furniture, "customer", ""),
+                  "due_date": order.due_date.isoformat() if order and order.due_date else None}
+        if self.eta is not None:
+            eta = self.eta.eta(furniture)
+            status["eta"] = eta.isoformat(timespec="minutes") if eta else None
+        return status
+
+
+class OrderServer:
+    def __init__(self, service: OrderService, host: str = "127.0.0.1", port: int = 8080):
+        self.service = service
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set = set()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            if self._connections:
+                _, pending = await asyncio.wait(self._connections, timeout=1.0)
+                for task in pending:
+                    task.cancel()
+            await self._server.wait_closed()
+        self.service.commit()
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # Pipelined requests are handled concurrently so they can share a commit,
+        # and answered strictly in arrival order.
+        task = asyncio.current_task()
+        self._connections.add(task)
+        task.add_done_callback(self._connections.discard)
+        responses: deque = deque()
+        ready = asyncio.Event()
+        sender = asyncio.create_task(self._send(writer, responses, ready))
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                method, path, headers = parse_head(head)
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY:
+                    code = 413 if length > MAX_BODY else 400
+                    responses.append((asyncio.ensure_future(_done(code, {"error": "Bad Content-Length"})), True))
+                    ready.set()
+                    break
+                body = await reader.readexactly(length) if length else b""
+                close = headers.get("connection", "").lower() == "close"
+                responses.append((asyncio.ensure_future(self.handle(method, path, body)), close))
+                ready.set()
+                if close:
+                    break
+        finally:
+            responses.append((None, True))
+            ready.set()
+            await sender
+
+    async def _send(self, writer: asyncio.StreamWriter, responses: deque, ready: asyncio.Event) -> None:
+        try:
+            while True:
+                while not responses:
+                    ready.clear()
+                    await ready.wait()
+                task, close = responses.popleft()
+                if task is None:
+                    break
+                code, payload = await task
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                head = (f"HTTP/1.1 {code} {REASONS[code]}\r\nContent-Type: application/json\r\n"
+                        f"Content-Length: {len(body)}\r\n")
+                if close:
+                    head += "Connection: close\r\n"
+                writer.write((head + "\r\n").encode("ascii") + body)
+                if not responses:
+                    await writer.drain()
+                if close:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        if path == "/orders":
+            if method != "POST":
+                return 405, {"error": "Use POST to submit orders"}
+            try:
+                record = json.loads(body)
+            except (ValueError, UnicodeDecodeError):
+                return 400, {"error": "Body must be a JSON object"}
+            if not isinstance(record, dict):
+                return 400, {"error": "Body must be a JSON object"}
+            try:
+                order_id = await self.service.submit(record)
+            except ValueError as error:
+                return 400, {"error": str(error)}
+            return 201, {"id": order_id}
+        if path.startswith("/orders/"):
+            if method != "GET":
+                return 405, {"error": "Use GET to query orders"}
+            try:
+                status = self.service.status(int(path[len("/orders/"):]))
+            except ValueError:
+                status = None
+            return (200, status) if status is not None else (404, {"error": "Order not found"})
+        if path == "/health":
+            return 200, {"orders": len(self.service.furnitures), "commits": self.service.commits}
+        return 404, {"error": f"Unknown path {path}"}
+
+
+async def _done(code: int, payload: dict) -> Tuple[int, dict]:
+    return code, payload
+
+
+def parse_head(head: bytes) -> Tuple[str, str, Dict[str, str]]:
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split(" ")
+    method, path = (parts[0], parts[1]) if len(parts) >= 2 else ("", "")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    return method, path, headers
@@ -0,0 +1,171 @@
+import copy
+import heapq
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+from typing import Dict, List, Sequence, Tuple
+from models.furniture import Furniture, FurnitureState
+from models.people import Worker
+from models.tool import Tool
+from models.warehouse import Warehouse
+from models.ledger import Bill, MaterialLedger, describe_shortage
+from models.workshop import Workshop
+from models.finished_goods import FinishedGoodsStore
+from models.exceptions import InvalidDataError
+from services.batch import FINISHED_STATES, BatchReport, run_batch
+
+
+class Shard:
+    def __init__(self, number: int):
+        self.number = number
+        self.indices: List[int] = []
+        self.items: List[Furniture] = []
+        self.allocation: Dict[int, float] = {}
+
+    def add(self, index: int, furniture: Furniture, bill: Bill) -> None:
+        self.indices.append(index)
+        self.items.append(furniture)
+        for slot, amount in zip(bill.slots, bill.amounts):
+            self.allocation[slot] = self.allocation.get(slot, 0.0) + amount
+
+    def vector(self, size: int) -> array:
+        vector = array('d', bytes(8 * size))
+        for slot, amount in self.allocation.items():
+            vector[slot] = amount
+        return vector
+
+
+class ShardedReport(BatchReport):
+    def __init__(self, shards: int):
+        super().__init__()
+        self.shards = shards
+        self.rejected: List[Tuple[Furniture, str]] = []
+        self.shard_seconds: List[float] = []
+
+    def __str__(self) -> str:
+        return (f"Shards: {self.shards}, rejected up front: {len(self.rejected)}\n"
+                + super().__str__())
+
+
+def plan_shards(furnitures: Sequence[Furniture], warehouse: Warehouse,
+                shards: int) -> Tuple[List[Shard], List[Tuple[int, str]]]:
+    plan = [Shard(number) for number in range(shards)]
+    load = [(0, number) for number in range(shards)]
+    left = warehouse.ledger.vector()
+    rejected = []
+    for index, furniture in enumerate(furnitures):
+        if furniture.status in FINISHED_STATES:
+            continue
+        bill = warehouse.bill_of_materials(furniture.materials, furniture.quantity)
+        if len(left) < len(warehouse.ledger.keys):
+            left.extend([0.0] * (len(warehouse.ledger.keys) - len(left)))
+        short = [(key, need, left[slot]) for slot, need, key in zip(bill.slots, bill.amounts, bill.keys)
+                 if need > left[slot]]
+        if short:
+            rejected.append((index, describe_shortage(short[0]) + " (after allocation to shards)"))
+            continue
+        for slot, need in zip(bill.slots, bill.amounts):
+            left[slot] -= need
+        units, number = heapq.heappop(load)
+        plan[number].add(index, furniture, bill)
+        heapq.heappush(load, (units + furniture.quantity, number))
+    return [shard for shard in plan if shard.items], rejected
+
+
+def _run_shard(job: Tuple[Shard, MaterialLedger, List[Worker], List[Tool], int]
+               ) -> Tuple[List[int], List[Furniture], BatchReport, List[Tool]]:
+    shard, layout, workers, tools, max_rework = job
+    allocation = shard.vector(len(layout.keys))
+    warehouse = Warehouse(f"Shard {shard.number}", max(sum(allocation), 1.0))
+    warehouse.ledger = layout.copy_layout(allocation)
+    report = run_batch(shard.items, warehouse, workers, tools,
+                       Workshop(f"Shard {shard.number}"), max_rework)
+    return shard.indices, shard.items, report, tools
+
+
+def _reserve_storage(furnitures: Sequence[Furniture], finished: FinishedGoodsStore) -> Tuple[List[int], List[int]]:
+    # As in run_batch: once the store can't take the next item, nothing more
+    # is started and the rest wait.
+    pending = [index for index, furniture in enumerate(furnitures) if furniture.status not in FINISHED_STATES]
+    for position, index in enumerate(pending):
+        if not finished.reserve(furnitures[index]):
+            return pending[:position], pending[position:]
+    return pending, []
+
+
+def run_sharded(furnitures: List[Furniture], warehouse: Warehouse, workers: List[Worker],
+                tools: List[Tool], shards: int = None, workshop: Workshop = None,
+                max_rework: int = 3, finished: FinishedGoodsStore = None) -> ShardedReport:
+    if shards is None:
+        shards = os.cpu_count() or 1
+    if shards < 1:
+        raise InvalidDataError("Number of shards must be positive")
+    kit = list(tools)
+    # Every tool works in exactly one shard, so there are no more shards than tools.
+    if kit:
+        shards = min(shards, len(kit))
+    admitted, waiting = list(range(len(furnitures))), []
+    if finished is not None:
+        admitted, waiting = _reserve_storage(furnitures, finished)
+    plan, rejected = plan_shards([furnitures[index] for index in admitted], warehouse, shards)
+    for shard in plan:
+        shard.indices = [admitted[index] for index in shard.indices]
+    report = ShardedReport(len(plan))
+    report.rejected = [(furnitures[admitted[index]], reason) for index, reason in rejected]
+    report.waiting = [furnitures[index] for index in waiting]
+    started_items = [furnitures[index] for index in admitted]
+    ledger = warehouse.ledger
+    size = len(ledger.keys)
+    allocated = array('d', bytes(8 * size))
+    for shard in plan:
+        for slot, amount in shard.allocation.items():
+            allocated[slot] += amount
+    reserved = ledger.bill_from_vector(allocated)
+    ledger.consume(reserved)
+
+    layout = ledger.copy_layout()
+    tool_sets = [list(range(number, len(kit), len(plan))) for number in range(len(plan))]
+    jobs = [(shard, layout, copy.deepcopy(workers), copy.deepcopy([kit[i] for i in tool_set]), max_rework)
+            for shard, tool_set in zip(plan, tool_sets)]
+    started = time.perf_counter()
+    if len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+            results = list(pool.map(_run_shard, jobs))
+    else:
+        results = [_run_shard(job) for job in jobs]
+
+    for (indices, items, shard_report, worn), tool_set in zip(results, tool_sets):
+        # Wear and repairs made in the shard carry over to the caller's tools.
+        for i, tool in zip(tool_set, worn):
+            kit[i].durability = tool.durability
+        for index, item in zip(indices, items):
+            furnitures[index] = item
+        known = {id(item) for item in items}
+        for item in shard_report.completed + [item for item, _ in shard_report.failed]:
+            if id(item) not in known:
+                furnitures.append(item)
+        report.merge(shard_report)
+        report.shard_seconds.append(shard_report.seconds)
+    report.seconds = time.perf_counter() - started
+    if finished is not None:
+        # Shards return copies, so the reservations of the started items are
+        # turned into stock here, from the results.
+        for item in started_items:
+            finished.cancel(item)
+        stored = []
+        for item in report.completed:
+            if finished.put(item):
+                stored.append(item)
+            else:
+                item.status = FurnitureState.PACKED
+                report.waiting.append(item)
+        report.completed = stored
+
+    for key, amount in report.consumed.items():
+        allocated[ledger.slot(*key)] -= amount
+    ledger.restore(ledger.bill_from_vector(allocated))
+    if workshop is not None:
+        workshop.completed_furnitures.extend(report.completed)
+        workshop.archive_old()
+    return report
@@ -0,0 +1,201 @@
+import json
+import random
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterator, List, Sequence, Tuple
+from models.furniture import Furniture
+from models.material import Material, Metal, Wood
+from models.orders import Order
+from models.people import Customer, Worker
+from models.tool import Tool
+from models.recipes import RECIPES, make_components, register_recipe
+from models.exceptions import InvalidDataError
+
+STANDARD_MIX = (("стул", 0.55), ("стол", 0.3), ("шкаф", 0.15))
+# Made-to-order products; orders for them import only after install_recipes().
+CUSTOM_RECIPES = {
+    "комод": ((Wood, "Дуб", 25.0), (Metal, "Сталь", 3.0)),
+    "тумба": ((Wood, "Сосна", 12.0), (Metal, "Сталь", 2.0)),
+    "полка": ((Wood, "Сосна", 6.0),),
+    "кровать": ((Wood, "Дуб", 40.0), (Metal, "Сталь", 10.0)),
+}
+CUSTOM_LOAD = {"комод": 4.0, "тумба": 2.0, "полка": 1.0, "кровать": 6.0}
+
+# Relative order rate by hour of day and by weekday (Monday first); both
+# average to 1, so orders_per_day stays the mean over a week.
+HOURLY = (0.1, 0.05, 0.05, 0.05, 0.05, 0.1, 0.3, 0.7, 1.2, 1.6, 1.8, 1.8,
+          1.6, 1.6, 1.7, 1.7, 1.6, 1.5, 1.4, 1.2, 0.9, 0.6, 0.3, 0.2)
+WEEKLY = (1.15, 1.1, 1.05, 1.05, 1.15, 0.8, 0.7)
+HOURLY = tuple(weight * 24 / sum(HOURLY) for weight in HOURLY)
+WEEKLY = tuple(weight * 7 / sum(WEEKLY) for weight in WEEKLY)
+
+ROSTER_MIX = (("столяр", 0.3), ("сборщик", 0.2), ("универсал", 0.2), ("контролер", 0.1),
+              ("упаковщик", 0.1), ("водитель", 0.1))
+TOOL_NAMES = ("Молоток", "Пила", "Шуруповерт", "Рубанок", "Дрель", "Стамеска")
+FIRST_NAMES = ("Иван", "Анна", "Петр", "Мария", "Сергей", "Ольга", "Алексей", "Елена",
+               "Дмитрий", "Наталья", "Андрей", "Татьяна", "Михаил", "Ирина", "Николай", "Светлана")
+LAST_NAMES = ("Петров", "Сидоров", "Иванов", "Козлов", "Смирнов", "Кузнецов", "Попов",
+              "Соколов", "Лебедев", "Новиков", "Морозов", "Волков", "Павлов", "Семенов")
+CHUNK = 10000
+# Customers below this number are formatted once; the skewed pick makes them
+# the ones most orders come from.
+CACHED_CUSTOMERS = 100000
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def install_recipes() -> None:
+    for prod_type, recipe in CUSTOM_RECIPES.items():
+        if prod_type not in RECIPES:
+            register_recipe(prod_type, recipe, load=CUSTOM_LOAD[prod_type])
+
+
+def _cumulative(weights: Sequence[Tuple[str, float]]) -> Tuple[List[str], List[float]]:
+    names, bounds, total = [], [], 0.0
+    for name, weight in weights:
+        total += weight
+        names.append(name)
+        bounds.append(total)
+    return names, [bound / total for bound in bounds]
+
+
+def _full_name(first: str, last: str) -> str:
+    # Female first names in the list end in -а/-я and take the female surname.
+    return f"{first} {last}а" if first[-1] in "ая" else f"{first} {last}"
+
+
+class WorkloadGenerator:
+    # Every part of the workload has its own random stream derived from the
+    # seed, so asking for more orders never changes the rosters or customers.
+    def __init__(self, seed: int = 1, orders_per_day: float = 500.0, customers: int = 10000,
+                 custom_share: float = 0.1, start: datetime = None,
+                 mix: Sequence[Tuple[str, float]] = STANDARD_MIX):
+        if orders_per_day <= 0 or customers <= 0:
+            raise InvalidDataError("Order rate and customer count must be positive")
+        if not 0 <= custom_share <= 1:
+            raise InvalidDataError("Custom share must be between 0 and 1")
+        self.seed = seed
+        self.orders_per_day = orders_per_day
+        self.customer_count = customers
+        self.custom_share = custom_share
+        self.start = start if start is not None else datetime(2026, 1, 5)
+        self.types, self.type_bounds = _cumulative(mix)
+        self.custom_types = list(CUSTOM_RECIPES)
+        self._customers: Dict[int, Tuple[str, str, int]] = {}
+
+    def _random(self, part: str) -> random.Random:
+        return random.Random(f"{self.seed}:{part}")
+
+    def customer(self, number: int) -> Tuple[str, str, int]:
+        # Name, phone and age follow from the number alone, so customers need
+        # no table even at millions of orders.
+        customer = self._customers.get(number)
+        if customer is None:
+            name = _full_name(FIRST_NAMES[(number * 7 + self.seed) % len(FIRST_NAMES)],
+                              LAST_NAMES[(number * 11 + self.seed * 3) % len(LAST_NAMES)])
+            customer = name, f"+37529{number:07d}", 20 + (number * 13 + self.seed) % 55
+            if number < CACHED_CUSTOMERS:
+                self._customers[number] = customer
+        return customer
+
+    def customers(self) -> List[Customer]:
+        customers = []
+        for number in range(self.customer_count):
+            name, phone, age = self.customer(number)
+            customers.append(Customer.trusted(name, age, phone))
+        return customers
+
+    def arrivals(self) -> Iterator[float]:
+        # Hours since start of an endless order stream: a Poisson process at
+        # the peak rate, thinned down to the rate of each hour and weekday.
+        rng = self._random("arrivals")
+        base = self.orders_per_day / 24
+        peak = base * max(HOURLY) * max(WEEKLY)
+        offset = self.start.weekday() * 24 + self.start.hour + self.start.minute / 60
+        hours = 0.0
+        while True:
+            hours += rng.expovariate(peak)
+            moment = int(offset + hours)
+            if rng.random() * peak < base * HOURLY[moment % 24] * WEEKLY[moment // 24 % 7]:
+                yield hours
+
+    def _draws(self, count: int) -> Iterator[tuple]:
+        rng = self._random("orders")
+        types, bounds = self.types, self.type_bounds
+        start = self.start
+        for hours in islice(self.arrivals(), count):
+            if rng.random() < self.custom_share:
+                prod_type = rng.choice(self.custom_types)
+            else:
+                pick = rng.random()
+                prod_type = types[-1]
+                for name, bound in zip(types, bounds):
+                    if pick < bound:
+                        prod_type = name
+                        break
+            # Squaring skews the pick towards low numbers: regular customers.
+            customer = int(self.customer_count * rng.random() ** 2)
+            created = start + timedelta(hours=hours)
+            due = created + timedelta(days=rng.uniform(3, 30)) if rng.random() < 0.8 else None
+            quantity = 1 if rng.random() < 0.8 else rng.randint(2, 20)
+            roll = rng.random()
+            priority = 0 if roll < 0.8 else 1 if roll < 0.95 else 2
+            yield prod_type, customer, created, due, quantity, priority
+
+    def records(self, count: int) -> Iterator[dict]:
+        # Records in the importer's format, with the arrival as created_at.
+        for prod_type, customer, created, due, quantity, priority in self._draws(count):
+            name, phone, age = self.customer(customer)
+            yield {
+                "name": name,
+                "phone": phone,
+                "type": prod_type,
+                "quantity": quantity,
+                "age": age,
+                "due_date": due.isoformat(timespec="seconds") if due else None,
+                "priority": priority,
+                "created_at": created.isoformat(timespec="seconds"),
+            }
+
+    def orders(self, count: int) -> Iterator[Tuple[Furniture, Order]]:
+        # The same stream as records(), built straight into furniture for
+        # run_batch and the schedule simulations.
+        components: Dict[str, List[Material]] = {}
+        for prod_type, customer, created, due, quantity, priority in self._draws(count):
+            materials = components.get(prod_type)
+            if materials is None:
+                if prod_type not in RECIPES:
+                    install_recipes()
+                materials = components[prod_type] = make_components(prod_type)
+            label = prod_type.capitalize()
+            order = Order(prod_type, quantity, due, priority, created)
+            furniture = Furniture.trusted(label, materials, quantity)
+            furniture.customer = self.customer(customer)[0]
+            furniture.order = order
+            yield furniture, order
+
+    def workers(self, count: int) -> List[Worker]:
+        rng = self._random("workers")
+        specializations, bounds = _cumulative(ROSTER_MIX)
+        roster = []
+        for number in range(count):
+            pick = rng.random()
+            specialization = next(s for s, bound in zip(specializations, bounds) if pick < bound)
+            name = _full_name(FIRST_NAMES[number % len(FIRST_NAMES)], rng.choice(LAST_NAMES))
+            roster.append(Worker.trusted(name, rng.randint(20, 60), specialization, rng.randint(0, 20)))
+        return roster
+
+    def tools(self, count: int) -> List[Tool]:
+        rng = self._random("tools")
+        return [Tool.trusted(f"{TOOL_NAMES[number % len(TOOL_NAMES)]} {number + 1}", rng.randint(40, 100))
+                for number in range(count)]
+
+    def write_jsonl(self, path: str, count: int) -> int:
+        written = 0
+        records = self.records(count)
+        with open(path, "w", encoding="utf-8") as target:
+            while True:
+                chunk = list(islice(records, CHUNK))
+                if not chunk:
+                    return written
+                target.write("\n".join(map(_encode, chunk)) + "\n")
+                written += len(chunk)
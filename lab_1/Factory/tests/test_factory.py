@@ -1,18 +1,54 @@
 import pytest
+import asyncio
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
 
-from models.material import Metal, Wood
+from models.material import Metal, Wood, RawMaterial
 from models.furniture import Furniture, FurnitureState
 from models.people import Worker, Customer
 from models.tool import Tool
 from models.warehouse import Warehouse
 from models.factory import Factory
 from models.workshop import Workshop
-from models.exceptions import InvalidAmountError, InvalidDataError, InvalidOperation
+from models.exceptions import InvalidAmountError, InvalidDataError, InvalidOperation, ShortageError
 from models.orders import Order
+from models.tool_manager import ToolManager
+from models.network import WarehouseNetwork
+from models.aggregates import ReportAggregates
+from models.bulk import make_furnitures, make_material_lists, make_materials, make_tools, make_workers
+from models.snapshot import CHUNK, FactorySnapshot
+from models.archive import FurnitureArchive
+from models.finished_goods import FINISHED_KIND, FinishedGoodsStore
+from operations.assignment import WorkerAssigner, pick_worker, stage_duration
+from operations.scheduler import OrderScheduler, simulate_schedule
+from operations.elements import PartGraph, part_graph
+from operations.pipeline import PRODUCTION, Pipeline, ProductionContext, Stage
+from operations.delivery import DeliveryPlanner, nearest_neighbour, route_length, two_opt
+from services.importer import OrderImporter, dict_chunks
+from services.batch import BatchReport, _store, run_batch
+from services.sharding import plan_shards, run_sharded
+from services.scenarios import Scenario, run_scenario, run_scenarios
+from services.metrics import FactoryMetrics, MetricsRegistry
+from services.profiling import profile_call
+from services.eta import EtaEstimator
+from services.restock import RestockPlanner, exponential_smoothing, moving_average, simulate_supply
+from services.workload import CUSTOM_RECIPES, WorkloadGenerator
+from models.recipes import RECIPES, make_components
+import cli
+import main as factory_main
+from services.server import OrderServer, OrderService
+from services.loadgen import read_response, run_load, order_request, status_request
 
 from operations.operations import (
     PreparationOperation,
+    CreateElementOperation,
     AssemblyOperation,
     CheckOperation,
     PackingOperation,
@@ -263,4 +299,1289 @@ def test_repair_invalid_amount():
     with pytest.raises(InvalidAmountError):
         t.repair(-5)
     with pytest.raises(InvalidAmountError):
-        t.repair("ten")
\ No newline at end of file
+        t.repair("ten")
+
+def test_tool_manager_picks_most_durable():
+    tools = [Tool("Hammer", 20), Tool("Saw", 50), Tool("Drill", 30)]
+    manager = ToolManager(tools)
+    assert Tool.find_available(manager).name == "Saw"
+    for _ in range(50):
+        Tool.find_available(manager).use()
+    assert max(t.durability for t in tools) - min(t.durability for t in tools) <= 1
+
+def test_tool_manager_round_robin():
+    tools = [Tool("Hammer", 20), Tool("Saw", 50)]
+    manager = ToolManager(tools, strategy="round_robin")
+    assert [manager.find_available().name for _ in range(3)] == ["Hammer", "Saw", "Hammer"]
+    with pytest.raises(InvalidDataError):
+        ToolManager(tools, strategy="random")
+
+def test_tool_manager_schedules_repairs():
+    tool = Tool("Hammer", 13)
+    manager = ToolManager([tool], repair_threshold=10)
+    for _ in range(3):
+        manager.find_available().use()
+    assert tool.durability == 10
+    assert manager.find_available() is tool
+    assert manager.repair_queue == []
+    assert tool.durability == 100
+
+    spare = Tool("Saw", 5)
+    manager = ToolManager([Tool("Drill", 40), spare], repair_threshold=10)
+    assert manager.repair_queue == [spare]
+    manager.run_repairs()
+    assert spare.durability == 100
+
+def test_tool_manager_prevents_breakage_in_batch():
+    warehouse = Warehouse("Main", 10000)
+    warehouse.metal_amount = 1000.0
+    warehouse.wood_amount = 1000.0
+    manager = ToolManager([Tool("Hammer", 5), Tool("Saw", 4)], repair_threshold=1)
+    workers = [Worker("John", 30, "worker", 5)]
+    for _ in range(20):
+        furniture = Furniture("Chair", [Wood("Oak", 1)])
+        PreparationOperation(warehouse, workers, manager).execute(furniture)
+        CreateElementOperation(warehouse, workers, manager).execute(furniture)
+        assert furniture.status == FurnitureState.ELEMENTS_MANUFACTURED
+
+def create_staff():
+    return [
+        Worker("Ivan", 35, "универсал", 8),
+        Worker("Anna", 28, "столяр", 5),
+        Worker("Petr", 42, "сборщик", 12),
+        Worker("Maria", 30, "контролер", 6),
+        Worker("Sergey", 38, "водитель", 10),
+    ]
+
+def test_pick_worker_prefers_specialist():
+    workers = create_staff()
+    assert pick_worker(workers, FurnitureState.ELEMENTS_MANUFACTURED).name == "Petr"
+    assert pick_worker(workers, FurnitureState.QUALITY_CHECKED).name == "Ivan"
+    workers[2].is_busy = True
+    assert pick_worker(workers, FurnitureState.ELEMENTS_MANUFACTURED).name == "Ivan"
+
+def test_stage_duration_scaled_by_experience():
+    novice = Worker("A", 20, "сборщик", 0)
+    expert = Worker("B", 40, "сборщик", 15)
+    stranger = Worker("C", 40, "водитель", 15)
+    state = FurnitureState.ELEMENTS_MANUFACTURED
+    assert stage_duration(expert, state) < stage_duration(novice, state)
+    assert stage_duration(expert, state) < stage_duration(stranger, state)
+
+def test_assigner_batch_matches_specialists():
+    workers = create_staff()
+    tasks = [FurnitureState.PACKED, FurnitureState.ASSEMBLED, FurnitureState.ELEMENTS_MANUFACTURED]
+    pairs = WorkerAssigner().assign(tasks, workers)
+    assert {tasks[t]: workers[w].name for t, w in pairs} == {
+        FurnitureState.PACKED: "Sergey",
+        FurnitureState.ASSEMBLED: "Maria",
+        FurnitureState.ELEMENTS_MANUFACTURED: "Petr",
+    }
+
+def test_assigner_shortens_lead_time():
+    workers = create_staff()
+    orders = [Furniture("Chair", []) for _ in range(40)]
+    optimized = WorkerAssigner("optimized").simulate(orders, workers)
+    baseline = WorkerAssigner("first_available").simulate(orders, workers)
+    assert optimized.completed == baseline.completed == 40
+    assert optimized.mean_lead_time < baseline.mean_lead_time
+
+def test_order_due_date_and_priority():
+    due = datetime(2026, 1, 10)
+    order = Customer("Alex", 35, "+79999999999").make_order("Chair", 1, due, 2)
+    assert order.due_date == due
+    assert order.priority == 2
+    with pytest.raises(InvalidDataError):
+        Order("Chair", 1, due_date="tomorrow")
+    with pytest.raises(InvalidDataError):
+        Order("Chair", 1, priority=-1)
+
+def test_scheduler_earliest_deadline_first():
+    start = datetime(2026, 1, 1)
+    scheduler = OrderScheduler(start)
+    scheduler.push("late", Order("Chair", 1, start + timedelta(days=5)))
+    scheduler.push("none", Order("Chair", 1))
+    scheduler.push("soon", Order("Chair", 1, start + timedelta(days=1)))
+    scheduler.push("urgent", Order("Chair", 1, start + timedelta(days=3), priority=3))
+    assert [scheduler.pop()[0] for _ in range(4)] == ["urgent", "soon", "late", "none"]
+
+def test_scheduler_aging_favours_waiting_orders():
+    start = datetime(2026, 1, 1)
+    scheduler = OrderScheduler(start, aging_rate=1.0)
+    due = start + timedelta(hours=48)
+    scheduler.push("new", Order("Chair", 1, due), enqueued=30.0)
+    scheduler.push("old", Order("Chair", 1, due + timedelta(hours=10)), enqueued=0.0)
+    assert scheduler.pop()[0] == "old"
+
+def test_scheduler_serves_undated_orders_under_a_stream_of_deadlines():
+    start = datetime(2026, 1, 1)
+    scheduler = OrderScheduler(start)
+    scheduler.push("undated", Order("Chair", 1), enqueued=0.0)
+    served = None
+    for hour in range(1000):
+        scheduler.push(f"dated {hour}", Order("Chair", 1, start + timedelta(hours=hour + 24)), enqueued=hour)
+        if scheduler.pop()[0] == "undated":
+            served = hour
+            break
+    assert served is not None and served < 200
+
+def test_edf_beats_fifo_under_load():
+    rng = random.Random(7)
+    start = datetime(2026, 1, 1)
+    jobs = []
+    elapsed = 0.0
+    for _ in range(150):
+        elapsed += rng.expovariate(1 / 2.6)
+        created = start + timedelta(hours=elapsed)
+        due = created + timedelta(hours=rng.uniform(15, 120))
+        jobs.append((Furniture("Chair", []), Order("Chair", 1, due, created_at=created)))
+    tools = [Tool("Hammer", 100), Tool("Saw", 100)]
+    edf = simulate_schedule(jobs, create_staff(), tools, "edf", start)
+    fifo = simulate_schedule(jobs, create_staff(), tools, "fifo", start)
+    assert edf.completed == fifo.completed == 150
+    assert edf.on_time_percent > fifo.on_time_percent
+    assert edf.mean_tardiness < fifo.mean_tardiness
+
+def test_furniture_lot_split():
+    lot = Furniture("Chair", [Wood("Oak", 10)], quantity=100)
+    lot.customer = "Alex"
+    lot.change_status(FurnitureState.ASSEMBLED)
+    part = lot.split(30)
+    assert (lot.quantity, part.quantity) == (70, 30)
+    assert part.status == FurnitureState.ASSEMBLED
+    assert part.customer == "Alex"
+    with pytest.raises(InvalidAmountError):
+        lot.split(70)
+    with pytest.raises(InvalidAmountError):
+        Furniture("Chair", [], quantity=0)
+
+def test_lot_materials_scaled_by_quantity():
+    warehouse = Warehouse("Main", 10000)
+    warehouse.wood_amount = 1000.0
+    worker = Worker("John", 30, "worker", 5)
+    tool = Tool("Hammer", 10)
+    lot = Furniture("Chair", [Wood("Oak", 10)], quantity=100)
+    PreparationOperation(warehouse, [worker], [tool]).execute(lot)
+    CreateElementOperation(warehouse, [worker], [tool]).execute(lot)
+    assert warehouse.wood_amount == 0
+    assert tool.durability == 8
+
+    too_big = Furniture("Chair", [Wood("Oak", 10)], quantity=1)
+    with pytest.raises(InvalidAmountError):
+        PreparationOperation(warehouse, [worker], [tool]).execute(too_big)
+
+@patch("operations.operations.random.randint", return_value=90)
+def test_lot_check_samples_and_passes(mock_randint):
+    worker = Worker("Maria", 30, "контролер", 6)
+    lot = Furniture("Chair", [], quantity=10000)
+    lot.change_status(FurnitureState.ASSEMBLED)
+    assert CheckOperation(worker).execute(lot) is None
+    assert lot.status == FurnitureState.QUALITY_CHECKED
+    assert mock_randint.call_count == CheckOperation.sample_size(10000) == 100
+
+@patch("operations.operations.random.randint")
+def test_lot_check_splits_failed_units(mock_randint):
+    worker = Worker("Maria", 30, "контролер", 6)
+    lot = Furniture("Chair", [], quantity=10)
+    lot.change_status(FurnitureState.ASSEMBLED)
+    mock_randint.side_effect = [60, 90, 90, 90, 90]
+    rework = CheckOperation(worker).execute(lot)
+    assert lot.quantity == 8 and lot.status == FurnitureState.QUALITY_CHECKED
+    assert rework.quantity == 2 and rework.status == FurnitureState.ELEMENTS_MANUFACTURED
+
+def test_lot_check_decides_from_the_sample_alone():
+    worker = Worker("Maria", 30, "контролер", 6)
+    lot = Furniture("Chair", [], quantity=10000)
+    lot.change_status(FurnitureState.ASSEMBLED)
+    # One failure in a sample of 100: 1% of the lot, and nothing beyond the sample is drawn.
+    with patch("operations.operations.random.randint", side_effect=[60] + [90] * 99) as mock_randint:
+        rework = CheckOperation(worker).execute(lot)
+    assert mock_randint.call_count == 100
+    assert (lot.quantity, rework.quantity) == (9900, 100)
+    small = Furniture("Chair", [], quantity=6)
+    small.change_status(FurnitureState.ASSEMBLED)
+    with patch("operations.operations.random.randint", side_effect=[60] + [90] * 4):
+        assert CheckOperation(worker).execute(small).quantity == 1
+    whole = Furniture("Chair", [], quantity=50)
+    whole.change_status(FurnitureState.ASSEMBLED)
+    with patch("operations.operations.random.randint", return_value=55):
+        assert CheckOperation(worker).execute(whole) is None
+    assert whole.status == FurnitureState.ELEMENTS_MANUFACTURED and whole.quantity == 50
+
+def test_importer_csv_dedupes_customers(tmp_path):
+    path = tmp_path / "orders.csv"
+    path.write_text(
+        "name,phone,type,quantity,due_date,priority\n"
+        "Alex,+700,стул,2,2026-05-01T10:00:00,1\n"
+        "Alex,+700,Стол,,,\n"
+        "Olga,+701,шкаф,1,,\n"
+        "Bad,+702,диван,1,,\n"
+        ",+703,стул,1,,\n"
+        "Olga,+701,стул,-4,,\n",
+        encoding="utf-8",
+    )
+    existing = Customer("Olga", 40, "+701")
+    customers, furnitures = [existing], []
+    report = OrderImporter(customers, furnitures, chunk_size=2).import_file(str(path))
+
+    assert (report.rows, report.imported, report.rejected) == (6, 3, 3)
+    assert [line for line, _ in report.errors] == [5, 6, 7]
+    assert report.new_customers == 1 and len(customers) == 2
+    assert [f.type for f in furnitures] == ["Стул", "Стол", "Шкаф"]
+    assert furnitures[0].quantity == 2 and furnitures[0].order.priority == 1
+    assert furnitures[0].order.due_date == datetime(2026, 5, 1, 10)
+    assert len(customers[1].orders) == 2 and existing.orders[0].type == "шкаф"
+
+def test_importer_jsonl(tmp_path):
+    path = tmp_path / "orders.jsonl"
+    path.write_text(
+        '{"name": "Alex", "phone": 700, "type": "стул", "quantity": 3}\n'
+        "\n"
+        "not json\n"
+        '{"name": "Alex", "phone": "700", "type": "стол", "age": 200}\n'
+        '{"name": "Ivan", "phone": "701", "type": "шкаф"}\n',
+        encoding="utf-8",
+    )
+    customers, furnitures = [], []
+    report = OrderImporter(customers, furnitures).import_file(str(path))
+    assert (report.imported, report.rejected) == (2, 2)
+    assert [line for line, _ in report.errors] == [3, 4]
+    assert [c.phone for c in customers] == ["700", "701"]
+    assert furnitures[0].quantity == 3 and furnitures[0].status == FurnitureState.CREATED
+
+def test_importer_converts_offset_timestamps_to_local_time(tmp_path):
+    path = tmp_path / "orders.jsonl"
+    path.write_text(
+        '{"name": "A", "phone": "1", "type": "стул", "due_date": "2026-11-01T10:00:00+03:00"}\n'
+        '{"name": "B", "phone": "2", "type": "стул", "due_date": "2026-11-02T10:00:00",'
+        ' "created_at": "2026-10-01T07:00:00Z"}\n',
+        encoding="utf-8",
+    )
+    furnitures = []
+    OrderImporter([], furnitures).import_file(str(path))
+    due = datetime.fromisoformat("2026-11-01T10:00:00+03:00").astimezone().replace(tzinfo=None)
+    assert furnitures[0].order.due_date == due
+    assert all(f.order.due_date.tzinfo is None and f.order.created_at.tzinfo is None for f in furnitures)
+    scheduler = OrderScheduler(datetime(2026, 10, 1))
+    for furniture in furnitures:
+        scheduler.push(furniture, furniture.order)
+    assert scheduler.pop()[0] is furnitures[0]
+
+def test_importer_rejects_non_integer_json_numbers(tmp_path):
+    path = tmp_path / "orders.jsonl"
+    path.write_text(
+        '{"name": "A", "phone": "1", "type": "стул", "quantity": 1e999}\n'
+        '{"name": "B", "phone": "2", "type": "стул", "quantity": 2.7}\n'
+        '{"name": "C", "phone": "3", "type": "стул", "quantity": true}\n'
+        '{"name": "D", "phone": "4", "type": "стул", "quantity": 4.0, "age": false}\n'
+        '{"name": "E", "phone": "5", "type": "стул", "quantity": 5}\n',
+        encoding="utf-8",
+    )
+    furnitures = []
+    report = OrderImporter([], furnitures).import_file(str(path))
+    assert [line for line, _ in report.errors] == [1, 2, 3, 4]
+    assert all("must be an integer" in message for _, message in report.errors)
+    assert [f.quantity for f in furnitures] == [5]
+
+def test_importer_restores_gc_after_a_failing_import():
+    def chunks():
+        yield from dict_chunks([{"name": "A", "phone": "1", "type": "стул"}])
+        raise RuntimeError("source went away")
+    assert gc.isenabled()
+    with pytest.raises(RuntimeError):
+        OrderImporter([], []).import_chunks(chunks())
+    assert gc.isenabled()
+
+def create_stocked_warehouse(metal=1000.0, wood=1000.0):
+    warehouse = Warehouse("Main", 100000)
+    warehouse.metal_amount = metal
+    warehouse.wood_amount = wood
+    return warehouse
+
+@patch("operations.operations.random.randint", return_value=90)
+@patch("operations.operations.random.sample", return_value=[])
+def test_run_batch_completes_orders(mock_sample, mock_randint):
+    warehouse = create_stocked_warehouse()
+    workshop = Workshop("Main")
+    furnitures = [Furniture("Стол", make_components("стол")) for _ in range(5)]
+    report = run_batch(furnitures, warehouse, create_staff(), [Tool("Hammer", 100)], workshop)
+    assert len(report.completed) == 5 and not report.failed
+    assert all(f.status == FurnitureState.STORED for f in furnitures)
+    assert (report.metal_used, report.wood_used) == (25.0, 100.0)
+    assert workshop.get_completed_count() == 5
+    assert report.stage_counts["Created"] == 5
+
+@patch("operations.operations.random.randint", return_value=90)
+@patch("operations.operations.random.sample", return_value=[])
+def test_run_batch_produces_the_earliest_deadline_first(mock_sample, mock_randint):
+    now = datetime.now()
+    furnitures = [Furniture("Стол", make_components("стол")) for _ in range(3)]
+    furnitures[0].order = Order("Стол", 1, now + timedelta(days=5))
+    furnitures[1].order = Order("Стол", 1, now + timedelta(days=1))
+    report = run_batch(furnitures, create_stocked_warehouse(), create_staff(), [Tool("Hammer", 100)])
+    assert report.completed == [furnitures[1], furnitures[0], furnitures[2]]
+    furnitures = [Furniture("Стол", make_components("стол")) for _ in range(2)]
+    furnitures[1].order = Order("Стол", 1, now + timedelta(days=1))
+    report = run_batch(furnitures, create_stocked_warehouse(), create_staff(), [Tool("Hammer", 100)],
+                       scheduler=OrderScheduler(policy="fifo"))
+    assert report.completed == furnitures
+
+def test_plan_shards_never_oversubscribes():
+    warehouse = create_stocked_warehouse(metal=12.0, wood=1000.0)
+    furnitures = [Furniture("Стол", make_components("стол")) for _ in range(4)]
+    plan, rejected = plan_shards(furnitures, warehouse, 2)
+    assert [len(shard.items) for shard in plan] == [1, 1]
+    keys = warehouse.ledger.keys
+    assert sum(amount for shard in plan for slot, amount in shard.allocation.items()
+               if keys[slot][0] == "metal") <= 12.0
+    assert [index for index, _ in rejected] == [2, 3]
+
+def test_run_sharded_merges_results():
+    warehouse = create_stocked_warehouse(metal=30.0, wood=1000.0)
+    furnitures = [Furniture("Стол", make_components("стол")) for _ in range(8)]
+    workshop = Workshop("Main")
+    report = run_sharded(furnitures, warehouse, create_staff(), [Tool("Hammer", 100), Tool("Saw", 100)], 2, workshop)
+    assert report.shards == 2 and len(report.rejected) == 2
+    processed = len(report.completed) + len(report.failed)
+    assert processed >= 6
+    assert report.metal_used == 30.0 and warehouse.metal_amount == 0.0
+    assert warehouse.wood_amount == 1000.0 - report.wood_used
+    assert workshop.get_completed_count() == len(report.completed)
+    assert sum(f.status == FurnitureState.STORED for f in furnitures) == len(report.completed)
+
+def test_run_sharded_splits_tools_and_keeps_their_wear():
+    warehouse = create_stocked_warehouse(metal=1000.0, wood=1000.0)
+    furnitures = [Furniture("Стул", make_components("стул")) for _ in range(4)]
+    tools = [Tool("Hammer", 100)]
+    report = run_sharded(furnitures, warehouse, create_staff(), tools, 2)
+    assert report.shards == 1
+    assert tools[0].durability < 100
+    with pytest.raises(InvalidDataError):
+        run_sharded(furnitures, warehouse, create_staff(), tools, 0)
+
+def test_ledger_prefers_graded_stock_and_falls_back_to_ungraded():
+    warehouse = Warehouse("Main", 1000)
+    warehouse.add_material(Wood("Дуб", 50.0))
+    warehouse.wood_amount = 90.0
+    bill = warehouse.bill_of_materials([Wood("Дуб", 10.0), Wood("Сосна", 20.0)], 2)
+    assert list(bill) == [(("wood", "Дуб"), 20.0), (("wood", ""), 40.0)]
+    warehouse.consume(bill)
+    assert warehouse.amount("wood", "Дуб") == 30.0 and warehouse.wood_amount == 30.0
+
+def test_ledger_tops_up_short_graded_stock_from_ungraded():
+    warehouse = create_stocked_warehouse(metal=0.0, wood=8000.0)
+    warehouse.add_material(Wood("Дуб", 5.0))
+    bill = warehouse.bill_of_materials(make_components("стул"))
+    assert list(bill) == [(("wood", "Дуб"), 5.0), (("wood", ""), 5.0)]
+    assert warehouse.shortages(bill) == []
+    warehouse.consume(bill)
+    assert warehouse.amount("wood", "Дуб") == 0.0 and warehouse.wood_amount == 7995.0
+    other = Warehouse("Far", 1000)
+    other.wood_amount = 100.0
+    network = WarehouseNetwork([other, warehouse], {})
+    allocation = network.consume(network.bill_of_materials([Wood("Дуб", 30.0)]))
+    assert sum(amount for _, part in allocation for _, amount in part) == 30.0
+    planner = RestockPlanner(warehouse, kinds=["wood"])
+    assert sum(planner.backlog_demand([Furniture("Стул", make_components("стул"))])) == 10.0
+
+def test_ledger_handles_new_material_kinds():
+    warehouse = Warehouse("Main", 1000)
+    warehouse.add_material(RawMaterial("Glass", "Tempered", 12.0))
+    bill = warehouse.bill_of_materials([RawMaterial("glass", "Tempered", 5.0)], 3)
+    assert not warehouse.has_materials(bill)
+    with pytest.raises(InvalidAmountError, match=r"glass \(Tempered\). Need 15.0, have 12.0"):
+        warehouse.consume(bill)
+    warehouse.consume(warehouse.bill_of_materials([RawMaterial("glass", "Tempered", 4.0)], 3))
+    assert warehouse.amount("glass") == 0.0 and "Glass: 0.0" in str(warehouse)
+
+def test_metal_amount_setter_keeps_total():
+    warehouse = create_stocked_warehouse(metal=100.0, wood=0.0)
+    warehouse.add_material(Metal("Сталь", 20.0))
+    warehouse.metal_amount = 50.0
+    assert warehouse.metal_amount == 50.0 and warehouse.total_amount == 50.0
+
+def create_network():
+    near = create_stocked_warehouse(metal=3.0, wood=100.0)
+    far = Warehouse("Far", 1000)
+    far.metal_amount = 100.0
+    far.wood_amount = 100.0
+    return WarehouseNetwork([far, near], {"Main": 1.0, "Far": 5.0})
+
+def test_network_splits_bill_by_cost():
+    network = create_network()
+    far, near = network.warehouses
+    bill = network.bill_of_materials(make_components("стол"))
+    allocation = network.consume(bill)
+    assert [(source.name, list(part)) for source, part in allocation] == [
+        ("Far", [(("metal", ""), 2.0)]),
+        ("Main", [(("wood", ""), 20.0), (("metal", ""), 3.0)]),
+    ]
+    assert network.allocation_cost(allocation) == 33.0
+    assert (near.metal_amount, far.metal_amount, network.metal_amount) == (0.0, 98.0, 98.0)
+
+def test_network_totals_follow_direct_changes():
+    network = create_network()
+    assert network.wood_amount == 200.0
+    network.warehouses[0].remove_wood(50.0)
+    assert network.wood_amount == 150.0
+    bill = network.bill_of_materials([Wood("Дуб", 200.0)])
+    with pytest.raises(InvalidAmountError):
+        network.consume(bill)
+    assert network.wood_amount == 150.0
+
+@patch("operations.operations.random.randint", return_value=90)
+@patch("operations.operations.random.sample", return_value=[])
+def test_run_batch_draws_from_network(mock_sample, mock_randint):
+    # Quality control is random: a rejected table would be reworked and draw more metal.
+    network = create_network()
+    furnitures = [Furniture("Стол", make_components("стол")) for _ in range(3)]
+    report = run_batch(furnitures, network, create_staff(), [Tool("Hammer", 100)])
+    assert len(report.completed) == 3 and report.metal_used == 15.0
+    assert network.metal_amount == 88.0 and network.warehouses[1].metal_amount == 0.0
+
+def test_history_answers_point_in_time_queries():
+    now = [0.0]
+    warehouse = create_stocked_warehouse(metal=0.0, wood=0.0)
+    history = warehouse.enable_history(checkpoint_every=4, clock=lambda: now[0])
+    warehouse.add_material(Wood("Дуб", 100.0))
+    for hour in range(1, 11):
+        now[0] = hour * 3600.0
+        warehouse.consume(warehouse.bill_of_materials([Wood("Дуб", 5.0)]))
+    assert len(history) == 11
+    assert history.amount_at("wood", 0.0, "Дуб") == 100.0
+    assert history.amount_at("wood", 3.5 * 3600) == 85.0
+    assert history.amount_at("wood", 10 * 3600) == warehouse.wood_amount == 50.0
+    assert history.snapshot(7200.0)[("wood", "Дуб")] == 90.0
+
+def test_history_reports_consumption_rate():
+    now = [0.0]
+    warehouse = create_stocked_warehouse(metal=100.0, wood=100.0)
+    history = warehouse.enable_history(checkpoint_every=3, clock=lambda: now[0])
+    for hour in range(1, 9):
+        now[0] = hour * 3600.0
+        warehouse.remove_metal(2.0)
+        warehouse.remove_wood(hour)
+    assert history.consumed("metal", 2 * 3600, 6 * 3600) == 8.0
+    assert history.consumption_rates(0.0, 4 * 3600) == {("metal", ""): 2.0, ("wood", ""): 2.5}
+    with pytest.raises(InvalidDataError):
+        history.consumption_rates(3600.0, 3600.0)
+
+def create_packed(prod_type, address, quantity=1):
+    furniture = Furniture(prod_type, make_components(prod_type.lower()), quantity)
+    furniture.status = FurnitureState.PACKED
+    furniture.delivery_address = address
+    return furniture
+
+def test_delivery_planner_fills_vehicles_by_area():
+    locations = {"North, 1": (0.0, 10.0), "North, 2": (1.0, 10.0), "South, 1": (0.0, -10.0)}
+    items = [create_packed("Стол", "North, 1"), create_packed("Стул", "South, 1", 2),
+             create_packed("Шкаф", "North, 2"), create_packed("Стол", "Nowhere")]
+    drivers = [Worker("D1", 30, "водитель", 3), Worker("D2", 30, "водитель", 8), Worker("A", 30, "сборщик", 9)]
+    plan = DeliveryPlanner(locations, capacity=8.0).plan(items, drivers)
+    assert [sorted(trip.stops) for trip in plan.trips] == [["South, 1"], ["North, 1", "North, 2"]]
+    assert [trip.load for trip in plan.trips] == [2.0, 8.0]
+    assert plan.driver_trips() == {"D2": 1, "D1": 1}
+    assert [reason for _, reason in plan.unassigned] == ["Unknown delivery address 'Nowhere'"]
+    workshop = Workshop("Main")
+    assert len(plan.execute(workshop)) == 3 and workshop.get_completed_count() == 3
+    assert items[2].status == FurnitureState.DELIVERED and items[3].status == FurnitureState.PACKED
+
+def test_delivery_plan_ships_stored_goods_and_frees_the_store():
+    store = FinishedGoodsStore(Warehouse("Finished", 10))
+    workshop = Workshop("Main")
+    item = create_packed("Стол", "North, 1")
+    assert store.reserve(item) and store.put(item)
+    item.status = FurnitureState.STORED
+    workshop.add_completed_furniture(item)
+    plan = DeliveryPlanner({"North, 1": (0.0, 10.0)}).plan([item], [Worker("D", 30, "водитель", 3)])
+    assert plan.trips[0].items == [item]
+    assert plan.execute(workshop, store=store) == [item]
+    assert item.status == FurnitureState.DELIVERED and store.used == 0
+    assert workshop.get_completed_count() == 1
+
+def test_two_opt_removes_crossing():
+    points = [(0, 0), (0, 1), (1, 0), (1, 1)]
+    matrix = [[((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5 for b in points] for a in points]
+    crossing = [1, 2, 3]
+    assert route_length(two_opt(crossing, matrix), matrix) == 4.0 < route_length(crossing, matrix)
+    assert route_length(nearest_neighbour(matrix), matrix) == 4.0
+
+def test_delivery_operation_without_workshop():
+    furniture = create_packed("Стол", "Moscow")
+    DeliveryOperation(Worker("D", 30, "водитель", 3)).execute(furniture)
+    assert furniture.status == FurnitureState.DELIVERED
+
+def create_packing_warehouse(boxes=100.0, film=200.0, paper=100.0):
+    warehouse = Warehouse("Packing", 100000)
+    for grade, amount in (("Box", boxes), ("Film", film), ("Paper", paper)):
+        warehouse.add_material(RawMaterial("packing", grade, amount))
+    return warehouse
+
+def create_checked(prod_type, count, quantity=1):
+    items = [Furniture(prod_type, make_components(prod_type.lower()), quantity) for _ in range(count)]
+    for item in items:
+        item.status = FurnitureState.QUALITY_CHECKED
+    return items
+
+def test_bulk_packing_is_one_transaction():
+    warehouse = create_packing_warehouse(boxes=5000.0, film=10000.0, paper=5000.0)
+    history = warehouse.enable_history()
+    recorded = len(history)
+    items = create_checked("Стол", 1000) + create_checked("Стул", 2, quantity=5)
+    PackingOperation(Worker("P", 30, "упаковщик", 3), warehouse=warehouse).execute_batch(items)
+    assert all(item.status == FurnitureState.PACKED for item in items)
+    assert items[0].packing_material == ["Box", "Film", "Paper"]
+    assert warehouse.amount("packing", "Box") == 5000.0 - 2010.0
+    assert warehouse.amount("packing", "Film") == 10000.0 - 4020.0
+    assert len(history) - recorded == 3
+
+def test_packing_shortage_packs_what_the_stock_covers():
+    warehouse = create_packing_warehouse(boxes=3.0)
+    packing = PackingOperation(Worker("P", 30, "упаковщик", 3), warehouse=warehouse)
+    items = create_checked("Шкаф", 2) + create_checked("Стул", 1)
+    assert packing.forecast(items) == [(("packing", "Box"), 7.0, 3.0)]
+    assert packing.execute_batch(items) == items[1:]
+    assert [item.status for item in items] == [FurnitureState.PACKED] + [FurnitureState.QUALITY_CHECKED] * 2
+    assert warehouse.amount("packing", "Box") == 0.0
+    with pytest.raises(InvalidAmountError):
+        packing.execute(items[2])
+    assert items[2].status == FurnitureState.QUALITY_CHECKED
+
+@patch("operations.operations.random.randint", return_value=90)
+@patch("operations.operations.random.sample", return_value=[])
+def test_run_batch_fails_only_the_items_packing_stock_misses(mock_sample, mock_randint):
+    packing = create_packing_warehouse(boxes=2.0)
+    furnitures = [Furniture("Стул", make_components("стул")) for _ in range(3)]
+    report = run_batch(furnitures, create_stocked_warehouse(), create_staff(), [Tool("Hammer", 100)],
+                       packing_warehouse=packing)
+    assert report.completed == furnitures[:2]
+    assert [(item, reason.startswith("Not enough packing (Box)")) for item, reason in report.failed] == [(furnitures[2], True)]
+    assert report.failed_with(ShortageError) == furnitures[2:] and report.errors == [ShortageError]
+
+def test_batch_report_tells_stock_outs_from_other_failures():
+    report = BatchReport()
+    idle, short = Furniture("Стул", [], 1), Furniture("Стол", [], 1)
+    report.fail(idle, InvalidAmountError("No available workers"))
+    report.fail(short, ShortageError("Not enough wood"))
+    assert report.failed_with(ShortageError) == [short]
+    assert report.failed_with(InvalidAmountError) == [idle, short]
+
+def test_load_stocks_packing_only_when_the_save_has_none(tmp_path):
+    path = str(tmp_path / "save.json")
+    state = list(factory_main.initialize_system())
+    storage = state[0]
+    storage.consume(storage.bill_of_materials([RawMaterial("packing", "Box", storage.amount("packing", "Box"))]))
+    factory_main.save_game(*state, path=path)
+    assert factory_main.load_game(path)[0].amount("packing", "Box") == 0.0
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["material_storage"]["materials"] = [record for record in data["material_storage"]["materials"]
+                                             if record["kind"] != "packing"]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    assert factory_main.load_game(path)[0].amount("packing", "Box") > 0
+
+def test_packing_stock_is_seeded_within_the_warehouse_capacity():
+    storage = factory_main.initialize_system()[0]
+    assert storage.amount("packing", "Box") > 0
+    assert storage.total_amount <= storage.capacity
+    full = Warehouse("Full", 100.0)
+    full.wood_amount = 90.0
+    factory_main.stock_packing(full)
+    assert full.total_amount == 100.0
+
+@patch("operations.operations.random.randint", return_value=90)
+@patch("operations.operations.random.sample", return_value=[])
+def test_run_batch_packs_in_bulk(mock_sample, mock_randint):
+    warehouse = create_stocked_warehouse()
+    packing = create_packing_warehouse()
+    furnitures = [Furniture("Стул", make_components("стул")) for _ in range(4)]
+    report = run_batch(furnitures, warehouse, create_staff(), [Tool("Hammer", 100)], packing_warehouse=packing)
+    assert len(report.completed) == 4 and report.stage_counts["Quality Checked"] == 1
+    assert packing.amount("packing", "Box") == 96.0
+
+def test_cli_submit_run_batch_and_export(tmp_path, capsys):
+    save = str(tmp_path / "save.json")
+    assert cli.run(["--save", save, "submit", "--name", "Ivan", "--phone", "123", "--type", "стул", "--quantity", "3"]) == 0
+    assert cli.run(["--save", save, "submit", "--name", "Ivan", "--phone", "123", "--type", "шкаф"]) == 0
+    with patch("operations.operations.random.randint", return_value=90), \
+            patch("operations.operations.random.sample", return_value=[]):
+        assert cli.run(["--save", save, "run-batch"]) == 0
+    capsys.readouterr()
+    cli.run(["--save", save, "report", "--json"])
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["statuses"] == {"Stored": 2} and summary["types"] == {"Стул": 3, "Шкаф": 1}
+    assert summary["customers"] == 1
+    output = str(tmp_path / "orders.csv")
+    cli.run(["--save", save, "export", output])
+    with open(output, encoding="utf-8") as f:
+        assert f.read().splitlines()[1].startswith("Ivan,123,стул,3,")
+
+def test_cli_report_imports_only_stdlib(tmp_path):
+    save = str(tmp_path / "save.json")
+    cli.run(["--save", save, "submit", "--name", "Ivan", "--phone", "123", "--type", "стол"])
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cli.py")
+    result = subprocess.run([sys.executable, "-X", "importtime", script, "--save", save, "report", "--json"],
+                            capture_output=True, text=True, check=True)
+    modules = [line.split("|")[2].strip() for line in result.stderr.splitlines()[1:]
+               if line.startswith("import time:")]
+    assert not [m for m in modules if m.split(".")[0] in ("main", "models", "operations", "services")]
+    assert json.loads(result.stdout)["orders"] == 1
+
+def run_with_server(scenario):
+    async def main():
+        service = OrderService([], [])
+        server = OrderServer(service, port=0)
+        await server.start()
+        try:
+            return service, await scenario(server)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+def test_server_batches_pipelined_orders():
+    records = [{"name": f"C{i}", "phone": str(i % 3), "type": "стол", "quantity": 2} for i in range(40)]
+    service, report = run_with_server(
+        lambda server: run_load(server.host, server.port, records, connections=2, pipeline=10, queries=5))
+    assert report.statuses == {201: 40, 200: 5}
+    assert len(service.furnitures) == 40 and len(service.customers) == 3
+    assert service.commits < 40
+
+def test_server_answers_every_client_when_a_row_breaks_the_import():
+    original = OrderImporter._import_chunk
+    def poisoned(self, lines, columns, malformed, report):
+        # Stores the rows, then fails as an importer bug would.
+        original(self, lines, columns, malformed, report)
+        if "Boom" in columns[0]:
+            raise OverflowError("poisoned row")
+    async def send(server, record):
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        writer.write(order_request(record))
+        await writer.drain()
+        response = await read_response(reader)
+        writer.close()
+        return response
+    async def scenario(server):
+        records = [{"name": name, "phone": phone, "type": "стул"}
+                   for name, phone in (("Ivan", "1"), ("Boom", "2"), ("Olga", "3"))]
+        return await asyncio.wait_for(asyncio.gather(*(send(server, r) for r in records)), 5)
+    with patch.object(OrderImporter, "_import_chunk", poisoned):
+        service, responses = run_with_server(scenario)
+    assert sorted(code for code, _ in responses) == [201, 201, 400]
+    assert "poisoned row" in responses[1][1]["error"]
+    assert sorted(body["id"] for code, body in responses if code == 201) == [0, 1]
+    assert [c.name for c in service.customers] == ["Ivan", "Olga"]
+    assert [f.customer for f in service.furnitures] == ["Ivan", "Olga"]
+
+def test_server_answers_pipelined_requests_in_order():
+    async def scenario(server):
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        writer.write(order_request({"name": "Ivan", "phone": "1", "type": "шкаф"})
+                     + order_request({"name": "Ivan", "phone": "1", "type": "диван"})
+                     + b"POST /orders HTTP/1.1\r\nContent-Length: 3\r\n\r\n[1]"
+                     + status_request(0) + status_request(7))
+        await writer.drain()
+        responses = [await read_response(reader) for _ in range(5)]
+        writer.close()
+        return responses
+    _, responses = run_with_server(scenario)
+    assert [code for code, _ in responses] == [201, 400, 400, 200, 404]
+    assert responses[0][1] == {"id": 0}
+    assert "диван" in responses[1][1]["error"]
+    assert responses[3][1]["type"] == "Шкаф" and responses[3][1]["status"] == "Created"
+
+def test_report_aggregates_follow_state_changes():
+    items = [Furniture("Стол", make_components("стол"), 4), Furniture("Стул", make_components("стул"))]
+    items[0].customer = "Ivan"
+    workers = create_staff()
+    tools = [Tool("Hammer", 12), Tool("Saw", 50)]
+    warehouse = create_stocked_warehouse(metal=100.0, wood=0.0)
+    stats = ReportAggregates(repair_threshold=10).watch(items, workers, tools, [warehouse])
+    assert stats.state_counts[FurnitureState.CREATED] == 2
+    items[0].change_status(FurnitureState.ASSEMBLED)
+    part = items[0].split(1)
+    assert stats.state_counts[FurnitureState.ASSEMBLED] == 2 and stats.type_counts == {"Стол": 2, "Стул": 1}
+    assert stats.orders_of("Ivan") == [items[0], part]
+    workers[0].is_busy = True
+    workers[0].is_busy = True
+    assert (stats.busy_workers, stats.free_workers) == (1, len(workers) - 1)
+    tools[0].use()
+    tools[0].use()
+    assert list(stats.worn_tools.values()) == [tools[0]]
+    tools[0].repair()
+    assert not stats.worn_tools
+    assert stats.summary()["warehouses"] == {"Main": 0.001}
+
+def test_trusted_constructors_match_validated_ones():
+    assert vars(Tool.trusted("Hammer", 5)) == vars(Tool("Hammer", 5))
+    assert vars(Worker.trusted("Ann", 30, "столяр", 4)) == vars(Worker("Ann", 30, "столяр", 4))
+    assert vars(Customer.trusted("Ivan", 30, "123")) == vars(Customer("Ivan", 30, "123"))
+    assert vars(Metal.trusted("Сталь", 5.0)) == vars(Metal("Сталь", 5.0))
+    created = datetime(2026, 1, 5)
+    assert vars(Order.trusted("стол", 2, None, 1, created)) == vars(Order("стол", 2, None, 1, created))
+    furniture = Furniture("Стол", [], 2)
+    assert vars(Furniture.trusted("Стол", [], 2)) == vars(furniture)
+    assert vars(Warehouse.trusted("Main", 10)).keys() == vars(Warehouse("Main", 10)).keys()
+    with pytest.raises(InvalidAmountError):
+        Warehouse.trusted("Main", 0)
+
+def test_bulk_factories_validate_whole_columns():
+    tools = make_tools(["Hammer", "Saw"], [10, 20])
+    assert [t.durability for t in tools] == [10, 20]
+    with pytest.raises(InvalidAmountError, match="record 2"):
+        make_tools(["Hammer", "Saw"], [10, 0])
+    with pytest.raises(InvalidDataError, match="Age out of range"):
+        make_workers(["A", "B"], [30, 151], ["столяр", "сборщик"], [1, 2])
+    materials = make_materials(["wood", "metal", "glass"], ["Дуб", "Сталь", "Tempered"], [1.0, 2, 3.5])
+    assert [type(m).__name__ for m in materials] == ["Wood", "Metal", "RawMaterial"]
+    with pytest.raises(InvalidAmountError):
+        make_materials(["wood"], ["Дуб"], [-1.0])
+    with pytest.raises(InvalidDataError, match="Unknown furniture status"):
+        make_furnitures(["Стол"], [[]], [1], ["Broken"])
+    lists = make_material_lists([(("wood", "Дуб", 5.0),), (("wood", "Дуб", 5.0),), ()])
+    assert lists[0] is lists[1] and lists[2] == [] and str(lists[0][0]) == str(Wood("Дуб", 5.0))
+
+def test_trusted_load_matches_validated_load(tmp_path):
+    path = str(tmp_path / "save.json")
+    state = list(factory_main.initialize_system())
+    first = Furniture("Стол", make_components("стол"), 3)
+    first.customer = "Ivan"
+    first.status = FurnitureState.STORED
+    state[2].completed_furnitures.append(first)
+    state[5].append(Customer("Ivan", 30, "123"))
+    state[6].extend([first, Furniture("Стул", [RawMaterial("glass", "Tempered", 1.0)])])
+    factory_main.save_game(*state, path=path)
+    loaded = [factory_main.load_game(path, trusted=trusted) for trusted in (False, True)]
+    summaries = [[(f.type, f.quantity, f.status, [str(m) for m in f.materials]) for f in state[6]]
+                 for state in loaded]
+    assert summaries[0] == summaries[1] and summaries[1][0][1:3] == (3, FurnitureState.STORED)
+    assert [len(state[2].completed_furnitures) for state in loaded] == [1, 1]
+    assert [vars(w) for w in loaded[0][3]] == [vars(w) for w in loaded[1][3]]
+
+def create_snapshot(count, wood=0.0):
+    warehouse = Warehouse("Main", 100000)
+    if wood:
+        warehouse.add_material(Wood("Дуб", wood))
+    items = [Furniture("Стул", make_components("стул")) for _ in range(count)]
+    return FactorySnapshot.capture([warehouse], create_staff(), [Tool("Saw", 500)], items), items, warehouse
+
+def test_snapshot_fork_copies_only_written_chunks():
+    base, items, warehouse = create_snapshot(3 * CHUNK)
+    fork = base.fork()
+    assert fork.shared_chunks(base) == 3
+    edited = fork.edit(CHUNK + 5)
+    edited.status = FurnitureState.MATERIALS_PREPARED
+    assert fork.edit(CHUNK + 5) is edited
+    assert items[CHUNK + 5].status == FurnitureState.CREATED and base[CHUNK + 5] is items[CHUNK + 5]
+    assert fork.shared_chunks(base) == 2 and fork.changed(base) == [CHUNK + 5]
+    fork.edit_warehouse().add_material(Wood("Дуб", 50.0))
+    fork.edit_staff()[0].append(Worker("New", 30, "столяр", 1))
+    assert warehouse.amount("wood") == 0 and len(base.workers) == 5 and len(fork.workers) == 6
+    second = fork.fork()
+    second.edit(CHUNK + 5).status = FurnitureState.ASSEMBLED
+    assert fork[CHUNK + 5].status == FurnitureState.MATERIALS_PREPARED
+
+@patch("operations.operations.random.randint", return_value=90)
+@patch("operations.operations.random.sample", return_value=[])
+def test_scenarios_compare_without_touching_the_base(mock_sample, mock_randint):
+    base, items, _ = create_snapshot(4)
+    baseline = run_scenario(base, Scenario("As is"))
+    bought = run_scenario(base, Scenario("Buy oak", stock=[("wood", "Дуб", 40.0)]))
+    assert (baseline.completed, baseline.failed) == (0, 4)
+    assert (bought.completed, bought.failed) == (4, 0)
+    assert bought.summary["states"] == {"Stored": 4} and bought.summary["stock"] == {"wood (Дуб)": 0.0}
+    assert bought.delta(baseline)["completed"] == 4
+    assert all(item.status == FurnitureState.CREATED for item in items)
+    assert bought.snapshot.changed(base) == [0, 1, 2, 3]
+
+def test_scenarios_run_in_processes():
+    base, _, _ = create_snapshot(6)
+    results = run_scenarios(base, [Scenario("As is"), Scenario("More staff", workers=[("Ann", 30, "столяр", 2)])],
+                            processes=2)
+    assert [result.name for result in results] == ["As is", "More staff"]
+    assert [result.failed for result in results] == [6, 6]
+    assert results[1].summary["workers"] == 6 and results[0].snapshot is None
+
+@patch("operations.operations.random.randint", return_value=90)
+@patch("operations.operations.random.sample", return_value=[])
+def test_batch_records_metrics(mock_sample, mock_randint):
+    warehouse = create_stocked_warehouse()
+    workers = create_staff()
+    metrics = FactoryMetrics().watch(workers, [Tool.trusted("Saw", 0)], [warehouse])
+    items = [Furniture("Стол", make_components("стол"), 2) for _ in range(3)]
+    run_batch(items, warehouse, workers, [Tool("Hammer", 500)], metrics=metrics)
+    assert metrics.transitions.value("Created", "Materials Prepared") == 3
+    assert metrics.transitions.value("Packed", "Stored") == 3
+    assert metrics.quality.value("pass") == 6 and metrics.quality.value("fail") == 0
+    assert metrics.consumed.value("wood", "") == 120 and metrics.lead_time.count() == 3
+    assert metrics.stage_seconds.count("Assembled") == 3
+    text = metrics.render()
+    assert "# TYPE factory_stage_seconds histogram" in text
+    assert 'factory_stage_seconds_bucket{stage="Created",le="+Inf"} 3' in text
+    assert 'factory_transitions_total{from="Assembled",to="Quality Checked"} 3' in text
+    assert "factory_broken_tools 1" in text and "factory_busy_workers 0" in text
+    assert 'factory_warehouse_fill_ratio{warehouse="Main"}' in text
+
+def test_metrics_are_summed_across_threads_and_served(tmp_path):
+    import threading
+    import urllib.request
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs_total", "Jobs", ("queue",))
+    histogram = registry.histogram("job_seconds", "Job time", buckets=(1.0, 2.0))
+    def work():
+        for _ in range(1000):
+            counter.inc(1.0, "a\"b")
+            histogram.observe(1.5)
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value('a"b') == 4000 and histogram.count() == 4000
+    path = str(tmp_path / "metrics.prom")
+    registry.write(path)
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    assert 'jobs_total{queue="a\\"b"} 4000' in text
+    assert 'job_seconds_bucket{le="1"} 0' in text and 'job_seconds_bucket{le="2"} 4000' in text
+    port = registry.serve(port=0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.read().decode("utf-8") == registry.render()
+    finally:
+        registry.close()
+    with pytest.raises(InvalidDataError):
+        registry.counter("jobs_total", "Again")
+
+def test_workshop_moves_old_items_to_archive(tmp_path):
+    path = str(tmp_path / "archive.bin")
+    workshop = Workshop("Main", FurnitureArchive(path), retention=timedelta(days=1), keep=2)
+    for number in range(5):
+        item = Furniture("Стул" if number % 2 else "Стол", [], number + 1)
+        item.customer = f"Client {number % 2}"
+        item.status = FurnitureState.DELIVERED
+        workshop.add_completed_furniture(item)
+    assert len(workshop.completed_furnitures) == 2 and len(workshop.archive) == 3
+    assert workshop.get_completed_count() == 5 and workshop.get_completed_units() == 15
+    assert workshop.archive_old(datetime.now() + timedelta(days=2)) == 2
+    assert workshop.completed_furnitures == []
+    workshop.archive.close()
+    with FurnitureArchive(path) as archive:
+        assert len(archive) == 5 and archive.units == 15
+        assert [item.quantity for item in archive.by_customer("Client 1")] == [2, 4]
+        assert [item.id for item in archive.by_type("Стол")] == [0, 2, 4]
+        assert archive.get(3).type == "Стул" and archive.get(3).status == FurnitureState.DELIVERED
+        with pytest.raises(InvalidDataError):
+            archive.get(5)
+
+def test_stored_goods_stay_out_of_the_archive_until_shipped(tmp_path):
+    workshop = Workshop("Main", FurnitureArchive(str(tmp_path / "archive.bin")), keep=0)
+    store = FinishedGoodsStore(Warehouse("Finished", 10))
+    stored, delivered = Furniture("Стул", [], 1), Furniture("Стол", [], 1)
+    assert store.reserve(stored) and store.put(stored)
+    stored.status, delivered.status = FurnitureState.STORED, FurnitureState.DELIVERED
+    workshop.add_completed_furniture(stored)
+    workshop.add_completed_furniture(delivered)
+    assert workshop.completed_furnitures == [stored] and len(workshop.archive) == 1
+    assert store.ship(workshop.completed_furnitures) == [stored] and store.used == 0
+    assert workshop.archive_old() == 1 and workshop.completed_furnitures == []
+    workshop.archive.close()
+
+def test_archived_items_leave_the_server_and_report_indexes(tmp_path):
+    workshop = Workshop("Main", FurnitureArchive(str(tmp_path / "archive.bin")), keep=0)
+    furnitures = []
+    service = OrderService([], furnitures, workshop=workshop)
+    stats = ReportAggregates()
+    workshop.archive_listeners.append(stats.forget)
+    order_id = asyncio.run(service.submit({"name": "Oleg", "phone": "1", "type": "стул"}))
+    item = furnitures[0]
+    stats.watch([item])
+    assert stats.orders_of("Oleg") == [item]
+    item.status = FurnitureState.DELIVERED
+    workshop.add_completed_furniture(item)
+    assert order_id not in service._by_id and stats.orders_of("Oleg") == []
+    assert service.status(order_id)["archived"] and stats.summary()["customers"] == 1
+    workshop.archive.close()
+
+def test_archive_grows_and_survives_save(tmp_path):
+    path = str(tmp_path / "archive.bin")
+    state = list(factory_main.initialize_system())
+    workshop = state[2]
+    factory_main.attach_archive(workshop, path, retention=None, keep=0)
+    for _ in range(5000):
+        workshop.add_completed_furniture(Furniture("Стол", [], 1))
+    assert len(workshop.archive) == 5000 and workshop.completed_furnitures == []
+    save = str(tmp_path / "save.json")
+    factory_main.save_game(*state, path=save)
+    workshop.archive.close()
+    loaded = factory_main.load_game(save)
+    assert loaded[2].get_completed_count() == 5000 and loaded[2].keep == 0
+    loaded[2].archive.close()
+
+def test_archived_items_leave_orders_and_save(tmp_path, monkeypatch):
+    folder = tmp_path / "saves"
+    folder.mkdir()
+    save = str(folder / "save.json")
+    state = list(factory_main.initialize_system())
+    workshop, furnitures = state[2], state[6]
+    furnitures.clear()
+    factory_main.attach_archive(workshop, "archive.bin", retention=None, keep=1,
+                                furnitures=furnitures, save_path=save)
+    items = [Furniture("Стол", [], 1) for _ in range(3)]
+    furnitures.extend(items)
+    for item in items:
+        item.status = FurnitureState.DELIVERED
+        workshop.add_completed_furniture(item)
+    assert furnitures == [items[2]] and len(workshop.archive) == 2
+    furnitures.append(Furniture("Стул", [], 1))
+    factory_main.save_game(*state, path=save)
+    workshop.archive.close()
+    with open(save, encoding="utf-8") as f:
+        data = json.load(f)
+    assert [f["id"] for f in data["furnitures"]] == [2, 3] and data["workshop"]["archive"] == "archive.bin"
+    # The archive is found next to the save, wherever the process runs.
+    monkeypatch.chdir(tmp_path)
+    loaded = factory_main.load_game(save)
+    assert loaded[2].archive.path == str(folder / "archive.bin")
+    service = OrderService(loaded[5], loaded[6], workshop=loaded[2])
+    assert service.status(0)["archived"] and service.status(0)["type"] == "Стол"
+    assert service.status(3)["type"] == "Стул" and service.status(4) is None
+    order_id = asyncio.run(service.submit({"name": "Oleg", "phone": "1", "type": "стул"}))
+    assert order_id == 4 and service.status(4)["customer"] == "Oleg"
+    loaded[2].archive.close()
+
+def test_finished_goods_store_books_load_units():
+    store = FinishedGoodsStore(Warehouse("Finished", 10))
+    table, chairs = Furniture("Стол", [], 2), Furniture("Стул", [], 3)
+    assert store.reserve(table) and store.free == 4
+    assert not store.reserve(Furniture("Шкаф", [], 1)) and store.reserve(chairs)
+    assert store.put(table) and store.used == 6 and store.reserved == 3
+    table.status = FurnitureState.STORED
+    assert store.ship([table, chairs]) == [table]
+    assert table.status == FurnitureState.DELIVERED and store.used == 0
+    assert store.warehouse.amount(FINISHED_KIND, "Стол") == 0
+
+@patch("operations.operations.random.randint", return_value=90)
+@patch("operations.operations.random.sample", return_value=[])
+def test_full_finished_storage_pauses_the_batch(mock_sample, mock_randint):
+    warehouse = create_stocked_warehouse()
+    store = FinishedGoodsStore(Warehouse("Finished", 7))
+    items = [Furniture("Стол", make_components("стол")) for _ in range(4)]
+    report = run_batch(items, warehouse, create_staff(), [Tool("Saw", 500)], finished=store)
+    assert len(report.completed) == 2 and report.waiting == items[2:] and not report.failed
+    assert [item.status for item in items[2:]] == [FurnitureState.CREATED] * 2
+    assert warehouse.wood_amount == 960 and "waiting for storage: 2" in str(report)
+    shipments = []
+    report = run_batch(items, warehouse, create_staff(), [Tool("Saw", 500)], finished=store,
+                       make_room=lambda store, need: shipments.append(store.ship(items)))
+    assert len(report.completed) == 2 and not report.waiting and len(shipments) == 1
+    assert [item.status for item in items] == [FurnitureState.DELIVERED] * 2 + [FurnitureState.STORED] * 2
+    assert store.used == 6 and store.reserved == 0
+
+def test_store_keeps_an_item_the_finished_store_refuses():
+    store = FinishedGoodsStore(Warehouse("Finished", 1))
+    item = Furniture("Стол", [], 1)
+    item.status = FurnitureState.PACKED
+    report, workshop = BatchReport(), Workshop("Main")
+    _store(item, workshop, report, finished=store)
+    assert report.waiting == [item] and not report.completed
+    assert item.status == FurnitureState.PACKED and workshop.get_completed_count() == 0
+
+@patch("operations.operations.random.randint", return_value=90)
+@patch("operations.operations.random.sample", return_value=[])
+def test_run_sharded_respects_finished_storage(mock_sample, mock_randint):
+    store = FinishedGoodsStore(Warehouse("Finished", 7))
+    items = [Furniture("Стол", make_components("стол")) for _ in range(4)]
+    report = run_sharded(items, create_stocked_warehouse(), create_staff(),
+                         [Tool("Saw", 500), Tool("Hammer", 500)], 2, finished=store)
+    assert len(report.completed) == 2 and len(report.waiting) == 2 and not report.failed
+    assert store.used == 6 and store.reserved == 0
+    assert [item.status for item in items[2:]] == [FurnitureState.CREATED] * 2
+
+@patch("operations.operations.random.randint", return_value=90)
+@patch("operations.operations.random.sample", return_value=[])
+def test_profile_attributes_time_to_classes(mock_sample, mock_randint, tmp_path):
+    items = [Furniture("Стол", make_components("стол")) for _ in range(20)]
+    report, profile = profile_call(run_batch, items, create_stocked_warehouse(), create_staff(),
+                                   [Tool("Saw", 500)])
+    assert len(report.completed) == 20
+    assert {"PreparationOperation", "CheckOperation", "Warehouse", "Tool", "Worker"} <= set(profile.categories)
+    own, total = profile.categories["PreparationOperation"]
+    assert 0 < own <= total <= profile.seconds
+    collapsed, summary = profile.write(str(tmp_path / "run"), count=5)
+    with open(collapsed, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("run_batch" in line and "(execute)" in line for line in lines)
+    with open(summary, encoding="utf-8") as f:
+        assert "Top 5 functions" in f.read()
+
+def test_sampling_profiler_collects_stacks():
+    def busy():
+        deadline = time.perf_counter() + 0.2
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+        return "done"
+    result, profile = profile_call(busy, mode="sample", interval=0.002)
+    assert result == "done" and profile.stacks
+    assert any(name.endswith("(busy)") for name in profile.functions)
+    with pytest.raises(InvalidDataError):
+        profile_call(busy, mode="perf")
+
+def test_pipeline_compiles_transition_table():
+    assert PRODUCTION.by_state[FurnitureState.CREATED].name == "prepare"
+    assert PRODUCTION.table[FurnitureState.ASSEMBLED] == {FurnitureState.QUALITY_CHECKED,
+                                                          FurnitureState.ELEMENTS_MANUFACTURED}
+    assert PRODUCTION.table[FurnitureState.PACKED] == {FurnitureState.STORED}
+    with pytest.raises(InvalidDataError):
+        PRODUCTION.insert(Stage("again", FurnitureState.CREATED, [FurnitureState.MATERIALS_PREPARED],
+                                "Повтор", lambda context: None), before="prepare")
+    with pytest.raises(InvalidDataError):
+        Pipeline([Stage("pack", FurnitureState.QUALITY_CHECKED, [FurnitureState.PACKED],
+                        "Упаковка", lambda context: None)])
+
+def test_pipeline_rejects_undeclared_transition():
+    warehouse = create_stocked_warehouse()
+    context = ProductionContext(warehouse, create_staff(), [Tool("Hammer", 100)])
+    engine = PRODUCTION.engine(context, {"prepare": lambda f: f.change_status(FurnitureState.PACKED)})
+    with pytest.raises(InvalidOperation):
+        engine.step(Furniture("Стул", make_components("стул")))
+
+@patch("operations.operations.random.randint", return_value=90)
+@patch("operations.operations.random.sample", return_value=[])
+def test_inserted_stage_runs_in_batch(mock_sample, mock_randint):
+    painted = []
+    paint = Stage("paint", FurnitureState.ELEMENTS_MANUFACTURED, [], "Покраска",
+                  lambda context: painted.append)
+    pipeline = PRODUCTION.insert(paint, before="assembly")
+    assert [stage.name for stage in pipeline.chains[FurnitureState.ELEMENTS_MANUFACTURED]] == ["paint", "assembly"]
+    furnitures = [Furniture("Стул", make_components("стул")) for _ in range(3)]
+    report = run_batch(furnitures, create_stocked_warehouse(), create_staff(), [Tool("Hammer", 100)],
+                       pipeline=pipeline)
+    assert len(report.completed) == 3 and painted == furnitures
+    assert report.stage_counts[FurnitureState.ELEMENTS_MANUFACTURED.value] == 6
+
+def test_cabinet_parts_are_made_in_parallel():
+    warehouse = create_stocked_warehouse()
+    tools = [Tool("Hammer", 100), Tool("Saw", 100), Tool("Drill", 100)]
+    cabinet = Furniture("Шкаф", make_components("шкаф"))
+    cabinet.change_status(FurnitureState.MATERIALS_PREPARED)
+    operation = CreateElementOperation(warehouse, create_staff(), tools)
+    operation.execute(cabinet)
+    assert cabinet.status == FurnitureState.ELEMENTS_MANUFACTURED
+    jobs = {job.part: job for job in operation.jobs}
+    assert set(jobs) == {"каркас", "задняя стенка", "двери", "полки", "фурнитура"}
+    assert jobs["задняя стенка"].start >= jobs["каркас"].finish
+    assert len({job.worker.name for job in operation.jobs}) > 1
+    assert max(job.finish for job in operation.jobs) < part_graph("шкаф").serial_hours
+    assert sum(100 - tool.durability for tool in tools) == 5
+    assert warehouse.wood_amount == 970.0
+
+def test_cabinet_parts_respect_tool_manager_and_keep_stock_on_failure():
+    warehouse = create_stocked_warehouse()
+    good, worn = Tool("Good", 50), Tool("Worn", 2)
+    cabinet = Furniture("Шкаф", make_components("шкаф"))
+    cabinet.change_status(FurnitureState.MATERIALS_PREPARED)
+    operation = CreateElementOperation(warehouse, create_staff(), ToolManager([good, worn], repair_threshold=10))
+    operation.execute(cabinet)
+    assert {job.tool.name for job in operation.jobs} == {"Good"}
+    assert (good.durability, worn.durability) == (45, 2)
+    # Three uses left before zero is not enough for five parts: nothing is drawn.
+    cabinet = Furniture("Шкаф", make_components("шкаф"))
+    cabinet.change_status(FurnitureState.MATERIALS_PREPARED)
+    tool = Tool("Last", 4)
+    with pytest.raises(InvalidAmountError):
+        CreateElementOperation(warehouse, create_staff(), [tool]).execute(cabinet)
+    assert cabinet.status == FurnitureState.MATERIALS_PREPARED
+    assert (warehouse.wood_amount, tool.durability) == (970.0, 4)
+
+def test_part_graph_rejects_bad_plans():
+    with pytest.raises(InvalidDataError):
+        PartGraph([("каркас", 1.0, ("двери",)), ("двери", 1.0, ("каркас",))])
+    with pytest.raises(InvalidDataError):
+        PartGraph([("каркас", 1.0, ("крыша",))])
+
+def test_schedule_runs_parts_side_by_side():
+    start = datetime(2026, 1, 1)
+    jobs = [(Furniture("Шкаф", make_components("шкаф")), Order("Шкаф", 1, created_at=start + timedelta(hours=4 * i)))
+            for i in range(20)]
+    tools = [Tool("Hammer", 100), Tool("Saw", 100), Tool("Drill", 100)]
+    whole = simulate_schedule(jobs, create_staff(), tools, "fifo", start, split_parts=False)
+    split = simulate_schedule(jobs, create_staff(), tools, "fifo", start)
+    assert whole.completed == split.completed == 20
+    lead = lambda report: sum(report.completion[i] - 4 * i for i in report.completion) / 20
+    assert lead(split) < lead(whole)
+
+def test_workload_is_seeded_and_seasonal():
+    records = list(WorkloadGenerator(seed=3, custom_share=0.0).records(5000))
+    assert records == list(WorkloadGenerator(seed=3, custom_share=0.0).records(5000))
+    assert records[:50] != list(WorkloadGenerator(seed=4, custom_share=0.0).records(50))
+    assert {record["type"] for record in records} == {"стул", "стол", "шкаф"}
+    hours = [datetime.fromisoformat(record["created_at"]) for record in records]
+    assert hours == sorted(hours)
+    night = sum(1 for moment in hours if moment.hour < 6)
+    midday = sum(1 for moment in hours if 10 <= moment.hour < 16)
+    assert midday > 5 * night
+    weekend = sum(1 for moment in hours if moment.weekday() >= 5)
+    assert weekend < len(hours) * 2 / 7
+    generator = WorkloadGenerator(seed=3)
+    assert [w.name for w in generator.workers(5)] == [w.name for w in WorkloadGenerator(seed=3).workers(5)]
+    assert len(generator.tools(3)) == 3
+
+def test_generated_orders_import_and_simulate(tmp_path):
+    generator = WorkloadGenerator(seed=5, custom_share=0.2)
+    path = tmp_path / "orders.jsonl"
+    assert generator.write_jsonl(str(path), 300) == 300
+    # The importer registers the custom products itself.
+    for prod_type in CUSTOM_RECIPES:
+        RECIPES.pop(prod_type, None)
+    customers, furnitures = [], []
+    report = OrderImporter(customers, furnitures).import_file(str(path))
+    assert report.imported == 300
+    first = next(generator.records(1))
+    assert furnitures[0].order.created_at == datetime.fromisoformat(first["created_at"])
+    assert {f.type.lower() for f in furnitures} & set(CUSTOM_RECIPES)
+    jobs = list(generator.orders(300))
+    assert [f.type for f, _ in jobs] == [f.type for f in furnitures]
+    schedule = simulate_schedule(jobs, generator.workers(8), generator.tools(4), "edf")
+    assert schedule.completed == 300
+
+def test_cli_submit_prints_the_workshop_order_id(tmp_path, capsys):
+    save = str(tmp_path / "save.json")
+    assert cli.run(["--save", save, "submit", "--name", "Ivan", "--phone", "123", "--type", "стул"]) == 0
+    assert "Order 0 accepted" in capsys.readouterr().out
+    with open(save, encoding="utf-8") as f:
+        data = json.load(f)
+    # As after archiving: the list is shorter than the numbering.
+    data["furnitures"], data["workshop"]["next_id"] = [], 7
+    with open(save, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    assert cli.run(["--save", save, "submit", "--name", "Ivan", "--phone", "123", "--type", "стул"]) == 0
+    assert "Order 7 accepted" in capsys.readouterr().out
+
+def test_cli_accepts_custom_products(tmp_path, capsys):
+    for prod_type in CUSTOM_RECIPES:
+        RECIPES.pop(prod_type, None)
+    save = str(tmp_path / "save.json")
+    assert cli.run(["--save", save, "submit", "--name", "Ivan", "--phone", "123", "--type", "комод"]) == 0
+    assert "Комод" in capsys.readouterr().out
+
+def test_demand_forecasts_work_slot_wise():
+    assert list(moving_average([[1.0, 2.0], [3.0, 4.0, 5.0]], 2)) == [2.0, 3.0, 2.5]
+    assert list(moving_average([[9.0], [1.0], [3.0]], 2)) == [2.0]
+    assert list(exponential_smoothing([[10.0, 0.0], [20.0, 4.0]], 0.5)) == [15.0, 2.0]
+    with pytest.raises(InvalidDataError):
+        exponential_smoothing([[1.0]], 0.0)
+
+def test_planner_reorders_ahead_of_lead_time():
+    now = [0.0]
+    warehouse = create_stocked_warehouse(metal=0.0, wood=100.0)
+    history = warehouse.enable_history(clock=lambda: now[0])
+    for day in range(5):
+        now[0] = day * 86400.0 + 3600.0
+        warehouse.remove_wood(15.0)
+    assert [list(period) for period in history.outflow_series(0.0, 86400.0, 2)] == [[0.0, 15.0], [0.0, 15.0]]
+    planner = RestockPlanner(warehouse, lead_time=2, safety=1, cover=2, kinds=["wood"])
+    now[0] = 5 * 86400.0
+    events = planner.plan([Furniture("Стул", make_components("стул"))], now[0])
+    # 25 on hand - 10 for the backlog is below 15/day over 3 days: order up to 5 days.
+    assert len(events) == 1 and events[0].key == ("wood", "")
+    assert events[0].amount == pytest.approx(75.0 - 15.0)
+    assert events[0].arrives_at == now[0] + 2 * 86400.0
+    assert planner.plan([], now[0]) == []
+    assert planner.receive(now[0] + 86400.0) == []
+    assert planner.receive(now[0] + 2 * 86400.0) == events
+    assert warehouse.wood_amount == pytest.approx(85.0)
+
+@patch("operations.operations.random.randint", return_value=90)
+@patch("operations.operations.random.sample", return_value=[])
+def test_restocking_cuts_shortage_failures(mock_sample, mock_randint):
+    generator = WorkloadGenerator(seed=2, orders_per_day=10, custom_share=0.0)
+    reports = []
+    for restock in (False, True):
+        days = [[] for _ in range(10)]
+        for furniture, order in generator.orders(120):
+            day = int((order.created_at - generator.start).total_seconds() // 86400)
+            if day < 10:
+                days[day].append(furniture)
+        warehouse = create_stocked_warehouse(metal=100.0, wood=500.0)
+        planner = RestockPlanner(warehouse, lead_time=1) if restock else None
+        reports.append(simulate_supply(days, warehouse, create_staff(), [Tool("Hammer", 100000)], planner))
+        assert warehouse.history.clock is time.time
+    without, with_planner = reports
+    assert with_planner.reorders > 0 and without.reorders == 0
+    assert with_planner.shortages < without.shortages / 2
+    assert with_planner.completed > without.completed
+
+def test_eta_counts_work_ahead_in_the_pool():
+    estimator = EtaEstimator([Worker("Ivan", 35, "универсал", 0)], [Tool("Hammer", 100)])
+    total = sum(estimator.hours.values())
+    first, second = (Furniture("Стул", make_components("стул")) for _ in range(2))
+    packed = Furniture("Стол", make_components("стол"))
+    packed.status = FurnitureState.PACKED
+    estimator.track([first, second, packed])
+    packing = estimator.hours[FurnitureState.PACKED]
+    assert estimator.hours_left(packed) == pytest.approx(packing)
+    assert estimator.hours_left(first) == pytest.approx(packing + total)
+    assert estimator.hours_left(second) == pytest.approx(packing + 2 * total)
+    # Moving one item on only updates its queues; the others see it at once.
+    first.change_status(FurnitureState.MATERIALS_PREPARED)
+    estimator.update(first)
+    creating = estimator.hours[FurnitureState.CREATED]
+    assert estimator.hours_left(first) == pytest.approx(packing + total - creating)
+    assert estimator.hours_left(second) == pytest.approx(packing + 2 * total - creating)
+    packed.status = FurnitureState.STORED
+    estimator.update(packed)
+    assert packed not in estimator and estimator.hours_left(packed) is None
+    assert estimator.hours_left(second) == pytest.approx(2 * total - creating)
+    estimator.observe(FurnitureState.PACKED, packing + 10)
+    assert estimator.hours_left(second) == pytest.approx(2 * total - creating + 2 * 10 * estimator.alpha)
+    estimator.set_capacity([Worker("Ivan", 35, "универсал", 0)], [])
+    assert estimator.hours_left(second) is None
+    assert estimator.eta(first, datetime(2026, 1, 5)) is None
+
+def test_eta_queue_grows_and_keeps_order():
+    workers = create_staff()
+    estimator = EtaEstimator(workers, [Tool("Hammer", 100), Tool("Saw", 100)])
+    items = [Furniture("Стул", make_components("стул")) for _ in range(300)]
+    estimator.track(items)
+    total = sum(estimator.hours.values())
+    tools_only = estimator.hours[FurnitureState.CREATED] + estimator.hours[FurnitureState.MATERIALS_PREPARED]
+    for rank in (0, 63, 64, 299):
+        expected = max(total, (rank + 1) * total / len(workers), (rank + 1) * tools_only / 2)
+        assert estimator.hours_left(items[rank]) == pytest.approx(expected)
+    for item in items[:100]:
+        estimator.remove(item)
+    assert len(estimator) == 200
+    assert estimator.hours_left(items[299]) == pytest.approx(
+        max(total, 200 * total / len(workers), 200 * tools_only / 2))
+    assert estimator.eta(items[100], datetime(2026, 1, 5)) == datetime(2026, 1, 5) + timedelta(
+        hours=estimator.hours_left(items[100]))
+
+@patch("operations.operations.random.randint", return_value=90)
+@patch("operations.operations.random.sample", return_value=[])
+def test_batch_and_server_keep_eta_current(mock_sample, mock_randint):
+    workers = create_staff()
+    estimator = EtaEstimator(workers, [Tool("Hammer", 100)])
+    service = OrderService([], [], eta=estimator)
+    order_id = asyncio.run(service.submit({"name": "Oleg", "phone": "1", "type": "стул", "quantity": 1}))
+    status = service.status(order_id)
+    assert status["eta"] is not None and len(estimator) == 1
+    report = run_batch(service.furnitures, create_stocked_warehouse(), workers, [Tool("Hammer", 100)], eta=estimator)
+    assert len(report.completed) == 1
+    assert len(estimator) == 0 and service.status(order_id)["eta"] is None
+
+@patch("operations.operations.random.randint", return_value=90)
+@patch("operations.operations.random.sample", return_value=[])
+def test_batch_feeds_measured_stage_times_to_the_eta(mock_sample, mock_randint):
+    workers = create_staff()
+    estimator = EtaEstimator(workers, [Tool("Hammer", 100)])
+    waiting = Furniture("Стул", make_components("стул"))
+    estimator.update(waiting)
+    before, planned = estimator.hours_left(waiting), dict(estimator.hours)
+    furnitures = [Furniture("Стул", make_components("стул")) for _ in range(3)]
+    report = run_batch(furnitures, create_stocked_warehouse(), workers, [Tool("Hammer", 100)], eta=estimator)
+    assert len(report.completed) == 3
+    # Stages ran in well under their planned hours, so the estimate comes down.
+    assert all(estimator.hours[state] < planned[state] for state in planned)
+    assert estimator.hours_left(waiting) < before